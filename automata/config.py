@@ -25,3 +25,16 @@ REPOSITORY_PATH = os.getenv("REPOSITORY_PATH", ".")
 REPOSITORY_NAME = os.getenv("REPOSITORY_NAME", "maks-ivanov/automata")
 TASK_DB_PATH = os.getenv("TASK_DB_PATH", "tasks.sqlite3")
 TASKS_DIR_PATH = os.getenv("TASKS_DIR_PATH", "tasks")
+# Persistent caches, under the repository root by default rather than the working directory
+AUTOMATA_CACHE_DIR = os.getenv(
+    "AUTOMATA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".automata_cache"),
+)
+REPOSITORY_OVERVIEW_CACHE_PATH = os.getenv(
+    "REPOSITORY_OVERVIEW_CACHE_PATH", os.path.join(AUTOMATA_CACHE_DIR, "repository_overview.json")
+)
+WARM_UP_MODULE_MAP = os.getenv("WARM_UP_MODULE_MAP", "0") == "1"
+COVERAGE_NUM_WORKERS = int(os.getenv("COVERAGE_NUM_WORKERS", "1"))
+COVERAGE_WAIT_TIMEOUT = float(os.getenv("COVERAGE_WAIT_TIMEOUT", "60"))
+COVERAGE_JOB_TIMEOUT = float(os.getenv("COVERAGE_JOB_TIMEOUT", "0"))
+COMPLETION_CACHE_DIR = os.getenv("COMPLETION_CACHE_DIR", "")
@@ -152,6 +152,84 @@ class AutomataAgentConfigBuilder(BaseModel):
         self._config.temperature = temperature
         return self
 
+    def with_max_tool_workers(self, max_tool_workers: int) -> "AutomataAgentConfigBuilder":
+        """
+        Set the maximum number of tools run concurrently in one turn of the AutomataAgent instance.
+
+        Args:
+            max_tool_workers (int): An integer value representing the maximum number of concurrent tools, 1 runs them sequentially.
+
+        Returns:
+            AutomataAgentConfigBuilder: The current AutomataAgentConfigBuilder instance with the updated max_tool_workers value.
+        """
+        self._validate_type(max_tool_workers, int, "Max tool workers")
+        self._config.max_tool_workers = max_tool_workers
+        return self
+
+    def with_max_message_tokens(
+        self, max_message_tokens: Optional[int]
+    ) -> "AutomataAgentConfigBuilder":
+        """
+        Set the token budget of the messages the AutomataAgent instance sends to the model.
+
+        Args:
+            max_message_tokens (Optional[int]): The token budget, older messages are compacted beyond it, None for no limit.
+
+        Returns:
+            AutomataAgentConfigBuilder: The current AutomataAgentConfigBuilder instance with the updated max_message_tokens value.
+        """
+        if max_message_tokens is not None:
+            self._validate_type(max_message_tokens, int, "Max message tokens")
+        self._config.max_message_tokens = max_message_tokens
+        return self
+
+    def with_num_recent_messages(self, num_recent_messages: int) -> "AutomataAgentConfigBuilder":
+        """
+        Set the number of latest messages the AutomataAgent instance never compacts.
+
+        Args:
+            num_recent_messages (int): The number of latest messages kept verbatim.
+
+        Returns:
+            AutomataAgentConfigBuilder: The current AutomataAgentConfigBuilder instance with the updated num_recent_messages value.
+        """
+        self._validate_type(num_recent_messages, int, "Num recent messages")
+        self._config.num_recent_messages = num_recent_messages
+        return self
+
+    def with_completion_cache_dir(
+        self, completion_cache_dir: Optional[str]
+    ) -> "AutomataAgentConfigBuilder":
+        """
+        Set the directory caching the completions of the deterministic requests of the AutomataAgent instance.
+
+        Args:
+            completion_cache_dir (Optional[str]): The directory of the completion cache, None for no cache.
+
+        Returns:
+            AutomataAgentConfigBuilder: The current AutomataAgentConfigBuilder instance with the updated completion_cache_dir value.
+        """
+        if completion_cache_dir is not None:
+            self._validate_type(completion_cache_dir, str, "Completion cache dir")
+        self._config.completion_cache_dir = completion_cache_dir
+        return self
+
+    def with_completion_cache_offline(
+        self, completion_cache_offline: bool
+    ) -> "AutomataAgentConfigBuilder":
+        """
+        Set whether the AutomataAgent instance only replays the completions of its completion cache.
+
+        Args:
+            completion_cache_offline (bool): Whether to fail on the completions missing from the cache rather than request them.
+
+        Returns:
+            AutomataAgentConfigBuilder: The current AutomataAgentConfigBuilder instance with the updated completion_cache_offline value.
+        """
+        self._validate_type(completion_cache_offline, bool, "Completion cache offline")
+        self._config.completion_cache_offline = completion_cache_offline
+        return self
+
     def with_session_id(self, session_id: Optional[str]) -> "AutomataAgentConfigBuilder":
         """
         Set the session ID for the AutomataAgent instance.
@@ -297,6 +375,18 @@ class AutomataAgentConfigFactory:
         if "with_max_iters" in kwargs:
             builder = builder.with_max_iters(kwargs["with_max_iters"])
 
+        if "max_tool_workers" in kwargs:
+            builder = builder.with_max_tool_workers(kwargs["max_tool_workers"])
+
+        if "max_message_tokens" in kwargs:
+            builder = builder.with_max_message_tokens(kwargs["max_message_tokens"])
+
+        if "completion_cache_dir" in kwargs:
+            builder = builder.with_completion_cache_dir(kwargs["completion_cache_dir"])
+
+        if "completion_cache_offline" in kwargs:
+            builder = builder.with_completion_cache_offline(kwargs["completion_cache_offline"])
+
         if "llm_toolkits" in kwargs and kwargs["llm_toolkits"] != "":
             llm_toolkits = build_llm_toolkits(kwargs["llm_toolkits"].split(","))
             builder = builder.with_llm_toolkits(llm_toolkits)
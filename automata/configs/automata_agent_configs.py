@@ -1,13 +1,15 @@
 import os
 import uuid
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
+from automata.config import COMPLETION_CACHE_DIR, REPOSITORY_OVERVIEW_CACHE_PATH
 from automata.configs.config_enums import AgentConfigName, ConfigCategory, InstructionConfigVersion
 from automata.core.base.tool import Toolkit, ToolkitType
+from automata.core.base.tool_registry import ToolRegistry
 from automata.core.code_indexing.utils import build_repository_overview
 
 
@@ -46,6 +48,11 @@ class AutomataAgentConfig(BaseModel):
         temperature (float): The temperature to use for the agent.
         session_id (Optional[str]): The session ID to use for the agent.
         instruction_version (InstructionConfigVersion): Config version of the introduction instruction.
+        max_tool_workers (int): The maximum number of side effect free tools run concurrently in one turn.
+        max_message_tokens (Optional[int]): The token budget of the messages sent to the model, older messages are compacted beyond it, None for no limit.
+        num_recent_messages (int): The number of latest messages that are never compacted.
+        completion_cache_dir (Optional[str]): The directory caching the completions of the requests at temperature 0 or in eval mode, None for no cache.
+        completion_cache_offline (bool): Whether to fail on the completions missing from the cache rather than request them.
     """
 
     class Config:
@@ -72,6 +79,26 @@ class AutomataAgentConfig(BaseModel):
         InstructionConfigVersion.AGENT_INTRODUCTION_PROD
     )
     helper_agent_configs: Dict[AgentConfigName, "AutomataAgentConfig"] = {}
+    max_tool_workers: int = 4
+    max_message_tokens: Optional[int] = None
+    num_recent_messages: int = 4
+    completion_cache_dir: Optional[str] = COMPLETION_CACHE_DIR or None
+    completion_cache_offline: bool = False
+    _tool_registry: ToolRegistry = PrivateAttr()
+
+    def __init__(self, **data: Any):
+        super().__init__(**data)
+        self._tool_registry = ToolRegistry(self.llm_toolkits)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "llm_toolkits":
+            self._tool_registry = ToolRegistry(value)
+
+    @property
+    def tool_registry(self) -> ToolRegistry:
+        """The tools of the llm_toolkits by name, rebuilt when the toolkits are set."""
+        return self._tool_registry
 
     def setup(self):
         """Setup the agent."""
@@ -123,7 +150,9 @@ class AutomataAgentConfig(BaseModel):
         from automata.core.utils import root_py_path
 
         if "overview" in config.instruction_input_variables:
-            config.instruction_payload.overview = build_repository_overview(root_py_path())
+            config.instruction_payload.overview = build_repository_overview(
+                root_py_path(), cache_path=REPOSITORY_OVERVIEW_CACHE_PATH
+            )
 
     @staticmethod
     def _format_prompt(format_variables: AutomataInstructionPayload, input_text: str) -> str:
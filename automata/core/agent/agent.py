@@ -19,3 +19,11 @@ class Agent(ABC):
     @abstractmethod
     def run(self) -> str:
         pass
+
+    @abstractmethod
+    async def aiter_task(self) -> Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]:
+        pass
+
+    @abstractmethod
+    async def arun(self) -> str:
+        pass
@@ -1,5 +1,6 @@
+import re
 import textwrap
-from typing import List, Optional, Tuple
+from typing import Final, List, Optional, Type, Union
 
 from .automata_actions import ActionTypes, AgentAction, ResultAction, ToolAction
 from .automata_agent_enums import (
@@ -12,6 +13,46 @@ from .automata_agent_enums import (
 
 
 class AutomataActionExtractor:
+    """
+    Extracts the actions of an agent's response with a single pass over its lines.
+
+    An extractor can be fed the chunks of a streamed response, it then emits each action as soon as its
+    block closes, that is when the next action starts, or when the response ends. Each line is parsed
+    once it is complete and the next line is known, since the start of a tool, an agent or a code block
+    is recognized from two lines.
+    """
+
+    ACTION_INDICATOR: Final = ActionIndicator.ACTION.value
+    CODE_INDICATOR: Final = ActionIndicator.CODE.value
+    TOOL_INDICATOR: Final = f"{ActionIndicator.ACTION.value}{ToolField.INDICATOR.value}"
+    TOOL_NAME_INDICATOR: Final = f"{ActionIndicator.ACTION.value}{ToolField.NAME.value}"
+    AGENT_INDICATOR: Final = f"{ActionIndicator.ACTION.value}{AgentField.INDICATOR.value}"
+    AGENT_NAME_INDICATOR: Final = f"{ActionIndicator.ACTION.value}{AgentField.NAME.value}"
+    RESULT_INDICATOR: Final = f"{ActionIndicator.ACTION.value}{ResultField.INDICATOR.value}"
+    LANGUAGE_REGEX: Final = re.compile("|".join(map(re.escape, SUPPORTED_CODING_LANGUAGES)))
+    LANGUAGE_CODE_INDICATOR_REGEX: Final = re.compile(
+        "|".join(
+            re.escape(f"{ActionIndicator.CODE.value}{language}")
+            for language in SUPPORTED_CODING_LANGUAGES
+        )
+    )
+
+    def __init__(self) -> None:
+        # The chunks of the line being received, and the complete line waiting for the next one
+        self._partial_line: List[str] = []
+        self._line: Optional[str] = None
+        self._action: Optional[ActionTypes] = None
+        self._closed_actions: List[ActionTypes] = []
+        self._skip_lines = 0
+        # The first line of the action being started and its spec lines, until the action can be built
+        self._action_type: Optional[Type[Union[ToolAction, AgentAction, ResultAction]]] = None
+        self._action_lines: List[str] = []
+        self._num_action_lines = 0
+        # The lines of the current code block, and the inputs of the action it belongs to
+        self._is_code = False
+        self._code_lines: List[str] = []
+        self._code_inputs: Optional[List[str]] = None
+
     @classmethod
     def extract_actions(cls, text: str) -> List[ActionTypes]:
         """
@@ -23,182 +64,183 @@ class AutomataActionExtractor:
         Returns:
             List[ActionTypes]: A list of extracted actions.
         """
-        lines = text.split("\n")
-        actions: List[ActionTypes] = []
-        action: Optional[ActionTypes] = None
-        is_code = False
-        skip_lines = 0
-
-        for index, line in enumerate(lines):
-            if skip_lines > 0:
-                skip_lines -= 1
-                continue
-
-            if cls._is_new_tool_action(lines, index):
-                action = ToolAction.from_lines(lines, index)
-                actions.append(action)  # type: ignore
-                skip_lines = ToolField.SPEC_LINES.value
-
-            elif cls._is_new_agent_action(lines, index):
-                action = AgentAction.from_lines(lines, index)
-                actions.append(action)  # type: ignore
-                skip_lines = AgentField.SPEC_LINES.value
-
-            elif cls._is_return_result_action(line):
-                action = ResultAction.from_lines(lines, index)
-                actions.append(action)  # type: ignore
-                skip_lines = ResultField.SPEC_LINES.value
-
-            else:
-                (is_code, skip_lines) = cls._process_action_input(
-                    index, line, lines, action, is_code, skip_lines
-                )
-
+        extractor = cls()
+        actions = extractor.feed(text)
+        actions.extend(extractor.close())
         return actions
 
-    @staticmethod
-    def _is_new_tool_action(lines, index) -> bool:
+    def feed(self, text: str) -> List[ActionTypes]:
         """
-        Check if the current line represents the start of a new tool action.
+        Feeds a chunk of the response.
 
         Args:
-            lines (List[str]): The list of lines in the input text.
-            index (int): The index of the current line.
+            text (str): The chunk of the response.
 
         Returns:
-            bool: True if the line is a new tool action, False otherwise.
+            List[ActionTypes]: The actions whose blocks closed with this chunk.
         """
-        return (
-            len(lines) > index + 1
-            and f"{ActionIndicator.ACTION.value}{ToolField.INDICATOR.value}" in lines[index]
-            and f"{ActionIndicator.ACTION.value}{ToolField.NAME.value}" in lines[index + 1]
-        )
-
-    @staticmethod
-    def _is_new_agent_action(lines, index) -> bool:
+        if "\n" not in text:
+            self._partial_line.append(text)
+            return []
+        lines = text.split("\n")
+        self._partial_line.append(lines[0])
+        lines[0] = "".join(self._partial_line)
+        self._partial_line = [lines.pop()]
+        for line in lines:
+            if self._line is not None:
+                self._process_line(self._line, line)
+            self._line = line
+        return self._pop_closed_actions()
+
+    def close(self) -> List[ActionTypes]:
         """
-        Check if the current line represents the start of a new agent action.
-
-        Args:
-            lines (List[str]): The list of lines in the input text.
-            index (int): The index of the current line.
+        Ends the response.
 
         Returns:
-            bool: True if the line is a new agent action, False otherwise.
+            List[ActionTypes]: The actions of the response that were not emitted yet.
         """
-        return (
-            len(lines) > index + 1
-            and f"{ActionIndicator.ACTION.value}{AgentField.INDICATOR.value}" in lines[index]
-            and f"{ActionIndicator.ACTION.value}{AgentField.NAME.value}" in lines[index + 1]
-        )
-
-    @staticmethod
-    def _is_return_result_action(line: str) -> bool:
+        last_line = "".join(self._partial_line)
+        self._partial_line = []
+        if self._line is not None:
+            self._process_line(self._line, last_line)
+        self._line = None
+        self._process_line(last_line, None)
+        if self._action_type is not None:
+            # The spec of the last action is incomplete
+            self._build_action()
+        self._close_action()
+        return self._pop_closed_actions()
+
+    def _pop_closed_actions(self) -> List[ActionTypes]:
+        closed_actions = self._closed_actions
+        self._closed_actions = []
+        return closed_actions
+
+    def _process_line(self, line: str, next_line: Optional[str]) -> None:
         """
-        Check if the current line represents a return result action.
+        Processes a line of the response.
 
         Args:
-            line (str): The current line of the input text.
-
-        Returns:
-            bool: True if the line is a return result action, False otherwise.
+            line (str): The line.
+            next_line (Optional[str]): The next line, None if the line is the last one.
         """
-        return line.strip().startswith(
-            f"{ActionIndicator.ACTION.value}{ResultField.INDICATOR.value}"
-        )
-
-    @staticmethod
-    def _process_action_input(
-        index: int,
+        if self._skip_lines > 0:
+            self._skip_lines -= 1
+            if self._action_type is not None:
+                self._action_lines.append(line)
+                if len(self._action_lines) == self._num_action_lines:
+                    self._build_action()
+            return
+
+        if (
+            next_line is not None
+            and AutomataActionExtractor.TOOL_INDICATOR in line
+            and AutomataActionExtractor.TOOL_NAME_INDICATOR in next_line
+        ):
+            # The name of the tool is on the second line after the query
+            self._start_action(ToolAction, line, ToolField.SPEC_LINES.value, 3)
+        elif (
+            next_line is not None
+            and AutomataActionExtractor.AGENT_INDICATOR in line
+            and AutomataActionExtractor.AGENT_NAME_INDICATOR in next_line
+        ):
+            self._start_action(AgentAction, line, AgentField.SPEC_LINES.value, 3)
+        elif line.strip().startswith(AutomataActionExtractor.RESULT_INDICATOR):
+            # The output of the result is on the line after its name
+            self._start_action(ResultAction, line, ResultField.SPEC_LINES.value, 2)
+        elif self._action is not None:
+            self._process_action_input(line, next_line)
+
+    def _start_action(
+        self,
+        action_type: Type[Union[ToolAction, AgentAction, ResultAction]],
         line: str,
-        lines: List[str],
-        action: Optional[ActionTypes],
-        is_code: bool,
-        skip_lines: int,
-    ) -> Tuple[bool, int]:
+        num_spec_lines: int,
+        num_action_lines: int,
+    ) -> None:
+        """
+        Starts a new action, which closes the current one. The action is built once the lines it is
+        built from are received, its spec lines are skipped.
+        """
+        self._close_action()
+        self._action_type = action_type
+        self._action_lines = [line]
+        self._num_action_lines = num_action_lines
+        self._skip_lines = num_spec_lines
+
+    def _build_action(self) -> None:
+        assert self._action_type is not None, "No action is started."
+        self._action = self._action_type.from_lines(self._action_lines, 0)
+        self._action_type = None
+        self._action_lines = []
+
+    def _close_action(self) -> None:
+        """Emits the current action, with the lines of its unterminated code block if any."""
+        if self._action is None:
+            return
+        if self._code_inputs is not None:
+            self._code_inputs[-1] = "".join(self._code_lines)
+            self._code_inputs = None
+            self._code_lines = []
+        self._closed_actions.append(self._action)
+        self._action = None
+
+    def _process_action_input(self, line: str, next_line: Optional[str]) -> None:
         """
         Process the action input, handling code blocks and appending input to the current action.
 
         Args:
-            index (int): The index of the current line in the input text.
             line (str): The current line of the input text.
-            lines (List[str]): The list of lines in the input text.
-            action (Optional[ActionTypes]): The current action being processed.
-            is_code (bool): Indicates if the current line is part of a code block.
-            skip_lines (int): The number of lines to skip for the current action.
-
-        Returns:
-            Tuple[bool, int]: A tuple containing the updated is_code and skip_lines values.
+            next_line (Optional[str]): The next line of the input text, None if the line is the last one.
         """
-        if action is not None:
-            if isinstance(action, AgentAction):
-                inputs = action.agent_instruction
-            elif isinstance(action, ToolAction):
-                inputs = action.tool_args
-            elif isinstance(action, ResultAction):
-                inputs = action.result_outputs
-
-            if AutomataActionExtractor._is_code_start(index, lines) and (not is_code):
-                is_code = True
-                contains_language_definition = False
-                for language in SUPPORTED_CODING_LANGUAGES:
-                    if language in line:
-                        contains_language_definition = True
-                if contains_language_definition:
-                    inputs.append("")
-                else:
-                    inputs.append(line + "\n")
-                skip_lines = 1
-            elif not AutomataActionExtractor._is_code_indicator(line) and is_code:
-                if len(inputs) > 0:
-                    inputs[-1] += line + "\n"
+        inputs = AutomataActionExtractor._get_inputs(self._action)
+        if (
+            not self._is_code
+            and next_line is not None
+            and AutomataActionExtractor.CODE_INDICATOR in next_line
+        ):
+            # The line before a code block is the first line of the block, unless it names the language
+            self._is_code = True
+            self._code_inputs = inputs
+            self._code_lines = (
+                [] if AutomataActionExtractor.LANGUAGE_REGEX.search(line) else [line, "\n"]
+            )
+            inputs.append("")
+            self._skip_lines = 1
+        elif self._is_code and not AutomataActionExtractor._is_code_indicator(line):
+            if self._code_inputs is not inputs:
+                # The code block continues in the last input of a new action
+                self._code_inputs = inputs
+                if inputs:
+                    self._code_lines = [inputs[-1]]
                 else:
-                    inputs.append(line + "\n")
-            elif AutomataActionExtractor._is_code_end(line) and (not is_code):
-                count = line.count("`")
-                if count != 6:
-                    raise ValueError(f"Invalid action format: {line}")
-            elif AutomataActionExtractor._is_code_end(line) and (not is_code):
-                count = line.count("`")
-                if count != 6:
-                    raise ValueError(f"Invalid action format: {line}")
-            elif AutomataActionExtractor._is_code_end(line) and is_code:
-                is_code = False
-                inputs[-1] = textwrap.dedent(inputs[-1])
-            elif ActionIndicator.ACTION.value in line:
-                clean_line = line.split(ActionIndicator.ACTION.value)[1].strip()
-                inputs.append(clean_line)
-        return (is_code, skip_lines)
-
-    @staticmethod
-    def _is_code_start(
-        index: int,
-        lines: List[str],
-    ):
-        """
-        Check if the current line represents the start of a code block.
-
-        Args:
-            index (int): The index of the current line in the input text.
-            lines (List[str]): The list of lines in the input text.
-
-        Returns:
-            bool: True if the line is the start of a code block, False otherwise.
-        """
-        return len(lines) > index + 1 and ActionIndicator.CODE.value in lines[index + 1]
+                    self._code_lines = []
+                    inputs.append("")
+            self._code_lines.extend((line, "\n"))
+        elif AutomataActionExtractor.CODE_INDICATOR in line and not self._is_code:
+            count = line.count("`")
+            if count != 6:
+                raise ValueError(f"Invalid action format: {line}")
+        elif AutomataActionExtractor.CODE_INDICATOR in line and self._is_code:
+            self._is_code = False
+            if self._code_inputs is inputs:
+                inputs[-1] = "".join(self._code_lines)
+            self._code_inputs = None
+            self._code_lines = []
+            inputs[-1] = textwrap.dedent(inputs[-1])
+        elif AutomataActionExtractor.ACTION_INDICATOR in line:
+            clean_line = line.split(AutomataActionExtractor.ACTION_INDICATOR)[1].strip()
+            inputs.append(clean_line)
 
     @staticmethod
-    def _is_code_end(line: str) -> bool:
-        """
-        Check if the current line represents the end of a code block.
-
-        Args:
-            line (str): The current line of the input text.
-
-        Returns:
-            bool: True if the line is the end of a code block, False otherwise.
-        """
-        return ActionIndicator.CODE.value in line
+    def _get_inputs(action: Optional[ActionTypes]) -> List[str]:
+        if isinstance(action, AgentAction):
+            return action.agent_instruction
+        elif isinstance(action, ToolAction):
+            return action.tool_args
+        elif isinstance(action, ResultAction):
+            return action.result_outputs
+        raise ValueError(f"Invalid action: {action}")
 
     @staticmethod
     def _is_code_indicator(line: str) -> bool:
@@ -211,11 +253,9 @@ class AutomataActionExtractor:
         Returns:
             bool: True if the line is a code indicator, False otherwise.
         """
-        contains_indicator = line.strip() == ActionIndicator.CODE.value
-        for language in SUPPORTED_CODING_LANGUAGES:
-            contains_indicator = (
-                contains_indicator
-                or "%s%s" % (ActionIndicator.CODE.value, language) in line.strip()
-            )
-
-        return contains_indicator
+        stripped_line = line.strip()
+        return (
+            stripped_line == AutomataActionExtractor.CODE_INDICATOR
+            or AutomataActionExtractor.LANGUAGE_CODE_INDICATOR_REGEX.search(stripped_line)
+            is not None
+        )
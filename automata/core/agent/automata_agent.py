@@ -1,9 +1,26 @@
+import asyncio
 import logging
 import re
-from typing import TYPE_CHECKING, Any, Dict, Final, List, Optional, Tuple, cast
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    cast,
+)
 
 import openai
-from termcolor import colored
 
 from automata.config import OPENAI_API_KEY
 from automata.configs.automata_agent_configs import AutomataAgentConfig
@@ -12,14 +29,25 @@ from automata.core.agent.agent import Agent
 from automata.core.agent.automata_action_extractor import (
     AutomataActionExtractor as ActionExtractor,
 )
-from automata.core.agent.automata_actions import AgentAction, ResultAction, ToolAction
+from automata.core.agent.automata_actions import ActionTypes, AgentAction, ResultAction, ToolAction
 from automata.core.agent.automata_agent_utils import (
     generate_user_observation_message,
     retrieve_completion_message,
 )
 from automata.core.agent.automata_database_manager import AutomataConversationDatabase
-from automata.core.base.openai import OpenAIChatCompletionResult, OpenAIChatMessage
-from automata.core.base.tool import ToolNotFoundError
+from automata.core.base.completion_cache import CachedChatCompletion, CompletionCache
+from automata.core.base.openai import (
+    NUM_TOKENS_PER_REPLY,
+    ContextLengthExceededError,
+    OpenAIChatCompletionResult,
+    OpenAIChatMessage,
+    count_message_tokens,
+    count_num_tokens,
+    get_context_length,
+)
+from automata.core.base.stream_sink import StreamSink, TerminalStreamSink
+from automata.core.base.tool import ToolkitType, ToolNotFoundError
+from automata.core.base.tool_result_cache import ToolResultCache
 from automata.core.utils import format_text, load_config
 
 logger = logging.getLogger(__name__)
@@ -28,6 +56,18 @@ if TYPE_CHECKING:
     from automata.core.coordinator.automata_coordinator import AutomataCoordinator
 
 
+class ActionRun(NamedTuple):
+    """The run of an action of the agent's response, its output is the observation named output_name."""
+
+    output_name: str
+    side_effect_free: bool
+    run: Callable[[], str]
+    # The coroutine run by the async runtime, run is called instead when there is none
+    arun: Optional[Callable[[], Awaitable[str]]] = None
+    # The toolkit of the tool run by the action, whose turn context applies its side effects
+    toolkit_type: Optional[ToolkitType] = None
+
+
 class AutomataAgent(Agent):
     """
     AutomataAgent is an autonomous agent designed to execute instructions and report
@@ -39,6 +79,14 @@ class AutomataAgent(Agent):
     NUM_DEFAULT_MESSAGES: Final = 3  # Prompt + Assistant Initialization + User Task
     INITIALIZER_DUMMY: Final = "automata_initializer"
     ERROR_DUMMY_TOOL: Final = "error_reporter"
+    TOOL_OUTPUT_PATTERN: Final = r"-\s(tool_output_\d+)\s+-\s(.*?)(?=-\s(tool_output_\d+)|$)"
+    AGENT_OUTPUT_PATTERN: Final = r"-\s(agent_output_\d+)\s+-\s(.*?)(?=-\s(agent_output_\d+)|$)"
+    # Matches the placeholders of the completion message, e.g. {tool_output_0}
+    OUTPUT_PLACEHOLDER_REGEX: Final = re.compile(r"\{((tool|agent)_output_\d+)\}")
+    # The number of leading characters of a message kept when it is compacted
+    NUM_COMPACTED_MESSAGE_CHARS: Final = 200
+    # The number of tokens of the context of the model left for the completion
+    NUM_RESERVED_COMPLETION_TOKENS: Final = 512
 
     def __init__(self, instructions: str, config: Optional[AutomataAgentConfig] = None):
         """
@@ -51,7 +99,22 @@ class AutomataAgent(Agent):
         self.completed = False
         self.instructions = instructions
         self.messages: List[OpenAIChatMessage] = []
+        # The latest output of each action, by output name, substituted in the completion message
+        self.action_outputs: Dict[str, str] = {}
+        # The content sent to the model in place of the compacted messages, by message index
+        self.compacted_messages: Dict[int, OpenAIChatMessage] = {}
+        # The token counts of the messages, computed once when a message is saved, and their total
+        self.message_num_tokens: List[int] = []
+        self.num_message_tokens = 0
+        # The number of tokens removed from the messages sent to the model by compaction
+        self.num_elided_tokens = 0
         self.coordinator: Optional["AutomataCoordinator"] = None
+        self.tool_result_cache = ToolResultCache()
+        # Renders the streamed completions, e.g. a BufferStreamSink or a ServerSentEventStreamSink on a server
+        self.stream_sink: StreamSink = TerminalStreamSink()
+        self.completion_cache = (
+            CompletionCache(config.completion_cache_dir) if config.completion_cache_dir else None
+        )
 
     def set_coordinator(self, coordinator: "AutomataCoordinator"):
         """
@@ -62,6 +125,8 @@ class AutomataAgent(Agent):
         """
 
         self.coordinator = coordinator
+        # The agents of a coordinator share the outputs of their cacheable tools
+        self.tool_result_cache = coordinator.tool_result_cache
 
     def iter_task(self) -> Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]:
         """
@@ -76,10 +141,45 @@ class AutomataAgent(Agent):
         if self.completed:
             raise ValueError("Cannot run an agent that has already completed.")
 
-        response_text = self._get_openai_response()
+        if self.config.stream:
+            response_text, observations = self._stream_and_generate_observations()
+        else:
+            response_text = self._get_openai_response()
+            observations = self._generate_observations(response_text)
+
+        return self._complete_iteration(response_text, observations)
+
+    async def aiter_task(self) -> Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]:
+        """
+        Executes a single iteration of the task asynchronously, awaiting the chat completion and the tools,
+        and returns the latest assistant and user messages.
+
+        Raises:
+            ValueError: If the agent has already completed its task.
+
+        Returns:
+            Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]: Latest assistant and user messages, or None if the task is completed.
+        """
+        if self.completed:
+            raise ValueError("Cannot run an agent that has already completed.")
+
+        if self.config.stream:
+            response_text, observations = await self._astream_and_generate_observations()
+        else:
+            response_text = await self._aget_openai_response()
+            observations = await self._agenerate_observations(response_text)
+
+        return self._complete_iteration(response_text, observations)
 
-        observations = self._generate_observations(response_text)
+    def _complete_iteration(
+        self, response_text: str, observations: Dict[str, str]
+    ) -> Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]:
+        """
+        Saves the messages of an iteration, given the response and the observations it produced.
 
+        Returns:
+            Optional[Tuple[OpenAIChatMessage, OpenAIChatMessage]]: Latest assistant and user messages, or None if the task is completed.
+        """
         completion_message = retrieve_completion_message(observations)
         if completion_message is not None:
             self.completed = True
@@ -89,6 +189,7 @@ class AutomataAgent(Agent):
                 if not self.config.eval_mode
                 else response_text,
             )
+            self.database_manager.flush()
             return None
 
         assistant_message = self._save_message("assistant", response_text)
@@ -98,21 +199,28 @@ class AutomataAgent(Agent):
             if len(observations) > 0
             else AutomataAgent.CONTINUE_MESSAGE,
         )
+        # The messages of an iteration are written in a single transaction
+        self.database_manager.flush()
 
         return (assistant_message, user_message)
 
     def _get_debug_summary(self):
         user_message = "Provide a succinct one-sentence summary of the errors encountered. Write nothing else."
         self._save_message("user", user_message)
+        self.database_manager.flush()
         response_text = self._get_openai_response()
         return response_text
 
+    async def _aget_debug_summary(self):
+        user_message = "Provide a succinct one-sentence summary of the errors encountered. Write nothing else."
+        self._save_message("user", user_message)
+        self.database_manager.flush()
+        response_text = await self._aget_openai_response()
+        return response_text
+
     def _get_openai_response(self) -> str:
-        response_summary = openai.ChatCompletion.create(
-            model=self.config.model,
-            messages=[ele.to_dict() for ele in self.messages],
-            temperature=self.config.temperature,
-            stream=self.config.stream,
+        response_summary = self._get_chat_completion_client().create(
+            **self._build_completion_kwargs()
         )
         response_text = (
             self._stream_message(response_summary)
@@ -121,6 +229,140 @@ class AutomataAgent(Agent):
         )
         return response_text
 
+    async def _aget_openai_response(self) -> str:
+        response_summary = await self._get_chat_completion_client().acreate(
+            **self._build_completion_kwargs()
+        )
+        if self.config.stream:
+            return await self._astream_message(response_summary)
+        return OpenAIChatCompletionResult(raw_data=response_summary).get_completion()
+
+    def _get_chat_completion_client(self) -> Any:
+        """
+        Returns the client requesting the chat completions. The deterministic requests, at temperature 0
+        or in eval mode, are served from the completion cache when one is configured.
+        """
+        if self.completion_cache is not None and (
+            self.config.temperature == 0 or self.config.eval_mode
+        ):
+            return CachedChatCompletion(
+                self.completion_cache, offline=self.config.completion_cache_offline
+            )
+        return openai.ChatCompletion
+
+    def _build_completion_kwargs(self) -> Dict[str, Any]:
+        return {
+            "model": self.config.model,
+            "messages": [ele.to_dict() for ele in self._build_request_messages()],
+            "temperature": self.config.temperature,
+            "stream": self.config.stream,
+        }
+
+    def _build_request_messages(self) -> List[OpenAIChatMessage]:
+        """
+        Checks that the messages fit in the context of the model before a completion is requested,
+        compacting them to the configured token budget or to the context of the model, whichever is lower.
+
+        Raises:
+            ContextLengthExceededError: If the messages exceed the context of the model after compaction.
+
+        Returns:
+            List[OpenAIChatMessage]: The messages to send to the model.
+        """
+        max_context_tokens = (
+            get_context_length(self.config.model)
+            - AutomataAgent.NUM_RESERVED_COMPLETION_TOKENS
+            - NUM_TOKENS_PER_REPLY
+        )
+        max_num_tokens = max_context_tokens
+        if self.config.max_message_tokens is not None:
+            max_num_tokens = min(max_num_tokens, self.config.max_message_tokens)
+
+        messages = self._compact_messages(max_num_tokens)
+        num_tokens = self.num_message_tokens - self.num_elided_tokens
+        if num_tokens > max_context_tokens:
+            raise ContextLengthExceededError(
+                f"The messages take {num_tokens} tokens after compaction, "
+                f"over the {max_context_tokens} tokens available in the context of {self.config.model}."
+            )
+        if num_tokens > max_num_tokens:
+            logger.debug(
+                f"The messages exceed the token budget after compaction, {num_tokens} tokens"
+            )
+        return messages
+
+    def _compact_messages(self, max_num_tokens: int) -> List[OpenAIChatMessage]:
+        """
+        Compacts the messages sent to the model to fit a token budget. The system prompt, the initial
+        messages and the latest messages are kept verbatim. Older messages are truncated, the tool
+        observations first then the assistant responses, oldest first, until the budget is met.
+        A compacted message stays compacted and is recorded in the conversation database.
+
+        Args:
+            max_num_tokens (int): The token budget of the messages.
+
+        Returns:
+            List[OpenAIChatMessage]: The messages to send to the model.
+        """
+        messages = [
+            self.compacted_messages.get(index, message)
+            for index, message in enumerate(self.messages)
+        ]
+        num_tokens = self.num_message_tokens - self.num_elided_tokens
+        compactable_indices = range(
+            AutomataAgent.NUM_DEFAULT_MESSAGES,
+            len(messages) - self.config.num_recent_messages,
+        )
+        for role in ("user", "assistant"):
+            for index in compactable_indices:
+                if num_tokens <= max_num_tokens:
+                    return messages
+                message = messages[index]
+                if index in self.compacted_messages or message.role != role:
+                    continue
+                compacted_message = self._compact_message(message)
+                num_elided_tokens = self.message_num_tokens[index] - count_message_tokens(
+                    compacted_message, self.config.model
+                )
+                if num_elided_tokens <= 0:
+                    continue
+                self.database_manager.put_elision(
+                    index, num_elided_tokens, compacted_message.content
+                )
+                self.compacted_messages[index] = compacted_message
+                self.num_elided_tokens += num_elided_tokens
+                messages[index] = compacted_message
+                num_tokens -= num_elided_tokens
+        return messages
+
+    def _restore_compacted_messages(self) -> None:
+        """
+        Restores the compaction of a reloaded conversation from the conversation database. The elided
+        tokens are counted again, since the messages may have been compacted with another encoder.
+        """
+        for interaction_id, _, compacted_content in self.database_manager.get_elisions():
+            if interaction_id >= len(self.messages):
+                continue
+            compacted_message = OpenAIChatMessage(
+                role=self.messages[interaction_id].role, content=compacted_content
+            )
+            num_compacted_tokens = count_message_tokens(compacted_message, self.config.model)
+            self.compacted_messages[interaction_id] = compacted_message
+            self.num_elided_tokens += (
+                self.message_num_tokens[interaction_id] - num_compacted_tokens
+            )
+
+    def _compact_message(self, message: OpenAIChatMessage) -> OpenAIChatMessage:
+        """Truncates a message, noting how many tokens were elided."""
+        kept_content = message.content[: AutomataAgent.NUM_COMPACTED_MESSAGE_CHARS]
+        num_elided_tokens = count_num_tokens(
+            message.content[len(kept_content) :], self.config.model
+        )
+        return OpenAIChatMessage(
+            role=message.role,
+            content=f"{kept_content}\n... [{num_elided_tokens} tokens elided]",
+        )
+
     def run(self) -> str:
         """
         Runs the agent and iterates through the tasks until a result is produced or the max iterations are exceeded.
@@ -130,18 +372,34 @@ class AutomataAgent(Agent):
         """
         latest_responses = self.iter_task()
         while latest_responses is not None:
-            # Each iteration adds two messages, one from the assistant and one from the user
-            # If we have equal to or more than 2 * max_iters messages (less the default messages),
-            # then we have exceeded the max_iters
-            if (
-                len(self.messages) - AutomataAgent.NUM_DEFAULT_MESSAGES
-                >= self.config.max_iters * 2
-            ):
+            if self._has_exceeded_max_iters():
                 debug_summary = self._get_debug_summary()
                 return f"Result was not found before iterations exceeded configured max limit: {self.config.max_iters}. Debug summary: {debug_summary}"
             latest_responses = self.iter_task()
         return self.messages[-1].content
 
+    async def arun(self) -> str:
+        """
+        Runs the agent asynchronously, see `run`. The chat completions and the tools are awaited,
+        so one event loop can drive many agents concurrently.
+
+        Returns:
+            str: The final result or an error message if the result wasn't found in time.
+        """
+        latest_responses = await self.aiter_task()
+        while latest_responses is not None:
+            if self._has_exceeded_max_iters():
+                debug_summary = await self._aget_debug_summary()
+                return f"Result was not found before iterations exceeded configured max limit: {self.config.max_iters}. Debug summary: {debug_summary}"
+            latest_responses = await self.aiter_task()
+        return self.messages[-1].content
+
+    def _has_exceeded_max_iters(self) -> bool:
+        # Each iteration adds two messages, one from the assistant and one from the user
+        # If we have equal to or more than 2 * max_iters messages (less the default messages),
+        # then we have exceeded the max_iters
+        return len(self.messages) - AutomataAgent.NUM_DEFAULT_MESSAGES >= self.config.max_iters * 2
+
     def setup(self):
         """
         Sets up the agent by initializing the database and loading the config.
@@ -152,19 +410,28 @@ class AutomataAgent(Agent):
         self.database_manager: AutomataConversationDatabase = AutomataConversationDatabase(
             self.config.session_id
         )
-        self.database_manager._init_database()
         if not self.config.is_new_agent:
-            self.messages = self.database_manager.get_conversations()
+            for message in self.database_manager.get_conversations():
+                self._append_message(message)
+            self._restore_compacted_messages()
         else:
             if not self.config.system_instruction:
                 raise ValueError("System instruction must be provided if new agent.")
 
-            self._save_message("system", self.config.system_instruction)
-            initial_messages = self._build_initial_messages(
-                {"user_input_instructions": self.instructions}
-            )
+            initial_messages = [
+                OpenAIChatMessage(role="system", content=self.config.system_instruction)
+            ] + self._build_initial_messages({"user_input_instructions": self.instructions})
+            self.database_manager.put_messages(initial_messages, len(self.messages))
             for message in initial_messages:
-                self._save_message(message.role, message.content)
+                self._append_message(message)
+
+        # Index the outputs of the initial or reloaded messages, later outputs are indexed as they are produced
+        self.action_outputs.update(
+            self._extract_outputs(AutomataAgent.TOOL_OUTPUT_PATTERN, self.messages)
+        )
+        self.action_outputs.update(
+            self._extract_outputs(AutomataAgent.AGENT_OUTPUT_PATTERN, self.messages)
+        )
 
         logger.debug(
             "Initializing with System Instruction:%s\n\n" % self.config.system_instruction
@@ -183,37 +450,317 @@ class AutomataAgent(Agent):
         Returns:
             Dict[str, str]: A dictionary of observations.
         """
-        outputs = {}
-        actions = ActionExtractor.extract_actions(response_text)
-        for action in actions:
-            if isinstance(action, ToolAction):
-                (tool_query, tool_name, tool_input) = (
-                    action.tool_query,
-                    action.tool_name,
-                    action.tool_args,
+        action_runs = self._build_action_runs(response_text)
+        turn_errors: Dict[ToolkitType, Exception] = {}
+        with self._enter_turn_context(turn_errors):
+            action_outputs = self._run_actions(action_runs)
+        return self._build_observations(
+            action_runs, self._report_turn_errors(action_runs, action_outputs, turn_errors)
+        )
+
+    async def _agenerate_observations(self, response_text: str) -> Dict[str, str]:
+        """
+        Processes the agent's response text and generates observations asynchronously,
+        running the tools through their coroutines.
+
+        Args:
+            response_text (str): The agent's response text.
+
+        Returns:
+            Dict[str, str]: A dictionary of observations.
+        """
+        action_runs = self._build_action_runs(response_text)
+        turn_errors: Dict[ToolkitType, Exception] = {}
+        with self._enter_turn_context(turn_errors):
+            action_outputs = await self._arun_actions(action_runs)
+        return self._build_observations(
+            action_runs, self._report_turn_errors(action_runs, action_outputs, turn_errors)
+        )
+
+    def _stream_and_generate_observations(self) -> Tuple[str, Dict[str, str]]:
+        """
+        Streams the agent's response and generates its observations. The side effect free actions at the
+        start of the response run as soon as their blocks close, while the model generates the rest of the
+        response. The remaining actions run once the response is complete, see `_run_actions`.
+
+        Returns:
+            Tuple[str, Dict[str, str]]: The agent's response text and its observations.
+        """
+        action_runs: List[ActionRun] = []
+        started_actions: List[Future] = []
+        turn_errors: Dict[ToolkitType, Exception] = {}
+        with self._enter_turn_context(turn_errors), ThreadPoolExecutor(
+            max_workers=max(self.config.max_tool_workers, 1)
+        ) as executor:
+
+            def start_action(action: ActionTypes) -> None:
+                action_run = self._build_action_run(action)
+                if action_run is None:
+                    return
+                action_runs.append(action_run)
+                # An action waits for the response when an action before it has side effects
+                if (
+                    self.config.max_tool_workers > 1
+                    and action_run.side_effect_free
+                    and len(started_actions) == len(action_runs) - 1
+                ):
+                    started_actions.append(executor.submit(action_run.run))
+
+            response_summary = self._get_chat_completion_client().create(
+                **self._build_completion_kwargs()
+            )
+            response_text = self._stream_message(response_summary, start_action)
+            action_outputs = [future.result() for future in started_actions]
+            action_outputs.extend(self._run_actions(action_runs[len(started_actions) :]))
+        return response_text, self._build_observations(
+            action_runs, self._report_turn_errors(action_runs, action_outputs, turn_errors)
+        )
+
+    async def _astream_and_generate_observations(self) -> Tuple[str, Dict[str, str]]:
+        """
+        Streams the agent's response and generates its observations asynchronously,
+        see `_stream_and_generate_observations`.
+
+        Returns:
+            Tuple[str, Dict[str, str]]: The agent's response text and its observations.
+        """
+        action_runs: List[ActionRun] = []
+        started_actions: List[asyncio.Future] = []
+        turn_errors: Dict[ToolkitType, Exception] = {}
+        semaphore = asyncio.Semaphore(max(self.config.max_tool_workers, 1))
+
+        def start_action(action: ActionTypes) -> None:
+            action_run = self._build_action_run(action)
+            if action_run is None:
+                return
+            action_runs.append(action_run)
+            # An action waits for the response when an action before it has side effects
+            if (
+                self.config.max_tool_workers > 1
+                and action_run.side_effect_free
+                and len(started_actions) == len(action_runs) - 1
+            ):
+                started_actions.append(
+                    asyncio.ensure_future(AutomataAgent._arun_action(action_run, semaphore))
                 )
-                # Skip the initializer dummy tool which exists only for providing context
-                if tool_name == AutomataAgent.INITIALIZER_DUMMY:
-                    continue
-                if tool_name == AutomataAgent.ERROR_DUMMY_TOOL:
-                    # Input becomes the output when an error is registered
-                    outputs[tool_query.replace("query", "output")] = cast(str, tool_input)
-                else:
-                    tool_output = self._execute_tool(tool_name, tool_input)
-                    outputs[tool_query.replace("query", "output")] = tool_output
-            elif isinstance(action, ResultAction):
-                (result_name, result_outputs) = (action.result_name, action.result_outputs)
-                # Skip the return result indicator which exists only for marking the return result
-                outputs[result_name] = "\n".join(result_outputs)
-            elif isinstance(action, AgentAction):
-                if action.agent_version.value == AutomataAgent.INITIALIZER_DUMMY:
-                    continue
-                agent_output = self._execute_agent(action)
-                query_name = action.agent_query.replace("query", "output")
-                outputs[query_name] = agent_output
 
+        with self._enter_turn_context(turn_errors):
+            response_summary = await self._get_chat_completion_client().acreate(
+                **self._build_completion_kwargs()
+            )
+            response_text = await self._astream_message(response_summary, start_action)
+            started_outputs = await asyncio.gather(*started_actions)
+            remaining_outputs = await self._arun_actions(action_runs[len(started_actions) :])
+        action_outputs = self._report_turn_errors(
+            action_runs, list(started_outputs) + remaining_outputs, turn_errors
+        )
+        return response_text, self._build_observations(action_runs, action_outputs)
+
+    def _build_action_runs(self, response_text: str) -> List[ActionRun]:
+        """
+        Extracts the actions of the agent's response text.
+
+        Args:
+            response_text (str): The agent's response text.
+
+        Returns:
+            List[ActionRun]: The runs of the actions, in the order of the response.
+        """
+        action_runs: List[ActionRun] = []
+        for action in ActionExtractor.extract_actions(response_text):
+            action_run = self._build_action_run(action)
+            if action_run is not None:
+                action_runs.append(action_run)
+        return action_runs
+
+    def _build_action_run(self, action: ActionTypes) -> Optional[ActionRun]:
+        """
+        Builds the run of an action of the agent's response.
+
+        Args:
+            action (ActionTypes): The action.
+
+        Returns:
+            Optional[ActionRun]: The run of the action, or None if the action only provides context.
+        """
+        if isinstance(action, ToolAction):
+            (tool_query, tool_name, tool_input) = (
+                action.tool_query,
+                action.tool_name,
+                action.tool_args,
+            )
+            # Skip the initializer dummy tool which exists only for providing context
+            if tool_name == AutomataAgent.INITIALIZER_DUMMY:
+                return None
+            output_name = tool_query.replace("query", "output")
+            if tool_name == AutomataAgent.ERROR_DUMMY_TOOL:
+                # Input becomes the output when an error is registered
+                return ActionRun(output_name, True, partial(str, tool_input))
+            tool = self.config.tool_registry.get(tool_name)
+            return ActionRun(
+                output_name,
+                tool is None or tool.side_effect_free,
+                partial(self._execute_tool, tool_name, tool_input),
+                partial(self._aexecute_tool, tool_name, tool_input),
+                self.config.tool_registry.get_toolkit_type(tool_name),
+            )
+        elif isinstance(action, ResultAction):
+            (result_name, result_outputs) = (action.result_name, action.result_outputs)
+            # Skip the return result indicator which exists only for marking the return result
+            return ActionRun(result_name, True, partial("\n".join, result_outputs))
+        elif isinstance(action, AgentAction):
+            if action.agent_version.value == AutomataAgent.INITIALIZER_DUMMY:
+                return None
+            query_name = action.agent_query.replace("query", "output")
+            return ActionRun(
+                query_name,
+                False,
+                partial(self._execute_agent, action),
+                partial(self._aexecute_agent, action),
+            )
+        return None
+
+    def _enter_turn_context(self, turn_errors: Dict[ToolkitType, Exception]) -> ExitStack:
+        """
+        Enters the turn contexts of the toolkits, which may batch the side effects of the tools run during
+        this turn, e.g. the PythonWriter tools write their edits at the end of the turn. When the turn context
+        of a toolkit fails to apply the side effects, its error is recorded in turn_errors, and is reported in
+        place of the outputs of the tools of the toolkit, see `_report_turn_errors`.
+        """
+        turn_stack = ExitStack()
+        try:
+            for toolkit_type, toolkit in self.config.llm_toolkits.items():
+                turn_stack.enter_context(
+                    AutomataAgent._catch_turn_error(
+                        toolkit_type, toolkit.turn_context(), turn_errors
+                    )
+                )
+        except BaseException:
+            turn_stack.close()
+            raise
+        return turn_stack
+
+    @staticmethod
+    @contextmanager
+    def _catch_turn_error(
+        toolkit_type: ToolkitType,
+        turn_context: ContextManager[None],
+        turn_errors: Dict[ToolkitType, Exception],
+    ) -> Iterator[None]:
+        """Records the error raised by a turn context when it exits after a turn that completed."""
+        turn_context.__enter__()
+        try:
+            yield
+        except BaseException as e:
+            if not turn_context.__exit__(type(e), e, e.__traceback__):
+                raise
+            return
+        try:
+            turn_context.__exit__(None, None, None)
+        except Exception as e:
+            logger.error(f"Failed to apply the side effects of the {toolkit_type.name} tools: {e}")
+            turn_errors[toolkit_type] = e
+
+    @staticmethod
+    def _report_turn_errors(
+        action_runs: List[ActionRun],
+        action_outputs: List[str],
+        turn_errors: Dict[ToolkitType, Exception],
+    ) -> List[str]:
+        """Replaces the outputs of the actions whose side effects were rolled back by the error of their toolkit."""
+        if not turn_errors:
+            return action_outputs
+        return [
+            f"Failed to apply the changes of the turn, they were rolled back, with error - {turn_errors[action_run.toolkit_type]}"
+            if action_run.toolkit_type in turn_errors
+            else action_output
+            for action_run, action_output in zip(action_runs, action_outputs)
+        ]
+
+    def _build_observations(
+        self, action_runs: List[ActionRun], action_outputs: List[str]
+    ) -> Dict[str, str]:
+        """Maps the outputs of the actions of a turn to their names, and indexes them for the completion placeholders."""
+        outputs = {}
+        for action_run, action_output in zip(action_runs, action_outputs):
+            outputs[action_run.output_name] = action_output
+            self.action_outputs[action_run.output_name] = action_output.strip()
         return outputs
 
+    def _run_actions(self, action_runs: List[ActionRun]) -> List[str]:
+        """
+        Runs the actions of a turn. Consecutive side effect free actions run concurrently in a thread pool,
+        an action with side effects waits for the actions before it and runs alone, so the tools with side
+        effects, e.g. the PythonWriter tools, keep their order relative to every other action.
+
+        Args:
+            action_runs (List[ActionRun]): The runs of the actions.
+
+        Returns:
+            List[str]: The outputs of the actions, in the order of the actions.
+        """
+        action_outputs: List[Optional[str]] = [None] * len(action_runs)
+        num_concurrent_actions = sum(action_run.side_effect_free for action_run in action_runs)
+        if self.config.max_tool_workers <= 1 or num_concurrent_actions <= 1:
+            for index, action_run in enumerate(action_runs):
+                action_outputs[index] = action_run.run()
+            return cast(List[str], action_outputs)
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.config.max_tool_workers, num_concurrent_actions)
+        ) as executor:
+            running_actions: List[Tuple[int, Future]] = []
+            for index, action_run in enumerate(action_runs):
+                if action_run.side_effect_free:
+                    running_actions.append((index, executor.submit(action_run.run)))
+                    continue
+                for running_index, future in running_actions:
+                    action_outputs[running_index] = future.result()
+                running_actions = []
+                action_outputs[index] = action_run.run()
+            for running_index, future in running_actions:
+                action_outputs[running_index] = future.result()
+        return cast(List[str], action_outputs)
+
+    async def _arun_actions(self, action_runs: List[ActionRun]) -> List[str]:
+        """
+        Runs the actions of a turn asynchronously, with the ordering of `_run_actions`:
+        consecutive side effect free actions are awaited together, at most max_tool_workers at a time.
+
+        Args:
+            action_runs (List[ActionRun]): The runs of the actions.
+
+        Returns:
+            List[str]: The outputs of the actions, in the order of the actions.
+        """
+        action_outputs: List[Optional[str]] = [None] * len(action_runs)
+        semaphore = asyncio.Semaphore(max(self.config.max_tool_workers, 1))
+
+        async def run_actions_concurrently(indices: List[int]) -> None:
+            outputs = await asyncio.gather(
+                *(AutomataAgent._arun_action(action_runs[index], semaphore) for index in indices)
+            )
+            for index, output in zip(indices, outputs):
+                action_outputs[index] = output
+
+        running_indices: List[int] = []
+        for index, action_run in enumerate(action_runs):
+            if action_run.side_effect_free:
+                running_indices.append(index)
+                continue
+            await run_actions_concurrently(running_indices)
+            running_indices = []
+            action_outputs[index] = await AutomataAgent._arun_action(action_run, semaphore)
+        await run_actions_concurrently(running_indices)
+        return cast(List[str], action_outputs)
+
+    @staticmethod
+    async def _arun_action(action_run: ActionRun, semaphore: asyncio.Semaphore) -> str:
+        if action_run.arun is None:
+            return action_run.run()
+        async with semaphore:
+            return await action_run.arun()
+
     def _execute_tool(self, tool_name: str, tool_input: List[str]) -> str:
         """
         Executes a tool with the given name and input.
@@ -225,23 +772,47 @@ class AutomataAgent(Agent):
         Returns:
             str: The output of the executed tool.
         """
-        tool_found = False
-        tool_output = None
+        tool = self.config.tool_registry.get(tool_name)
+        if tool is None:
+            return ToolNotFoundError(tool_name).__str__()
+
+        processed_tool_input = [ele if ele != "None" else None for ele in tool_input]
+        try:
+            return self.tool_result_cache.get_or_run(
+                tool, tuple(processed_tool_input), self.config.tool_registry.run
+            )
+        except Exception as e:
+            # The failures are reported to the agent, out of the cache so the tool runs again next time
+            return AutomataAgent._format_tool_error(tool_name, e)
+
+    async def _aexecute_tool(self, tool_name: str, tool_input: List[str]) -> str:
+        """
+        Executes a tool with the given name and input through its coroutine.
 
-        for toolkit in self.config.llm_toolkits.values():
-            for tool in toolkit.tools:
-                if tool.name == tool_name:
-                    processed_tool_input = [ele if ele != "None" else None for ele in tool_input]
-                    tool_output = tool.run(tuple(processed_tool_input))
-                    tool_found = True
-                    break
-            if tool_found:
-                break
+        Args:
+            tool_name (str): The name of the tool to execute.
+            tool_input (List[str]): The input arguments for the tool.
 
-        if not tool_found:
+        Returns:
+            str: The output of the executed tool.
+        """
+        tool = self.config.tool_registry.get(tool_name)
+        if tool is None:
             return ToolNotFoundError(tool_name).__str__()
 
-        return cast(str, tool_output)
+        processed_tool_input = [ele if ele != "None" else None for ele in tool_input]
+        try:
+            return await self.tool_result_cache.aget_or_run(
+                tool, tuple(processed_tool_input), self.config.tool_registry.arun
+            )
+        except Exception as e:
+            return AutomataAgent._format_tool_error(tool_name, e)
+
+    @staticmethod
+    def _format_tool_error(tool_name: str, error: Exception) -> str:
+        """Formats the error raised by a tool as the observation of its action."""
+        logger.debug(f"Tool {tool_name} failed with error - {error}")
+        return f"Failed to run the tool {tool_name} with error - {error}"
 
     def _has_helper_agents(self) -> bool:
         """
@@ -274,7 +845,8 @@ class AutomataAgent(Agent):
 
     def _parse_completion_message(self, completion_message: str) -> str:
         """
-        Parses the completion message and replaces placeholders with actual tool outputs.
+        Parses the completion message and replaces placeholders with actual tool outputs,
+        in one pass over the message with the outputs indexed by name.
 
         Args:
             completion_message (str): The completion message with placeholders.
@@ -282,20 +854,15 @@ class AutomataAgent(Agent):
         Returns:
             str: The parsed completion message with placeholders replaced by tool outputs.
         """
-        tool_pattern = r"-\s(tool_output_\d+)\s+-\s(.*?)(?=-\s(tool_output_\d+)|$)"
-        agent_pattern = r"-\s(agent_output_\d+)\s+-\s(.*?)(?=-\s(agent_output_\d+)|$)"
-        outputs = self._extract_outputs(tool_pattern, self.messages)
-
-        if self._has_helper_agents():
-            agent_outputs = self._extract_outputs(agent_pattern, self.messages)
-            outputs.update(agent_outputs)
+        has_helper_agents = self._has_helper_agents()
 
-        for output_name in outputs:
-            completion_message = completion_message.replace(
-                f"{{{output_name}}}", outputs[output_name]
-            )
+        def substitute_output(match: re.Match) -> str:
+            output_name, output_type = match.group(1), match.group(2)
+            if output_type == "agent" and not has_helper_agents:
+                return match.group(0)
+            return self.action_outputs.get(output_name, match.group(0))
 
-        return completion_message
+        return AutomataAgent.OUTPUT_PLACEHOLDER_REGEX.sub(substitute_output, completion_message)
 
     def _build_initial_messages(self, formatters: Dict[str, str]) -> List[OpenAIChatMessage]:
         """
@@ -322,37 +889,80 @@ class AutomataAgent(Agent):
 
         return input_messages
 
-    def _stream_message(self, response_summary: Any):
+    def _stream_message(
+        self,
+        response_summary: Any,
+        on_action: Optional[Callable[[ActionTypes], None]] = None,
+    ):
         """
         Streams the response message from the agent.
 
         Args:
             response_summary (Any): The response summary from the agent.
+            on_action (Optional[Callable[[ActionTypes], None]]): Called with each action of the response as soon as its block closes.
 
         Returns:
             str: The streamed response text.
         """
-        print(colored(f"\n>>> {self.config.config_name.value} Agent:", "green"))
-        latest_accumulation = ""
-        stream_separator = " "
-        response_text = ""
+        self.stream_sink.start(self.config.config_name.value)
+        action_extractor = ActionExtractor()
+        response_chunks: List[str] = []
         for chunk in response_summary:
-            if "content" in chunk["choices"][0]["delta"]:
-                chunk_content = chunk["choices"][0]["delta"]["content"]
-                chunk_content.replace("\\n", "\n")
-                latest_accumulation += chunk_content
-                response_text += chunk_content
-            if stream_separator in latest_accumulation:
-                words = latest_accumulation.split(stream_separator)
-                for word in words[:-1]:
-                    print(colored(str(word), "green"), end=" ", flush=True)
-                latest_accumulation = words[-1]
-        print(colored(str(latest_accumulation), "green"))
-        return response_text
+            chunk_content = AutomataAgent._get_chunk_content(chunk)
+            if not chunk_content:
+                continue
+            response_chunks.append(chunk_content)
+            self.stream_sink.write(chunk_content)
+            if on_action is not None:
+                for action in action_extractor.feed(chunk_content):
+                    on_action(action)
+        self.stream_sink.end()
+        if on_action is not None:
+            for action in action_extractor.close():
+                on_action(action)
+        return "".join(response_chunks)
+
+    async def _astream_message(
+        self,
+        response_summary: Any,
+        on_action: Optional[Callable[[ActionTypes], None]] = None,
+    ):
+        """
+        Streams the response message from the agent as its chunks are received.
+
+        Args:
+            response_summary (Any): The asynchronous response summary from the agent.
+            on_action (Optional[Callable[[ActionTypes], None]]): Called with each action of the response as soon as its block closes.
+
+        Returns:
+            str: The streamed response text.
+        """
+        self.stream_sink.start(self.config.config_name.value)
+        action_extractor = ActionExtractor()
+        response_chunks: List[str] = []
+        async for chunk in response_summary:
+            chunk_content = AutomataAgent._get_chunk_content(chunk)
+            if not chunk_content:
+                continue
+            response_chunks.append(chunk_content)
+            self.stream_sink.write(chunk_content)
+            if on_action is not None:
+                for action in action_extractor.feed(chunk_content):
+                    on_action(action)
+        self.stream_sink.end()
+        if on_action is not None:
+            for action in action_extractor.close():
+                on_action(action)
+        return "".join(response_chunks)
+
+    @staticmethod
+    def _get_chunk_content(chunk: Any) -> str:
+        delta = chunk["choices"][0]["delta"]
+        return delta["content"] if "content" in delta else ""
 
     def _save_message(self, role: str, content: str) -> OpenAIChatMessage:
         """
-        Saves the messagee for the agent.
+        Saves the messagee for the agent, the message is written to the database when the iteration completes.
 
         Args:
             role (str): The role of the messagee.
@@ -360,9 +970,16 @@ class AutomataAgent(Agent):
         """
         self.database_manager.put_message(role, content, len(self.messages))
         message = OpenAIChatMessage(role=role, content=content)
-        self.messages.append(message)
+        self._append_message(message)
         return message
 
+    def _append_message(self, message: OpenAIChatMessage):
+        """Appends a message to the conversation, counting its tokens once."""
+        num_tokens = count_message_tokens(message, self.config.model)
+        self.messages.append(message)
+        self.message_num_tokens.append(num_tokens)
+        self.num_message_tokens += num_tokens
+
     def _execute_agent(self, agent_action: AgentAction) -> str:
         """
         Generate the result from the specified agent_action using the coordinator.
@@ -377,3 +994,18 @@ class AutomataAgent(Agent):
             raise Exception("Agent has no coordinator.")
 
         return self.coordinator.run_agent(agent_action)
+
+    async def _aexecute_agent(self, agent_action: AgentAction) -> str:
+        """
+        Generate the result from the specified agent_action asynchronously using the coordinator.
+
+        Args:
+            agent_action (AgentAction): An instance of an AgentAction to be executed.
+
+        Returns:
+            str: The output generated by the agent.
+        """
+        if not self.coordinator:
+            raise Exception("Agent has no coordinator.")
+
+        return await self.coordinator.arun_agent(agent_action)
@@ -1,25 +1,91 @@
+import atexit
+import logging
+import os
 import sqlite3
-from typing import List
+import threading
+import weakref
+from typing import Dict, List, Tuple
 
 from automata.config import CONVERSATION_DB_PATH
 from automata.core.base.openai import OpenAIChatMessage
 
+logger = logging.getLogger(__name__)
+
+# The connections of this process and their locks, by database path, shared by every conversation
+_connections: Dict[Tuple[int, str], Tuple[sqlite3.Connection, threading.RLock]] = {}
+_connections_lock = threading.Lock()
+# The open conversations, whose pending messages are written when the process exits
+_databases: "weakref.WeakSet[AutomataConversationDatabase]" = weakref.WeakSet()
+
+
+def _get_connection(db_path: str) -> Tuple[sqlite3.Connection, threading.RLock]:
+    """
+    Opens the connection of this process to a database, once, in WAL mode so that readers,
+    e.g. the server, do not block the agents writing their conversations.
+    """
+    # A forked process opens its own connection
+    key = (os.getpid(), db_path)
+    with _connections_lock:
+        if key not in _connections:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Commits in WAL mode stay durable across crashes of the process without syncing
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _connections[key] = (conn, threading.RLock())
+        return _connections[key]
+
+
+def _close_connections() -> None:
+    """
+    Writes the pending messages of the open conversations, then checkpoints and closes the connections
+    of this process, which removes the -wal and -shm files of the databases. Registered to run at exit.
+    """
+    for database in list(_databases):
+        try:
+            database.flush()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write the conversation {database.session_id} due to: {e}")
+    with _connections_lock:
+        for (pid, db_path), (conn, lock) in list(_connections.items()):
+            # A forked process leaves the connections of its parent open
+            if pid != os.getpid():
+                continue
+            with lock:
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to close the database '{db_path}' due to: {e}")
+            del _connections[(pid, db_path)]
+
+
+atexit.register(_close_connections)
+
 
 class AutomataConversationDatabase:
-    def __init__(self, session_id: str):
+    """
+    Persists the conversation of an agent session. The messages are buffered and written in a single
+    transaction by `flush`, which the agent calls once per iteration, and the sessions of a process
+    share one connection to the database.
+    """
+
+    def __init__(self, session_id: str, db_path: str = CONVERSATION_DB_PATH):
         self.session_id = session_id
-        self.conn = sqlite3.connect(CONVERSATION_DB_PATH)
+        self.conn, self._lock = _get_connection(db_path)
         self.cursor = self.conn.cursor()
+        self._pending_messages: List[Tuple[str, int, str, str]] = []
+        self._pending_elisions: List[Tuple[str, int, int, str]] = []
         self._init_database()
+        _databases.add(self)
 
     def __del__(self):
-        """Close the connection to the agent."""
-        if self.conn:
-            self.conn.close()
+        """Writes the pending messages, the connection stays open for the other sessions."""
+        if getattr(self, "conn", None) is not None:
+            self.flush()
 
     def put_message(self, role: str, content: str, interaction_id: int):
         """
-        Inserts the message into the appropriate session and interaction id
+        Buffers the message of the appropriate session and interaction id, until the next flush.
         Args:
             role (str): The role of the message sender (e.g., "user" or "assistant").
             content (str): The content of the message.
@@ -30,30 +96,83 @@ class AutomataConversationDatabase:
         assert self.session_id is not None, "Session ID is not set."
         assert self.conn is not None, "Database connection is not set."
         interaction = OpenAIChatMessage(role=role, content=content)
-        self.cursor.execute(
-            "INSERT OR REPLACE INTO interactions (session_id, interaction_id, role, content) VALUES (?, ?, ?, ?)",
-            (self.session_id, interaction_id, role, content),
-        )
-        self.conn.commit()
+        self._pending_messages.append((self.session_id, interaction_id, role, content))
 
         return interaction
 
+    def put_messages(self, messages: List[OpenAIChatMessage], first_interaction_id: int):
+        """
+        Inserts consecutive messages of the session in a single transaction, with the pending messages.
+        Args:
+            messages (List[OpenAIChatMessage]): The messages.
+            first_interaction_id (int): The interaction id of the first message.
+        """
+        for interaction_id, message in enumerate(messages, first_interaction_id):
+            self.put_message(message.role, message.content, interaction_id)
+        self.flush()
+
+    def put_elision(self, interaction_id: int, num_elided_tokens: int, compacted_content: str):
+        """
+        Records that a message was compacted in the messages sent to the model, at the next flush.
+        Args:
+            interaction_id (int): The interaction id of the compacted message.
+            num_elided_tokens (int): The number of tokens that were elided from the message.
+            compacted_content (str): The content sent to the model in place of the message.
+        """
+        assert self.session_id is not None, "Session ID is not set."
+        assert self.conn is not None, "Database connection is not set."
+        self._pending_elisions.append(
+            (self.session_id, interaction_id, num_elided_tokens, compacted_content)
+        )
+
+    def flush(self):
+        """Writes the pending messages and elisions in a single transaction."""
+        if not self._pending_messages and not self._pending_elisions:
+            return
+        with self._lock, self.conn:
+            self.cursor.executemany(
+                "INSERT OR REPLACE INTO interactions (session_id, interaction_id, role, content) VALUES (?, ?, ?, ?)",
+                self._pending_messages,
+            )
+            self.cursor.executemany(
+                "INSERT OR REPLACE INTO elisions (session_id, interaction_id, num_elided_tokens, compacted_content) VALUES (?, ?, ?, ?)",
+                self._pending_elisions,
+            )
+        self._pending_messages = []
+        self._pending_elisions = []
+
+    def get_elisions(self) -> List[Tuple[int, int, str]]:
+        """
+        Loads the interaction ids of the compacted messages, their numbers of elided tokens and the
+        content sent to the model in their place.
+        """
+        self.flush()
+        with self._lock:
+            self.cursor.execute(
+                "SELECT interaction_id, num_elided_tokens, compacted_content FROM elisions WHERE session_id = ? ORDER BY interaction_id ASC",
+                (self.session_id,),
+            )
+            return list(self.cursor.fetchall())
+
     def get_conversations(self) -> List[OpenAIChatMessage]:
         """Loads previous interactions from the database and populates the messages list."""
-        self.cursor.execute(
-            "SELECT role, content FROM interactions WHERE session_id = ? ORDER BY interaction_id ASC",
-            (self.session_id,),
-        )
-        return [
-            OpenAIChatMessage(role=role, content=content)
-            for (role, content) in self.cursor.fetchall()
-        ]
+        self.flush()
+        with self._lock:
+            self.cursor.execute(
+                "SELECT role, content FROM interactions WHERE session_id = ? ORDER BY interaction_id ASC",
+                (self.session_id,),
+            )
+            return [
+                OpenAIChatMessage(role=role, content=content)
+                for (role, content) in self.cursor.fetchall()
+            ]
 
     def _init_database(self):
-        """Initializes the database connection and creates the interactions table if it does not exist."""
-        self.conn = sqlite3.connect(CONVERSATION_DB_PATH)
-        self.cursor = self.conn.cursor()
-        self.cursor.execute(
-            "\n            CREATE TABLE IF NOT EXISTS interactions (\n                session_id INTEGER,\n                interaction_id INTEGER,\n                role TEXT,\n                content TEXT,\n                PRIMARY KEY (session_id, interaction_id)\n            )\n            "
-        )
-        self.conn.commit()
+        """Creates the interactions and elisions tables if they do not exist."""
+        with self._lock, self.conn:
+            self.cursor.execute(
+                "\n            CREATE TABLE IF NOT EXISTS interactions (\n                session_id INTEGER,\n                interaction_id INTEGER,\n                role TEXT,\n                content TEXT,\n                PRIMARY KEY (session_id, interaction_id)\n            )\n            "
+            )
+            self.cursor.execute(
+                "\n            CREATE TABLE IF NOT EXISTS elisions (\n                session_id INTEGER,\n                interaction_id INTEGER,\n                num_elided_tokens INTEGER,\n                compacted_content TEXT,\n                PRIMARY KEY (session_id, interaction_id)\n            )\n            "
+            )
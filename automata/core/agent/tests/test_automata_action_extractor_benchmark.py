@@ -0,0 +1,97 @@
+import textwrap
+import time
+from typing import List
+
+import pytest
+
+from automata.core.agent.automata_action_extractor import AutomataActionExtractor
+
+BENCHMARK_NUM_ACTIONS = [10, 100, 1000]
+BENCHMARK_NUM_CODE_LINES = 200
+BENCHMARK_CHUNK_SIZE = 16
+
+
+def _build_response(num_actions: int) -> str:
+    """Builds a synthetic agent response alternating reads and writes of long code blocks."""
+    code = "\n".join(
+        f"                    value_{index} = compute(value_{index - 1}, {index})"
+        for index in range(BENCHMARK_NUM_CODE_LINES)
+    )
+    blocks = [
+        textwrap.dedent(
+            """\
+            - thoughts
+                - I will read the modules, then write the new functions and return the result.
+            - actions"""
+        )
+    ]
+    for index in range(num_actions):
+        if index % 2 == 0:
+            blocks.append(
+                textwrap.indent(
+                    textwrap.dedent(
+                        f"""\
+                        - tool_query_{index}
+                            - tool_name
+                                - python-indexer-retrieve-code
+                            - tool_args
+                                - core.module_{index}
+                                - function_{index}"""
+                    ),
+                    "    ",
+                )
+            )
+        else:
+            blocks.append(
+                textwrap.indent(
+                    textwrap.dedent(
+                        f"""\
+                        - tool_query_{index}
+                            - tool_name
+                                - python-writer-update-module
+                            - tool_args
+                                - core.module_{index}
+                                - python"""
+                    ),
+                    "    ",
+                )
+            )
+            blocks.append(f"                ```\n{code}\n                ```")
+    blocks.append("    - return_result_0\n        - Done.\n")
+    return "\n".join(blocks)
+
+
+def _extract_actions_incrementally(text: str) -> List[str]:
+    extractor = AutomataActionExtractor()
+    actions = []
+    for index in range(0, len(text), BENCHMARK_CHUNK_SIZE):
+        actions.extend(extractor.feed(text[index : index + BENCHMARK_CHUNK_SIZE]))
+    actions.extend(extractor.close())
+    return [str(action) for action in actions]
+
+
+@pytest.mark.benchmark
+def test_benchmark_extract_actions():
+    print(
+        f"\nextract_actions over synthetic responses, {BENCHMARK_NUM_CODE_LINES} code lines a write:"
+    )
+    for num_actions in BENCHMARK_NUM_ACTIONS:
+        text = _build_response(num_actions)
+        num_megabytes = len(text) / 1e6
+
+        start = time.perf_counter()
+        actions = [str(action) for action in AutomataActionExtractor.extract_actions(text)]
+        latency = time.perf_counter() - start
+
+        start = time.perf_counter()
+        incremental_actions = _extract_actions_incrementally(text)
+        incremental_latency = time.perf_counter() - start
+
+        print(
+            f"  {num_actions} actions, {num_megabytes:.2f} MB:"
+            f" {latency * 1e3:.1f} ms ({num_megabytes / latency:.1f} MB/s),"
+            f" fed by {BENCHMARK_CHUNK_SIZE} character chunks {incremental_latency * 1e3:.1f} ms"
+            f" ({num_megabytes / incremental_latency:.1f} MB/s)"
+        )
+        assert len(actions) == num_actions + 1
+        assert incremental_actions == actions
@@ -1,6 +1,12 @@
+import asyncio
+import os
+import subprocess
+import sys
 import textwrap
+import threading
 import uuid
-from unittest.mock import MagicMock, patch
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -8,6 +14,16 @@ from automata.configs.automata_agent_configs import AutomataInstructionPayload
 from automata.core.agent.automata_agent import AutomataAgent
 from automata.core.agent.automata_agent_utils import AutomataAgentFactory
 from automata.core.agent.automata_database_manager import AutomataConversationDatabase
+from automata.core.base.completion_cache import CompletionCache
+from automata.core.base.openai import (
+    ContextLengthExceededError,
+    OpenAIChatMessage,
+    count_message_tokens,
+    estimate_num_tokens,
+    get_context_length,
+)
+from automata.core.base.stream_sink import BufferStreamSink
+from automata.core.base.tool import Tool, Toolkit, ToolkitType
 from automata.tool_management.tool_management_utils import build_llm_toolkits
 
 
@@ -56,6 +72,192 @@ def test_save_and_load_interaction(automata_agent):
     assert saved_results[-1].content == "Test message."
 
 
+def test_conversation_database_batches_writes():
+    session_id = str(uuid.uuid4())
+    automata_agent_db = AutomataConversationDatabase(session_id=session_id)
+    reader_db = AutomataConversationDatabase(session_id=session_id)
+
+    # The sessions of a process share a connection to the database, in WAL mode
+    assert automata_agent_db.conn is reader_db.conn
+    assert automata_agent_db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    automata_agent_db.put_message("assistant", "Action.", 0)
+    automata_agent_db.put_message("user", "Observation.", 1)
+    assert reader_db.get_conversations() == []
+
+    automata_agent_db.flush()
+    assert [message.content for message in reader_db.get_conversations()] == [
+        "Action.",
+        "Observation.",
+    ]
+
+    automata_agent_db.put_messages(
+        [
+            OpenAIChatMessage(role="assistant", content="Result."),
+            OpenAIChatMessage(role="user", content="Continue."),
+        ],
+        2,
+    )
+    assert [message.content for message in reader_db.get_conversations()] == [
+        "Action.",
+        "Observation.",
+        "Result.",
+        "Continue.",
+    ]
+
+
+def test_conversation_database_closed_at_exit(tmp_path):
+    db_path = str(tmp_path / "interactions.sqlite3")
+    # The pending messages are written when the process exits, and the WAL files removed
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from automata.core.agent.automata_database_manager import AutomataConversationDatabase\n"
+            f"db = AutomataConversationDatabase('session', {db_path!r})\n"
+            "db.put_message('user', 'Observation.', 0)\n",
+        ],
+        check=True,
+    )
+
+    assert sorted(os.listdir(tmp_path)) == ["interactions.sqlite3"]
+    assert [
+        message.content
+        for message in AutomataConversationDatabase("session", db_path).get_conversations()
+    ] == ["Observation."]
+
+
+def test_save_and_load_elisions():
+    session_id = str(uuid.uuid4())
+    automata_agent_db = AutomataConversationDatabase(session_id=session_id)
+
+    automata_agent_db.put_elision(4, 100, "Compacted observation")
+    automata_agent_db.put_elision(6, 50, "Compacted observation")
+
+    assert automata_agent_db.get_elisions() == [
+        (4, 100, "Compacted observation"),
+        (6, 50, "Compacted observation"),
+    ]
+
+
+def test_save_message_counts_tokens(automata_agent):
+    num_message_tokens = automata_agent.num_message_tokens
+    assert num_message_tokens == sum(automata_agent.message_num_tokens)
+    assert len(automata_agent.message_num_tokens) == len(automata_agent.messages)
+
+    message = automata_agent._save_message("user", "Observation: " + "x" * 1000)
+
+    assert automata_agent.message_num_tokens[-1] == count_message_tokens(
+        message, automata_agent.config.model
+    )
+    assert automata_agent.num_message_tokens == num_message_tokens + count_message_tokens(
+        message, automata_agent.config.model
+    )
+
+
+def test_estimate_num_tokens_errs_on_the_high_side():
+    code = "def f(self, x):\n    return self._cache[x] or {'key': (x + 1) * 2}\n"
+    # The tokenizers use about a token per 3 characters on such code
+    assert estimate_num_tokens(code) >= len(code) / 3
+    assert estimate_num_tokens("Hello world") >= 2
+
+
+def test_compact_messages_within_token_budget(automata_agent):
+    automata_agent.config.num_recent_messages = 2
+    for i in range(4):
+        automata_agent._save_message("assistant", f"Action {i}")
+        automata_agent._save_message("user", f"Observation {i}: " + "x" * 1000)
+    messages = list(automata_agent.messages)
+    automata_agent.config.max_message_tokens = automata_agent.num_message_tokens - 1
+
+    compacted_messages = automata_agent._build_request_messages()
+
+    # The initial and the latest messages are kept verbatim, the oldest observation is compacted
+    assert automata_agent.messages == messages
+    num_default_messages = AutomataAgent.NUM_DEFAULT_MESSAGES
+    assert compacted_messages[:num_default_messages] == messages[:num_default_messages]
+    assert compacted_messages[num_default_messages].content == "Action 0"
+    assert compacted_messages[num_default_messages + 1].content.startswith("Observation 0: x")
+    assert "tokens elided]" in compacted_messages[num_default_messages + 1].content
+    assert compacted_messages[num_default_messages + 2 :] == messages[num_default_messages + 2 :]
+    elisions = automata_agent.database_manager.get_elisions()
+    assert [interaction_id for interaction_id, _, _ in elisions] == [num_default_messages + 1]
+    assert (
+        sum(
+            count_message_tokens(message, automata_agent.config.model)
+            for message in compacted_messages
+        )
+        == automata_agent.num_message_tokens - automata_agent.num_elided_tokens
+        <= automata_agent.config.max_message_tokens
+    )
+
+    # Compaction is stable across turns
+    assert automata_agent._build_request_messages() == compacted_messages
+    assert len(automata_agent.database_manager.get_elisions()) == len(elisions)
+
+    # A resumed session restores the compaction
+    resumed_agent = AutomataAgent(
+        automata_agent.instructions, automata_agent.config.copy(update={"is_new_agent": False})
+    )
+    resumed_agent.setup()
+    assert resumed_agent.messages == messages
+    assert resumed_agent.compacted_messages == automata_agent.compacted_messages
+    assert resumed_agent.num_elided_tokens == automata_agent.num_elided_tokens
+    assert resumed_agent._build_request_messages() == compacted_messages
+
+
+def test_compact_messages_within_token_budget_keeps_recent_messages(automata_agent):
+    automata_agent.config.num_recent_messages = 2
+    for i in range(4):
+        automata_agent._save_message("assistant", f"Action {i}")
+        automata_agent._save_message("user", f"Observation {i}: " + "x" * 1000)
+    messages = list(automata_agent.messages)
+    automata_agent.config.max_message_tokens = 1
+
+    compacted_messages = automata_agent._build_request_messages()
+
+    # Every older message is compacted, the latest ones are sent over budget
+    num_default_messages = AutomataAgent.NUM_DEFAULT_MESSAGES
+    assert compacted_messages[-2:] == messages[-2:]
+    assert all(
+        "tokens elided]" in message.content
+        for message in compacted_messages[num_default_messages + 1 : -2 : 2]
+    )
+
+
+def test_compact_messages_without_token_budget(automata_agent):
+    automata_agent._save_message("user", "x" * 1000)
+
+    assert automata_agent._build_request_messages() == automata_agent.messages
+
+
+def test_compact_messages_to_context_length(automata_agent):
+    automata_agent.config.num_recent_messages = 2
+    for i in range(4):
+        automata_agent._save_message("assistant", f"Action {i}")
+        automata_agent._save_message("user", f"Observation {i}: " + "x" * 10000)
+
+    compacted_messages = automata_agent._build_request_messages()
+
+    # Without a configured budget the messages are compacted to fit the context of the model
+    assert "tokens elided]" in compacted_messages[AutomataAgent.NUM_DEFAULT_MESSAGES + 1].content
+    assert automata_agent.num_message_tokens - automata_agent.num_elided_tokens <= (
+        get_context_length(automata_agent.config.model)
+        - AutomataAgent.NUM_RESERVED_COMPLETION_TOKENS
+    )
+
+
+@patch("openai.ChatCompletion.create")
+def test_refuses_request_exceeding_context_length(
+    mock_openai_chatcompletion_create, automata_agent
+):
+    automata_agent._save_message("user", "x" * 1000000)
+
+    with pytest.raises(ContextLengthExceededError):
+        automata_agent.iter_task()
+    mock_openai_chatcompletion_create.assert_not_called()
+
+
 @patch("openai.ChatCompletion.create")
 def test_iter_task_without_api_call(mock_openai_chatcompletion_create, automata_agent):
     # Mock the API response
@@ -71,6 +273,32 @@ def test_iter_task_without_api_call(mock_openai_chatcompletion_create, automata_
     assert assistant_message.content == "The dummy_tool has been tested successfully."
     assert user_message.content, AutomataAgent.CONTINUE_MESSAGE
     assert len(automata_agent.messages) == 5
+    # The messages of the iteration are written once it completes
+    assert (
+        AutomataConversationDatabase(automata_agent.config.session_id).get_conversations()
+        == automata_agent.messages
+    )
+
+
+@patch("openai.ChatCompletion.create")
+def test_iter_task_replays_cached_completions(
+    mock_openai_chatcompletion_create, automata_agent, tmp_path
+):
+    mock_openai_chatcompletion_create.return_value = {
+        "choices": [{"message": {"content": "The dummy_tool has been tested successfully."}}]
+    }
+    automata_agent.config.temperature = 0
+    automata_agent.completion_cache = CompletionCache(str(tmp_path))
+    messages = list(automata_agent.messages)
+
+    automata_agent.iter_task()
+
+    # A rerun of the same conversation replays the completion offline
+    automata_agent.messages = messages
+    automata_agent.config.completion_cache_offline = True
+    assistant_message, _ = automata_agent.iter_task()
+    assert assistant_message.content == "The dummy_tool has been tested successfully."
+    assert mock_openai_chatcompletion_create.call_count == 1
 
 
 @patch("openai.ChatCompletion.create")
@@ -90,6 +318,132 @@ def test_max_iters_without_api_call(mock_openai_chatcompletion_create, automata_
     assert len(automata_agent.messages) == max_iters * 2 + AutomataAgent.NUM_DEFAULT_MESSAGES + 1
 
 
+def test_generate_observations_runs_side_effect_free_tools_concurrently(automata_agent):
+    events = []
+    # Both reads must be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def read(tool_input):
+        barrier.wait()
+        events.append(f"read {tool_input[0]}")
+        return f"read {tool_input[0]}"
+
+    def write(tool_input):
+        events.append(f"write {tool_input[0]}")
+        return f"wrote {tool_input[0]}"
+
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [
+                Tool(name="read", func=read, description="", side_effect_free=True),
+                Tool(name="write", func=write, description=""),
+            ]
+        )
+    }
+    response_text = textwrap.dedent(
+        """
+        - actions
+            - tool_query_0
+                - tool_name
+                    - read
+                - tool_args
+                    - a
+            - tool_query_1
+                - tool_name
+                    - read
+                - tool_args
+                    - b
+            - tool_query_2
+                - tool_name
+                    - write
+                - tool_args
+                    - c
+            - tool_query_3
+                - tool_name
+                    - missing-tool
+                - tool_args
+                    - d
+        """
+    )
+
+    observations = automata_agent._generate_observations(response_text)
+
+    assert list(observations.items()) == [
+        ("tool_output_0", "read a"),
+        ("tool_output_1", "read b"),
+        ("tool_output_2", "wrote c"),
+        ("tool_output_3", "Error: Tool 'missing-tool' not found."),
+    ]
+    assert sorted(events[:2]) == ["read a", "read b"]
+    assert events[2] == "write c"
+
+
+@patch("openai.ChatCompletion.create")
+def test_iter_task_runs_tools_while_streaming(mock_openai_chatcompletion_create, automata_agent):
+    events = []
+    read_done = threading.Event()
+
+    def read(tool_input):
+        events.append(f"read {tool_input[0]}")
+        read_done.set()
+        return f"read {tool_input[0]}"
+
+    def write(tool_input):
+        events.append(f"write {tool_input[0]}")
+        return f"wrote {tool_input[0]}"
+
+    automata_agent.config.stream = True
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [
+                Tool(name="read", func=read, description="", side_effect_free=True),
+                Tool(name="write", func=write, description=""),
+            ]
+        )
+    }
+    response_text = textwrap.dedent(
+        """\
+        - actions
+            - tool_query_0
+                - tool_name
+                    - read
+                - tool_args
+                    - a
+            - tool_query_1
+                - tool_name
+                    - write
+                - tool_args
+                    - b
+            - tool_query_2
+                - tool_name
+                    - read
+                - tool_args
+                    - c
+        """
+    )
+    lines = response_text.splitlines(keepends=True)
+
+    def stream_response():
+        for index, line in enumerate(lines):
+            if index == 8:
+                # The first read runs once its block closes, before the response is complete
+                assert read_done.wait(5)
+                events.append("streamed tool_query_1")
+            yield {"choices": [{"delta": {"content": line}}]}
+
+    mock_openai_chatcompletion_create.return_value = stream_response()
+    automata_agent.stream_sink = BufferStreamSink()
+
+    assistant_message, user_message = automata_agent.iter_task()
+
+    assert assistant_message.content == response_text
+    assert automata_agent.stream_sink.completions == [response_text]
+    # The actions after the write wait for the response and for the write
+    assert events == ["read a", "streamed tool_query_1", "write b", "read c"]
+    assert "wrote b" in user_message.content
+    assert "read c" in user_message.content
+
+
 def mock_openai_response_with_completion_message():
     return {
         "choices": [
@@ -255,3 +609,169 @@ def test_iter_task_with_parsed_completion_message_main_2(
     completion_message = automata_agent.messages[-1].content
     stripped_completion_message = [ele.strip() for ele in completion_message.split("\n")]
     assert stripped_completion_message[0] == "{agent_query_0}"
+
+
+def test_parse_completion_message_substitutes_indexed_outputs(automata_agent):
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [Tool(name="read", func=lambda tool_input: f"read {tool_input[0]}\n", description="")]
+        )
+    }
+    response_text = textwrap.dedent(
+        """
+        - actions
+            - tool_query_0
+                - tool_name
+                    - read
+                - tool_args
+                    - a
+            - tool_query_1
+                - tool_name
+                    - read
+                - tool_args
+                    - b
+        """
+    )
+    automata_agent._generate_observations(response_text)
+    automata_agent._generate_observations(response_text.replace("- b", "- c"))
+
+    completion_message = automata_agent._parse_completion_message(
+        "{tool_output_0}, {tool_output_1}, {tool_output_2} and {agent_output_0}"
+    )
+
+    # The latest output of each name is substituted, unknown placeholders are kept
+    assert completion_message == "read a, read c, {tool_output_2} and {agent_output_0}"
+
+
+def test_execute_tool_reports_failures_without_caching_them(automata_agent):
+    calls = []
+
+    def read(tool_input):
+        calls.append(tool_input)
+        if len(calls) == 1:
+            raise ValueError("Module not found")
+        return f"read {tool_input[0]}"
+
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [Tool(name="read", func=read, description="", cacheable=True)]
+        )
+    }
+
+    assert (
+        automata_agent._execute_tool("read", ["a"])
+        == "Failed to run the tool read with error - Module not found"
+    )
+    assert automata_agent._execute_tool("read", ["a"]) == "read a"
+    assert asyncio.run(automata_agent._aexecute_tool("read", ["a"])) == "read a"
+    assert len(calls) == 2
+
+
+def test_generate_observations_reports_turn_context_errors(automata_agent):
+    @contextmanager
+    def failing_turn_context():
+        yield
+        raise OSError("disk full")
+
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [Tool(name="read", func=lambda tool_input: "read", description="")]
+        ),
+        ToolkitType.PYTHON_WRITER: Toolkit(
+            [Tool(name="write", func=lambda tool_input: "Success", description="")],
+            turn_context=failing_turn_context,
+        ),
+    }
+    response_text = textwrap.dedent(
+        """
+        - actions
+            - tool_query_0
+                - tool_name
+                    - read
+                - tool_args
+                    - a
+            - tool_query_1
+                - tool_name
+                    - write
+                - tool_args
+                    - b
+        """
+    )
+
+    observations = automata_agent._generate_observations(response_text)
+
+    # The outputs of the toolkit whose turn failed are replaced, the others are kept
+    assert observations["tool_output_0"] == "read"
+    assert "rolled back" in observations["tool_output_1"]
+    assert "disk full" in observations["tool_output_1"]
+
+
+@patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+def test_arun_with_completion_message(mock_openai_chatcompletion_acreate, automata_agent):
+    mock_openai_chatcompletion_acreate.return_value = (
+        mock_openai_response_with_completion_message()
+    )
+
+    result = asyncio.run(automata_agent.arun())
+
+    assert automata_agent.completed
+    assert result.startswith("AutomataAgent is imported in the following files")
+    assert mock_openai_chatcompletion_acreate.await_count == 1
+
+
+@patch("openai.ChatCompletion.acreate", new_callable=AsyncMock)
+def test_aiter_task_streams_and_awaits_tools(mock_openai_chatcompletion_acreate, automata_agent):
+    both_reads_started = asyncio.Event()
+    started_reads = []
+
+    async def read(tool_input):
+        # Both reads must be awaited at the same time to complete
+        started_reads.append(tool_input[0])
+        if len(started_reads) == 2:
+            both_reads_started.set()
+        await asyncio.wait_for(both_reads_started.wait(), 5)
+        return f"read {tool_input[0]}"
+
+    automata_agent.config.stream = True
+    automata_agent.config.llm_toolkits = {
+        ToolkitType.PYTHON_RETRIEVER: Toolkit(
+            [
+                Tool(
+                    name="read",
+                    func=lambda tool_input: "not awaited",
+                    coroutine=read,
+                    description="",
+                    side_effect_free=True,
+                ),
+            ]
+        )
+    }
+    response_text = textwrap.dedent(
+        """\
+        - actions
+            - tool_query_0
+                - tool_name
+                    - read
+                - tool_args
+                    - a
+            - tool_query_1
+                - tool_name
+                    - read
+                - tool_args
+                    - b
+        """
+    )
+
+    async def stream_response():
+        for index in range(0, len(response_text), 7):
+            yield {"choices": [{"delta": {"content": response_text[index : index + 7]}}]}
+        yield {"choices": [{"delta": {}}]}
+
+    mock_openai_chatcompletion_acreate.return_value = stream_response()
+
+    assistant_message, user_message = asyncio.run(automata_agent.aiter_task())
+
+    assert assistant_message.content == response_text
+    assert "read a" in user_message.content
+    assert "read b" in user_message.content
+    assert mock_openai_chatcompletion_acreate.call_args.kwargs["stream"]
@@ -257,3 +257,73 @@ def test_extract_actions_8():
     )
     actions = ActionExtractor.extract_actions(text)
     assert len(actions) == 1
+
+
+def test_extract_actions_incrementally():
+    text = textwrap.dedent(
+        """
+        - thoughts
+            - I will retrieve the code, then write a new function and return.
+        - actions
+            - tool_query_0
+                - tool_name
+                    - python-indexer-retrieve-code
+                - tool_args
+                    - core.utils
+                    - calculate_similarity
+            - tool_query_1
+                - tool_name
+                    - automata-writer-modify-module
+                - tool_args
+                    - Modify the code in the Automata agent.
+                    - python
+                    ```
+                    def f(x: int) -> int:
+                        return 0
+                    ```
+            - agent_query_2
+                - agent_version
+                    - automata_indexer_dev
+                - agent_instruction
+                    - Retrieve the code for the function 'run' from AutomataAgent.
+            - return_result_0
+                - Function 'run' has been added to core.tests.sample_code.test.
+        """
+    )
+    expected_actions = [str(action) for action in ActionExtractor.extract_actions(text)]
+
+    for chunk_size in (1, 7, 64, len(text)):
+        extractor = ActionExtractor()
+        actions = []
+        for index in range(0, len(text), chunk_size):
+            actions.extend(extractor.feed(text[index : index + chunk_size]))
+        actions.extend(extractor.close())
+        assert [str(action) for action in actions] == expected_actions
+
+
+def test_extract_actions_incrementally_emits_closed_blocks():
+    extractor = ActionExtractor()
+    first_block = textwrap.dedent(
+        """\
+        - actions
+            - tool_query_0
+                - tool_name
+                    - python-indexer-retrieve-code
+                - tool_args
+                    - core.utils
+        """
+    )
+
+    assert extractor.feed(first_block) == []
+    # The block closes when the next action starts
+    assert extractor.feed("    - tool_query_1\n") == []
+    actions = extractor.feed("        - tool_name\n")
+    assert len(actions) == 1
+    assert actions[0].tool_name == "python-indexer-retrieve-code"
+    assert actions[0].tool_args == ["core.utils"]
+
+    actions = extractor.feed("            - python-indexer-retrieve-docstring")
+    assert actions == []
+    actions = extractor.close()
+    assert len(actions) == 1
+    assert actions[0].tool_name == "python-indexer-retrieve-docstring"
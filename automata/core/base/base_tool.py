@@ -13,6 +13,10 @@ class BaseTool(BaseModel):
     description: str
     return_direct: bool = False
     verbose: bool = False
+    # Tools without side effects may run concurrently with the other tools of an agent turn
+    side_effect_free: bool = False
+    # The output of cacheable tools only depends on their input and the state of the repository
+    cacheable: bool = False
 
     class Config:
         """Configuration for this pydantic object."""
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCacheMissError(Exception):
+    """Raised when an offline client is asked for a completion that is not cached."""
+
+    pass
+
+
+class CompletionCache:
+    """
+    Stores chat completions on disk, one JSON file per request, keyed by the model, the temperature
+    and a hash of the messages. A completion is only reused for an identical request, so the cache
+    is meant for deterministic requests, at temperature 0 or when replaying evals.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir (str): The directory of the cached completions, created if missing.
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_key(model: str, temperature: float, messages: List[Dict[str, str]]) -> str:
+        """Hashes a chat completion request into a cache key."""
+        messages_hash = hashlib.sha256(
+            json.dumps(messages, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return hashlib.sha256(f"{model}:{temperature}:{messages_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, temperature: float, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Loads the cached completion of a request.
+
+        Returns:
+            Optional[str]: The completion, or None if the request is not cached.
+        """
+        try:
+            with open(self._get_path(CompletionCache.get_key(model, temperature, messages))) as f:
+                completion = json.load(f)["completion"]
+        except (OSError, ValueError, KeyError):
+            completion = None
+        with self._lock:
+            if completion is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return completion
+
+    def put(
+        self, model: str, temperature: float, messages: List[Dict[str, str]], completion: str
+    ) -> None:
+        """Stores the completion of a request, replacing the file atomically for concurrent readers."""
+        key = CompletionCache.get_key(model, temperature, messages)
+        entry = {
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "completion": completion,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._get_path(key))
+        except OSError as e:
+            logger.error(f"Failed to cache the completion {key} due to: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+class CachedChatCompletion:
+    """
+    A local stand-in for openai.ChatCompletion which serves cached completions, in the shape of the
+    OpenAI responses, and requests and caches the completions it misses. An offline client raises on
+    a miss instead, so reruns replay without network access.
+    """
+
+    def __init__(self, cache: CompletionCache, client: Any = None, offline: bool = False):
+        """
+        Args:
+            cache (CompletionCache): The cache of the completions.
+            client (Any): The client requesting the missed completions, openai.ChatCompletion by default.
+            offline (bool): Whether to raise on a miss rather than request the completion.
+        """
+        self.cache = cache
+        self.client = client
+        self.offline = offline
+
+    def create(
+        self, model: str, messages: List[Dict[str, str]], temperature: float, stream: bool = False
+    ) -> Any:
+        """
+        Returns the completion of a request like openai.ChatCompletion.create, a stream of chunks
+        when streaming.
+
+        Raises:
+            CompletionCacheMissError: If the client is offline and the completion is not cached.
+        """
+        completion = self.cache.get(model, temperature, messages)
+        if completion is not None:
+            return (
+                CachedChatCompletion._iter_chunks(completion)
+                if stream
+                else CachedChatCompletion._build_response(completion)
+            )
+        self._check_online(model)
+        response = self._get_client().create(
+            model=model, messages=messages, temperature=temperature, stream=stream
+        )
+        if stream:
+            return self._cache_chunks(response, model, temperature, messages)
+        self.cache.put(model, temperature, messages, response["choices"][0]["message"]["content"])
+        return response
+
+    async def acreate(
+        self, model: str, messages: List[Dict[str, str]], temperature: float, stream: bool = False
+    ) -> Any:
+        """
+        Returns the completion of a request like openai.ChatCompletion.acreate, an async stream of
+        chunks when streaming.
+
+        Raises:
+            CompletionCacheMissError: If the client is offline and the completion is not cached.
+        """
+        completion = self.cache.get(model, temperature, messages)
+        if completion is not None:
+            return (
+                CachedChatCompletion._aiter_chunks(completion)
+                if stream
+                else CachedChatCompletion._build_response(completion)
+            )
+        self._check_online(model)
+        response = await self._get_client().acreate(
+            model=model, messages=messages, temperature=temperature, stream=stream
+        )
+        if stream:
+            return self._acache_chunks(response, model, temperature, messages)
+        self.cache.put(model, temperature, messages, response["choices"][0]["message"]["content"])
+        return response
+
+    def _get_client(self) -> Any:
+        return self.client if self.client is not None else openai.ChatCompletion
+
+    def _check_online(self, model: str) -> None:
+        if self.offline:
+            raise CompletionCacheMissError(
+                f"No cached completion of {model} for the request in {self.cache.cache_dir}"
+            )
+
+    def _cache_chunks(
+        self, chunks: Any, model: str, temperature: float, messages: List[Dict[str, str]]
+    ) -> Iterator[Any]:
+        """Passes the chunks of a stream through, caching the completion once the stream ends."""
+        contents = []
+        for chunk in chunks:
+            contents.append(chunk["choices"][0]["delta"].get("content", ""))
+            yield chunk
+        self.cache.put(model, temperature, messages, "".join(contents))
+
+    async def _acache_chunks(
+        self, chunks: Any, model: str, temperature: float, messages: List[Dict[str, str]]
+    ) -> AsyncIterator[Any]:
+        contents = []
+        async for chunk in chunks:
+            contents.append(chunk["choices"][0]["delta"].get("content", ""))
+            yield chunk
+        self.cache.put(model, temperature, messages, "".join(contents))
+
+    @staticmethod
+    def _build_response(completion: str) -> Dict[str, Any]:
+        return {"choices": [{"message": {"role": "assistant", "content": completion}}]}
+
+    @staticmethod
+    def _iter_chunks(completion: str) -> Iterator[Dict[str, Any]]:
+        yield {"choices": [{"delta": {"role": "assistant"}}]}
+        yield {"choices": [{"delta": {"content": completion}}]}
+
+    @staticmethod
+    async def _aiter_chunks(completion: str) -> AsyncIterator[Dict[str, Any]]:
+        for chunk in CachedChatCompletion._iter_chunks(completion):
+            yield chunk
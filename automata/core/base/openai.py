@@ -3,6 +3,7 @@ This file defines the classes for how to manage prompts for different types of
 models, i.e., "chat models" vs. "non chat models".
 """
 import logging
+import re
 import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -26,6 +27,92 @@ class OpenAIChatMessage(NamedTuple):
 
 OpenAICreateChatPrompt = List[OpenAIChatMessage]  # A chat log is a list of messages
 
+# The average number of characters per token of English words with the OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+# Words, single punctuation characters and runs of whitespace, see estimate_num_tokens
+ESTIMATE_TOKEN_REGEX = re.compile(r"\w+|[^\w\s]|\s+")
+# The number of tokens the chat format adds to each message, and to prime the reply
+NUM_TOKENS_PER_MESSAGE = 4
+NUM_TOKENS_PER_REPLY = 3
+# The context lengths of the chat models, by model name prefix
+MODEL_CONTEXT_LENGTHS = {
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-3.5-turbo": 4096,
+}
+DEFAULT_CONTEXT_LENGTH = 4096
+
+# The encoders loaded in this process, by model, None when the encoder cannot be loaded
+_encoders: Dict[str, Any] = {}
+
+
+class ContextLengthExceededError(Exception):
+    """Raised when the messages of a chat completion do not fit in the context of the model."""
+
+    pass
+
+
+def estimate_num_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text without an encoder. The estimate errs on the high side,
+    so the context checks refuse a request rather than exceed the context of the model: each word
+    counts one token per CHARS_PER_TOKEN characters, and each punctuation character or run of
+    whitespace one token, which is more than the tokenizers use for code, dense in symbols.
+    """
+    num_tokens = 0
+    for piece in ESTIMATE_TOKEN_REGEX.findall(text):
+        if piece[0].isspace() or len(piece) == 1:
+            num_tokens += 1
+        else:
+            num_tokens += (len(piece) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return num_tokens
+
+
+def get_encoder(model: str) -> Any:
+    """
+    Loads the tiktoken encoder of a model, once per process.
+
+    Args:
+        model (str): The name of the model.
+
+    Returns:
+        Any: The encoder, or None if tiktoken is not installed or the encoding cannot be loaded.
+    """
+    with ENCODER_LOCK:
+        if model not in _encoders:
+            try:
+                import tiktoken
+
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                logger.debug(
+                    f"Estimating token counts, the encoder of {model} is unavailable: {e}"
+                )
+                _encoders[model] = None
+        return _encoders[model]
+
+
+def count_num_tokens(text: str, model: str) -> int:
+    """Counts the tokens of a text with the encoder of a model, or estimates them without it."""
+    encoder = get_encoder(model)
+    if encoder is None:
+        return estimate_num_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(message: OpenAIChatMessage, model: str) -> int:
+    """Counts the tokens a chat message takes in the context of a model."""
+    return count_num_tokens(message.content, model) + NUM_TOKENS_PER_MESSAGE
+
+
+def get_context_length(model: str) -> int:
+    """Returns the maximum number of tokens of the messages and the completion of a model."""
+    for model_prefix, context_length in MODEL_CONTEXT_LENGTHS.items():
+        if model.startswith(model_prefix):
+            return context_length
+    return DEFAULT_CONTEXT_LENGTH
+
 
 def chat_prompt_to_text_prompt(prompt: OpenAICreateChatPrompt, for_completion: bool = True) -> str:
     """
@@ -0,0 +1,136 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable, List
+
+from termcolor import colored
+
+logger = logging.getLogger(__name__)
+
+
+class StreamSink(ABC):
+    """
+    Receives the chunks of a streamed completion. Sinks buffer the incomplete parts of the stream in
+    lists, so a long completion is rendered in linear time.
+    """
+
+    @abstractmethod
+    def start(self, agent_name: str) -> None:
+        """Called before the first chunk of a completion of an agent."""
+        pass
+
+    @abstractmethod
+    def write(self, text: str) -> None:
+        """Called with each chunk of the completion."""
+        pass
+
+    @abstractmethod
+    def end(self) -> None:
+        """Called after the last chunk of the completion."""
+        pass
+
+
+class TerminalStreamSink(StreamSink):
+    """Prints the completions to the terminal, one complete word at a time."""
+
+    def __init__(self) -> None:
+        self._partial_word: List[str] = []
+
+    def start(self, agent_name: str) -> None:
+        print(colored(f"\n>>> {agent_name} Agent:", "green"))
+        self._partial_word = []
+
+    def write(self, text: str) -> None:
+        separator_index = text.rfind(" ")
+        if separator_index == -1:
+            self._partial_word.append(text)
+            return
+        self._partial_word.append(text[:separator_index])
+        print(colored("".join(self._partial_word), "green"), end=" ", flush=True)
+        self._partial_word = [text[separator_index + 1 :]]
+
+    def end(self) -> None:
+        print(colored("".join(self._partial_word), "green"))
+        self._partial_word = []
+
+
+class LoggingStreamSink(StreamSink):
+    """Logs the completions, one complete line at a time."""
+
+    def __init__(self, stream_logger: logging.Logger = logger, level: int = logging.INFO) -> None:
+        self.stream_logger = stream_logger
+        self.level = level
+        self._agent_name = ""
+        self._partial_line: List[str] = []
+
+    def start(self, agent_name: str) -> None:
+        self._agent_name = agent_name
+        self._partial_line = []
+
+    def write(self, text: str) -> None:
+        if "\n" not in text:
+            self._partial_line.append(text)
+            return
+        lines = text.split("\n")
+        self._partial_line.append(lines[0])
+        self._log_line("".join(self._partial_line))
+        for line in lines[1:-1]:
+            self._log_line(line)
+        self._partial_line = [lines[-1]]
+
+    def end(self) -> None:
+        partial_line = "".join(self._partial_line)
+        if partial_line:
+            self._log_line(partial_line)
+        self._partial_line = []
+
+    def _log_line(self, line: str) -> None:
+        self.stream_logger.log(self.level, f"{self._agent_name} Agent: {line}")
+
+
+class BufferStreamSink(StreamSink):
+    """Keeps the completions in memory, e.g. to return them from a server or to test the streaming."""
+
+    def __init__(self) -> None:
+        self.completions: List[str] = []
+        self._chunks: List[str] = []
+
+    def start(self, agent_name: str) -> None:
+        self._chunks = []
+
+    def write(self, text: str) -> None:
+        self._chunks.append(text)
+
+    def end(self) -> None:
+        self.completions.append(self.getvalue())
+
+    def getvalue(self) -> str:
+        """Returns the text of the current, or latest, completion."""
+        return "".join(self._chunks)
+
+
+class ServerSentEventStreamSink(StreamSink):
+    """
+    Forwards the completions as server-sent events, a `start` event with the name of the agent, one
+    `message` event per chunk, with the chunk encoded as a JSON string, and an `end` event.
+    """
+
+    def __init__(self, send: Callable[[str], None]) -> None:
+        """
+        Args:
+            send (Callable[[str], None]): Sends a formatted event to the client, e.g. the write method of a response.
+        """
+        self.send = send
+
+    def start(self, agent_name: str) -> None:
+        self.send(ServerSentEventStreamSink.format_event("start", agent_name))
+
+    def write(self, text: str) -> None:
+        self.send(ServerSentEventStreamSink.format_event("message", json.dumps(text)))
+
+    def end(self) -> None:
+        self.send(ServerSentEventStreamSink.format_event("end", ""))
+
+    @staticmethod
+    def format_event(event: str, data: str) -> str:
+        return f"event: {event}\ndata: {data}\n\n"
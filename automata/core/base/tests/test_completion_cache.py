@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from automata.core.base.completion_cache import (
+    CachedChatCompletion,
+    CompletionCache,
+    CompletionCacheMissError,
+)
+
+MESSAGES = [{"role": "system", "content": "You are a helpful assistant."}]
+
+
+def _build_response(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+def _build_chunks(contents):
+    return [{"choices": [{"delta": {"content": content}}]} for content in contents]
+
+
+def test_completion_cache_is_keyed_by_request(tmp_path):
+    completion_cache = CompletionCache(str(tmp_path))
+    completion_cache.put("gpt-4", 0, MESSAGES, "Hello")
+
+    assert completion_cache.get("gpt-4", 0, MESSAGES) == "Hello"
+    assert completion_cache.get("gpt-3.5-turbo", 0, MESSAGES) is None
+    assert completion_cache.get("gpt-4", 0.5, MESSAGES) is None
+    assert completion_cache.get("gpt-4", 0, MESSAGES + MESSAGES) is None
+    assert (completion_cache.hits, completion_cache.misses) == (1, 3)
+
+    # The completions persist across processes
+    assert CompletionCache(str(tmp_path)).get("gpt-4", 0, MESSAGES) == "Hello"
+
+
+def test_cached_chat_completion_replays_requests(tmp_path):
+    client = MagicMock()
+    client.create.return_value = _build_response("Hello")
+    cached_chat_completion = CachedChatCompletion(CompletionCache(str(tmp_path)), client=client)
+
+    for _ in range(2):
+        response = cached_chat_completion.create(model="gpt-4", messages=MESSAGES, temperature=0)
+        assert response["choices"][0]["message"]["content"] == "Hello"
+    assert client.create.call_count == 1
+
+    offline_chat_completion = CachedChatCompletion(CompletionCache(str(tmp_path)), offline=True)
+    response = offline_chat_completion.create(model="gpt-4", messages=MESSAGES, temperature=0)
+    assert response["choices"][0]["message"]["content"] == "Hello"
+    with pytest.raises(CompletionCacheMissError):
+        offline_chat_completion.create(model="gpt-4", messages=MESSAGES, temperature=1)
+
+
+def test_cached_chat_completion_replays_streams(tmp_path):
+    client = MagicMock()
+    client.create.return_value = iter(_build_chunks(["Hel", "lo"]))
+    cached_chat_completion = CachedChatCompletion(CompletionCache(str(tmp_path)), client=client)
+
+    chunks = cached_chat_completion.create(
+        model="gpt-4", messages=MESSAGES, temperature=0, stream=True
+    )
+    assert [chunk["choices"][0]["delta"]["content"] for chunk in chunks] == ["Hel", "lo"]
+
+    chunks = cached_chat_completion.create(
+        model="gpt-4", messages=MESSAGES, temperature=0, stream=True
+    )
+    assert "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks) == "Hello"
+    assert client.create.call_count == 1
+
+
+def test_cached_chat_completion_replays_async_requests(tmp_path):
+    client = MagicMock()
+    client.acreate = AsyncMock(return_value=_build_response("Hello"))
+    cached_chat_completion = CachedChatCompletion(CompletionCache(str(tmp_path)), client=client)
+
+    async def create_twice():
+        responses = []
+        for _ in range(2):
+            response = await cached_chat_completion.acreate(
+                model="gpt-4", messages=MESSAGES, temperature=0
+            )
+            responses.append(response)
+        return responses
+
+    responses = asyncio.run(create_twice())
+
+    assert [response["choices"][0]["message"]["content"] for response in responses] == [
+        "Hello",
+        "Hello",
+    ]
+    assert client.acreate.await_count == 1
@@ -0,0 +1,59 @@
+import logging
+
+from automata.core.base.stream_sink import (
+    BufferStreamSink,
+    LoggingStreamSink,
+    ServerSentEventStreamSink,
+    TerminalStreamSink,
+)
+
+CHUNKS = ["- tho", "ughts\n    - I will", " use ", "the tool", ".\n- act", "ions"]
+
+
+def _stream(stream_sink, chunks=CHUNKS):
+    stream_sink.start("automata_main_dev")
+    for chunk in chunks:
+        stream_sink.write(chunk)
+    stream_sink.end()
+
+
+def test_terminal_stream_sink_prints_complete_words(capsys):
+    _stream(TerminalStreamSink())
+
+    output = capsys.readouterr().out
+    assert ">>> automata_main_dev Agent:" in output
+    assert "".join(CHUNKS) in output.replace("\x1b[32m", "").replace("\x1b[0m", "")
+
+
+def test_logging_stream_sink_logs_complete_lines(caplog):
+    with caplog.at_level(logging.INFO):
+        _stream(LoggingStreamSink())
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "automata_main_dev Agent: - thoughts",
+        "automata_main_dev Agent:     - I will use the tool.",
+        "automata_main_dev Agent: - actions",
+    ]
+
+
+def test_buffer_stream_sink_keeps_completions():
+    buffer_stream_sink = BufferStreamSink()
+
+    _stream(buffer_stream_sink)
+    _stream(buffer_stream_sink, ["Done"])
+
+    assert buffer_stream_sink.completions == ["".join(CHUNKS), "Done"]
+    assert buffer_stream_sink.getvalue() == "Done"
+
+
+def test_server_sent_event_stream_sink_forwards_chunks():
+    events = []
+
+    _stream(ServerSentEventStreamSink(events.append), ["- thoughts\n", "done"])
+
+    assert events == [
+        "event: start\ndata: automata_main_dev\n\n",
+        'event: message\ndata: "- thoughts\\n"\n\n',
+        'event: message\ndata: "done"\n\n',
+        "event: end\ndata: \n\n",
+    ]
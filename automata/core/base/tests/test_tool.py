@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import contextmanager
 from typing import Optional, Tuple
 
 import pytest
@@ -41,6 +43,12 @@ async def test_tool_arun(test_tool):
     assert response == "TestTool async response"
 
 
+def test_tool_arun_without_coroutine():
+    plain_tool = Tool(name="PlainTool", description="", func=lambda x: f"PlainTool {x[0]}")
+    response = asyncio.run(plain_tool.arun(("test",)))
+    assert response == "PlainTool test"
+
+
 def test_invalid_tool():
     invalid_tool = InvalidTool()
     response = invalid_tool.run(("InvalidToolName",))
@@ -90,6 +98,22 @@ def test_toolkit():
     assert toolkit.tools[0].name == "TestTool"
 
 
+def test_toolkit_turn_context():
+    events = []
+
+    @contextmanager
+    def turn_context():
+        events.append("enter")
+        yield
+        events.append("exit")
+
+    with Toolkit([]).turn_context():
+        pass
+    with Toolkit([], turn_context=turn_context).turn_context():
+        events.append("run")
+    assert events == ["enter", "run", "exit"]
+
+
 def test_toolkit_type():
     assert len(ToolkitType) == 4
     assert ToolkitType.PYTHON_RETRIEVER.name == "PYTHON_RETRIEVER"
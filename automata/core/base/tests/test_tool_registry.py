@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from automata.configs.automata_agent_configs import AutomataAgentConfig
+from automata.core.base.tool import Tool, Toolkit, ToolkitType
+from automata.core.base.tool_registry import ToolRegistry
+
+
+def _build_tool(name: str, seconds: float = 0.0) -> Tool:
+    def run(tool_input):
+        time.sleep(seconds)
+        return f"{name} {tool_input[0]}"
+
+    return Tool(name=name, func=run, description="")
+
+
+def test_tool_registry_dispatch_and_stats():
+    tool_registry = ToolRegistry(
+        {
+            ToolkitType.PYTHON_RETRIEVER: Toolkit(
+                [_build_tool("fast"), _build_tool("slow", 0.02)]
+            ),
+            ToolkitType.PYTHON_WRITER: Toolkit([_build_tool("write")]),
+        }
+    )
+
+    assert len(tool_registry) == 3
+    assert "missing" not in tool_registry
+    assert tool_registry.get("missing") is None
+    fast_tool, slow_tool = tool_registry.get("fast"), tool_registry.get("slow")
+    assert tool_registry.run(fast_tool, ("a",)) == "fast a"  # type: ignore
+    assert tool_registry.run(fast_tool, ("b",)) == "fast b"  # type: ignore
+    assert tool_registry.run(slow_tool, ("c",)) == "slow c"  # type: ignore
+
+    stats = tool_registry.get_stats()
+    assert stats["fast"].num_calls == 2
+    assert sum(stats["fast"].latency_histogram) == 2
+    assert stats["slow"].num_calls == 1
+    assert stats["slow"].latency_histogram[2] == 1  # 10ms to 100ms
+    assert stats["write"].num_calls == 0
+    formatted_stats = tool_registry.format_stats().splitlines()
+    assert [line.split("\t")[0] for line in formatted_stats[1:]] == ["slow", "fast"]
+
+
+def test_tool_registry_rejects_duplicate_names():
+    with pytest.raises(ValueError):
+        ToolRegistry(
+            {
+                ToolkitType.PYTHON_RETRIEVER: Toolkit([_build_tool("tool")]),
+                ToolkitType.PYTHON_WRITER: Toolkit([_build_tool("tool")]),
+            }
+        )
+
+
+def test_config_rebuilds_tool_registry():
+    config = AutomataAgentConfig(
+        llm_toolkits={ToolkitType.PYTHON_RETRIEVER: Toolkit([_build_tool("first")])}
+    )
+    assert "first" in config.tool_registry
+
+    config.llm_toolkits = {ToolkitType.PYTHON_RETRIEVER: Toolkit([_build_tool("second")])}
+    assert "first" not in config.tool_registry
+    assert "second" in config.tool_registry
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from automata.core.base.tool import Tool
+from automata.core.base.tool_result_cache import (
+    ToolResultCache,
+    bump_repository_version,
+    get_repository_version,
+)
+
+
+def _build_tool(name: str, cacheable: bool = True) -> Tool:
+    calls = []
+
+    def run(tool_input):
+        calls.append(tool_input)
+        return f"{name} {tool_input[0]} {len(calls)}"
+
+    return Tool(name=name, func=run, description="", cacheable=cacheable)
+
+
+def _run(tool, tool_input):
+    return tool.run(tool_input)
+
+
+def test_tool_result_cache_hits_and_misses():
+    tool_result_cache = ToolResultCache()
+    tool = _build_tool("read")
+
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a 1"
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a 1"
+    assert tool_result_cache.get_or_run(tool, ("b",), _run) == "read b 2"
+
+    stats = tool_result_cache.get_stats()["read"]
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert tool_result_cache.hit_rate == 1 / 3
+
+
+def test_tool_result_cache_skips_tools_that_are_not_cacheable():
+    tool_result_cache = ToolResultCache()
+    tool = _build_tool("write", cacheable=False)
+
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "write a 1"
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "write a 2"
+    assert tool_result_cache.get_stats() == {}
+
+
+def test_tool_result_cache_invalidated_by_repository_changes():
+    tool_result_cache = ToolResultCache()
+    tool = _build_tool("read")
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a 1"
+
+    repository_version = get_repository_version()
+    bump_repository_version()
+    assert get_repository_version() != repository_version
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a 2"
+
+    # An output computed while the repository changed is not cached
+    def run_and_modify(tool, tool_input):
+        output = tool.run(tool_input)
+        bump_repository_version()
+        return output
+
+    assert tool_result_cache.get_or_run(tool, ("b",), run_and_modify) == "read b 3"
+    assert tool_result_cache.get_or_run(tool, ("b",), _run) == "read b 4"
+
+
+def test_tool_result_cache_does_not_cache_failures():
+    tool_result_cache = ToolResultCache()
+    calls = []
+
+    def read(tool_input):
+        calls.append(tool_input)
+        if len(calls) == 1:
+            raise ValueError("Module not found")
+        return f"read {tool_input[0]}"
+
+    tool = Tool(name="read", func=read, description="", cacheable=True)
+
+    with pytest.raises(ValueError):
+        tool_result_cache.get_or_run(tool, ("a",), _run)
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a"
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a"
+    assert len(calls) == 2
+
+
+def test_tool_result_cache_evicts_least_recently_used():
+    tool_result_cache = ToolResultCache(max_size=2)
+    tool = _build_tool("read")
+    tool_result_cache.get_or_run(tool, ("a",), _run)
+    tool_result_cache.get_or_run(tool, ("b",), _run)
+    tool_result_cache.get_or_run(tool, ("a",), _run)
+    tool_result_cache.get_or_run(tool, ("c",), _run)
+
+    assert tool_result_cache.get_or_run(tool, ("a",), _run) == "read a 1"
+    assert tool_result_cache.get_or_run(tool, ("b",), _run) == "read b 4"
+
+
+def test_tool_result_cache_async():
+    tool_result_cache = ToolResultCache()
+    tool = _build_tool("read")
+
+    async def arun(tool, tool_input):
+        return await tool.arun(tool_input)
+
+    assert asyncio.run(tool_result_cache.aget_or_run(tool, ("a",), arun)) == "read a 1"
+    assert asyncio.run(tool_result_cache.aget_or_run(tool, ("a",), arun)) == "read a 1"
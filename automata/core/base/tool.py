@@ -1,7 +1,9 @@
 """Interface for tools."""
+import asyncio
+from contextlib import nullcontext
 from enum import Enum, auto
 from inspect import signature
-from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, ContextManager, List, Optional, Tuple, Union
 
 from automata.core.base.base_tool import BaseTool
 
@@ -24,10 +26,10 @@ class Tool(BaseTool):
         return self.func(tool_input)
 
     async def _arun(self, tool_input: Tuple[Optional[str], ...]) -> str:
-        """Use the tool asynchronously."""
+        """Use the tool asynchronously, running func in a worker thread if there is no coroutine."""
         if self.coroutine:
             return await self.coroutine(tool_input)
-        raise NotImplementedError("Tool does not support async")
+        return await asyncio.get_running_loop().run_in_executor(None, self._run, tool_input)
 
     # TODO: this is for backwards compatibility, remove in future
     def __init__(
@@ -111,8 +113,17 @@ def tool(*args: Union[str, Callable], return_direct: bool = False) -> Callable:
 class Toolkit:
     """A toolkit of tools."""
 
-    def __init__(self, tools: List[Tool]):
+    def __init__(
+        self,
+        tools: List[Tool],
+        turn_context: Optional[Callable[[], ContextManager[None]]] = None,
+    ):
         self.tools = tools
+        self._turn_context = turn_context
+
+    def turn_context(self) -> ContextManager[None]:
+        """Returns the context in which the tools of one agent turn are run."""
+        return self._turn_context() if self._turn_context else nullcontext()
 
     def __repr__(self) -> str:
         return f"Toolkit(tools={self.tools})"
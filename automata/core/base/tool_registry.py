@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from automata.core.base.base_tool import BaseTool
+from automata.core.base.tool import Toolkit, ToolkitType
+
+# The upper bounds of the latency histogram buckets, in seconds, the last bucket is unbounded
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+
+
+@dataclass
+class ToolStats:
+    """The invocation counter and the latency histogram of a tool."""
+
+    num_calls: int = 0
+    total_seconds: float = 0.0
+    latency_histogram: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.num_calls if self.num_calls else 0.0
+
+    def record(self, seconds: float) -> None:
+        self.num_calls += 1
+        self.total_seconds += seconds
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+
+class ToolRegistry:
+    """
+    Indexes the tools of toolkits by name, so tools are dispatched with a dictionary lookup,
+    and records the number of calls and the latencies of each tool for profiling.
+    """
+
+    def __init__(self, toolkits: Dict[ToolkitType, Toolkit]):
+        """
+        Args:
+            toolkits (Dict[ToolkitType, Toolkit]): The toolkits to index.
+
+        Raises:
+            ValueError: If several tools have the same name.
+        """
+        self._tools: Dict[str, BaseTool] = {}
+        self._toolkit_types: Dict[str, ToolkitType] = {}
+        for toolkit_type, toolkit in toolkits.items():
+            for tool in toolkit.tools:
+                if tool.name in self._tools:
+                    raise ValueError(f"Duplicate tool name '{tool.name}' in the toolkits.")
+                self._tools[tool.name] = tool
+                self._toolkit_types[tool.name] = toolkit_type
+        self._stats: Dict[str, ToolStats] = {tool_name: ToolStats() for tool_name in self._tools}
+        self._stats_lock = threading.Lock()
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def get(self, tool_name: str) -> Optional[BaseTool]:
+        """Returns the tool with the given name, or None if there is none."""
+        return self._tools.get(tool_name)
+
+    def get_toolkit_type(self, tool_name: str) -> Optional[ToolkitType]:
+        """Returns the type of the toolkit of the tool with the given name, or None if there is none."""
+        return self._toolkit_types.get(tool_name)
+
+    def run(self, tool: BaseTool, tool_input: Tuple[Optional[str], ...]) -> str:
+        """Runs a tool of the registry and records its latency."""
+        start_time = time.perf_counter()
+        try:
+            return tool.run(tool_input)
+        finally:
+            self._record(tool.name, time.perf_counter() - start_time)
+
+    async def arun(self, tool: BaseTool, tool_input: Tuple[Optional[str], ...]) -> str:
+        """Runs a tool of the registry asynchronously and records its latency."""
+        start_time = time.perf_counter()
+        try:
+            return await tool.arun(tool_input)
+        finally:
+            self._record(tool.name, time.perf_counter() - start_time)
+
+    def get_stats(self) -> Dict[str, ToolStats]:
+        """Returns the stats of the tools, by tool name."""
+        with self._stats_lock:
+            return {
+                tool_name: ToolStats(
+                    stats.num_calls, stats.total_seconds, list(stats.latency_histogram)
+                )
+                for tool_name, stats in self._stats.items()
+            }
+
+    def format_stats(self) -> str:
+        """Formats the stats of the called tools as a table, the slowest tools in total first."""
+        bucket_names = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        lines = ["\t".join(["tool", "calls", "total_s", "mean_s"] + bucket_names)]
+        for tool_name, stats in sorted(
+            self.get_stats().items(), key=lambda item: item[1].total_seconds, reverse=True
+        ):
+            if stats.num_calls:
+                lines.append(
+                    "\t".join(
+                        [
+                            tool_name,
+                            str(stats.num_calls),
+                            f"{stats.total_seconds:.3f}",
+                            f"{stats.mean_seconds:.3f}",
+                        ]
+                        + [str(count) for count in stats.latency_histogram]
+                    )
+                )
+        return "\n".join(lines)
+
+    def _record(self, tool_name: str, seconds: float) -> None:
+        with self._stats_lock:
+            self._stats.setdefault(tool_name, ToolStats()).record(seconds)
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from automata.core.base.base_tool import BaseTool
+
+_repository_version = 0
+_repository_version_lock = threading.Lock()
+
+
+def get_repository_version() -> int:
+    """Returns the version token of the repository, which changes every time the repository is modified."""
+    return _repository_version
+
+
+def bump_repository_version() -> None:
+    """Marks the repository as modified, which invalidates the cached tool results."""
+    global _repository_version
+    with _repository_version_lock:
+        _repository_version += 1
+
+
+@dataclass
+class CacheStats:
+    """The hit and miss counters of a cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        num_lookups = self.hits + self.misses
+        return self.hits / num_lookups if num_lookups else 0.0
+
+
+class ToolResultCache:
+    """
+    Memoizes the outputs of the cacheable tools, e.g. the code retrieval and search tools, by tool name and
+    input. Only successful outputs are cached: a cacheable tool reports a failure by raising, and the error
+    propagates without being cached, so the tool runs again on the next call.
+    Every cached output is dropped when the repository version changes, see bump_repository_version.
+    A coordinator shares its cache with the agents it runs, so a helper agent reuses the outputs of the others.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Args:
+            max_size (int): The maximum number of cached outputs, the least recently used are evicted first.
+        """
+        self.max_size = max_size
+        self._outputs: "OrderedDict[Tuple[str, Hashable], str]" = OrderedDict()
+        self._repository_version = get_repository_version()
+        self._stats: Dict[str, CacheStats] = {}
+        self._lock = threading.Lock()
+
+    def get_or_run(
+        self,
+        tool: BaseTool,
+        tool_input: Tuple[Optional[str], ...],
+        run: Callable[[BaseTool, Tuple[Optional[str], ...]], str],
+    ) -> str:
+        """
+        Returns the cached output of a tool for an input, or runs the tool and caches its output.
+
+        Args:
+            tool (BaseTool): The tool, which is run every time if it is not cacheable.
+            tool_input (Tuple[Optional[str], ...]): The input of the tool.
+            run (Callable[[BaseTool, Tuple[Optional[str], ...]], str]): Runs the tool on the input.
+
+        Returns:
+            str: The output of the tool.
+
+        Raises:
+            Exception: The error raised by the tool, which is not cached.
+        """
+        if not tool.cacheable:
+            return run(tool, tool_input)
+        repository_version, output = self._get(tool.name, tool_input)
+        if output is None:
+            output = run(tool, tool_input)
+            self._put(repository_version, tool.name, tool_input, output)
+        return output
+
+    async def aget_or_run(
+        self,
+        tool: BaseTool,
+        tool_input: Tuple[Optional[str], ...],
+        arun: Callable[[BaseTool, Tuple[Optional[str], ...]], Awaitable[str]],
+    ) -> str:
+        """Returns the cached output of a tool for an input, or runs the tool asynchronously, see get_or_run."""
+        if not tool.cacheable:
+            return await arun(tool, tool_input)
+        repository_version, output = self._get(tool.name, tool_input)
+        if output is None:
+            output = await arun(tool, tool_input)
+            self._put(repository_version, tool.name, tool_input, output)
+        return output
+
+    def get_stats(self) -> Dict[str, CacheStats]:
+        """Returns the hit and miss counters of the cacheable tools, by tool name."""
+        with self._lock:
+            return {
+                tool_name: CacheStats(stats.hits, stats.misses)
+                for tool_name, stats in self._stats.items()
+            }
+
+    @property
+    def hit_rate(self) -> float:
+        stats = self.get_stats().values()
+        return CacheStats(
+            sum(tool_stats.hits for tool_stats in stats),
+            sum(tool_stats.misses for tool_stats in stats),
+        ).hit_rate
+
+    def _get(
+        self, tool_name: str, tool_input: Tuple[Optional[str], ...]
+    ) -> Tuple[int, Optional[str]]:
+        """Looks up an output, returns the repository version it is looked up at along with it."""
+        repository_version = get_repository_version()
+        with self._lock:
+            if repository_version != self._repository_version:
+                self._outputs.clear()
+                self._repository_version = repository_version
+            tool_stats = self._stats.setdefault(tool_name, CacheStats())
+            output = self._outputs.get((tool_name, tool_input))
+            if output is None:
+                tool_stats.misses += 1
+            else:
+                tool_stats.hits += 1
+                self._outputs.move_to_end((tool_name, tool_input))
+        return repository_version, output
+
+    def _put(
+        self,
+        repository_version: int,
+        tool_name: str,
+        tool_input: Tuple[Optional[str], ...],
+        output: str,
+    ) -> None:
+        with self._lock:
+            # The output is stale if the repository was modified while the tool ran
+            if repository_version != self._repository_version:
+                return
+            self._outputs[(tool_name, tool_input)] = output
+            if len(self._outputs) > self.max_size:
+                self._outputs.popitem(last=False)
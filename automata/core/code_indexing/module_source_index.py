@@ -0,0 +1,480 @@
+import ast
+import logging
+import re
+import tokenize
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple, Union, cast
+
+import numpy as np
+
+from automata.core.code_indexing.utils import DOT_SEP
+
+logger = logging.getLogger(__name__)
+
+MODULE_SCOPE = -1
+# The line breaks of python source, unlike str.splitlines it does not break on form feeds and other separators
+LINE_BREAK_PATTERN = re.compile(r"(?<=\n)|(?<=\r)(?!\n)")
+ScopeNode = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef]
+
+
+@dataclass
+class ScopeEntry:
+    """
+    A def or class found in a module, with the offsets of its raw text.
+
+    The span of a scope mirrors what RedBaron renders for the same node: it starts at the
+    first decorator (or the def/class keyword) and runs until the first non-blank line that
+    follows the body, so trailing blank lines and the indentation of the next statement are
+    included.
+    """
+
+    name: str
+    kind: str
+    parent: int
+    start_line: int
+    end_line: int
+    start_offset: int
+    end_offset: int
+    docstring_span: Optional[Tuple[int, int]] = None
+    subtree_end: int = 0
+
+
+@dataclass
+class ModuleSourceIndex:
+    """
+    A lightweight, read-only view of a module built with the stdlib `ast` module.
+    Object lookups resolve to offsets in the raw source, so reads are served by string slicing
+    instead of a RedBaron parse. Scopes are stored in pre-order, which lets path lookups follow
+    the same first-match semantics as `find_syntax_tree_node`. Line based queries go through a table
+    mapping every line to its innermost scope, built on first use.
+
+    An index describes a single version of a module and is discarded by the module map when the
+    module changes, so results cached on it are keyed by (module, object, file version).
+    """
+
+    source: str
+    line_offsets: List[int]
+    scopes: List[ScopeEntry]
+    docstring_span: Optional[Tuple[int, int]] = None
+    # Offsets of the text removed when stripping each docstring, sorted by start offset
+    docstring_line_spans: List[Tuple[int, int]] = field(default_factory=list)
+    # First and last line of each top level statement, in source order
+    statement_line_spans: List[Tuple[int, int]] = field(default_factory=list)
+    # First and last line of each top level import statement, in source order
+    import_line_spans: List[Tuple[int, int]] = field(default_factory=list)
+    _path_cache: Dict[str, Optional[int]] = field(default_factory=dict, repr=False)
+    _stripped_source_cache: Dict[Optional[str], str] = field(default_factory=dict, repr=False)
+    # Innermost scope enclosing each line for a scope kind (None for any kind), by line number
+    _line_scope_tables: Dict[Optional[str], np.ndarray] = field(default_factory=dict, repr=False)
+    _scope_line_counts: Optional[np.ndarray] = field(default=None, repr=False)
+    _header_end_lines: Dict[int, int] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_source(cls, source: str) -> "ModuleSourceIndex":
+        """
+        Builds an index for the given source code.
+
+        Args:
+            source (str): The source code of the module.
+
+        Returns:
+            ModuleSourceIndex: The index of the module.
+
+        Raises:
+            SyntaxError: If the source code cannot be parsed.
+        """
+        tree = ast.parse(source)
+        lines = [line for line in LINE_BREAK_PATTERN.split(source) if line]
+        line_offsets = [0]
+        for line in lines:
+            line_offsets.append(line_offsets[-1] + len(line))
+
+        index = cls(source=source, line_offsets=line_offsets, scopes=[])
+        index.docstring_span = index._find_docstring_span(tree)
+        index._collect_scopes(tree, MODULE_SCOPE, lines)
+        index.statement_line_spans = [
+            (
+                statement.decorator_list[0].lineno
+                if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                and statement.decorator_list
+                else statement.lineno,
+                cast(int, statement.end_lineno),
+            )
+            for statement in tree.body
+        ]
+        index.import_line_spans = [
+            (statement.lineno, cast(int, statement.end_lineno))
+            for statement in tree.body
+            if isinstance(statement, (ast.Import, ast.ImportFrom))
+        ]
+        docstring_spans = [index.docstring_span] + [scope.docstring_span for scope in index.scopes]
+        index.docstring_line_spans = sorted(
+            index._to_line_span(span) for span in docstring_spans if span
+        )
+        return index
+
+    def find_scope(self, object_path: Optional[str]) -> Optional[int]:
+        """
+        Finds the scope for a dot-separated object path (e.g. 'ClassName.method_name').
+
+        Args:
+            object_path (Optional[str]): The object path, if None the module scope is returned.
+
+        Returns:
+            Optional[int]: The index of the scope, MODULE_SCOPE for the module or None if not found.
+        """
+        if not object_path:
+            return MODULE_SCOPE
+        if object_path not in self._path_cache:
+            scope: Optional[int] = MODULE_SCOPE
+            for obj_name in object_path.split(DOT_SEP):
+                scope = self.find_subscope(cast(int, scope), obj_name)
+                if scope is None:
+                    break
+            self._path_cache[object_path] = scope
+        return self._path_cache[object_path]
+
+    def find_subscope(self, scope: int, obj_name: str) -> Optional[int]:
+        """
+        Finds the first def or class named obj_name in the subtree of a scope, itself included,
+        like `find_syntax_tree_node` does for a single name.
+
+        Args:
+            scope (int): The index of the scope, or MODULE_SCOPE.
+            obj_name (str): The name of the def or class.
+
+        Returns:
+            Optional[int]: The index of the scope found, or None if not found.
+        """
+        if scope == MODULE_SCOPE:
+            candidates = range(0, len(self.scopes))
+        else:
+            if self.scopes[scope].name == obj_name:
+                return scope
+            candidates = range(scope + 1, self.scopes[scope].subtree_end)
+        for candidate in candidates:
+            if self.scopes[candidate].name == obj_name:
+                return candidate
+        return None
+
+    def get_source(self, object_path: Optional[str]) -> Optional[str]:
+        """Returns the raw source of the object at the given path, or None if not found."""
+        scope = self.find_scope(object_path)
+        if scope is None:
+            return None
+        if scope == MODULE_SCOPE:
+            return self.source
+        entry = self.scopes[scope]
+        return self.source[entry.start_offset : entry.end_offset]
+
+    def get_docstring(self, object_path: Optional[str]) -> Optional[str]:
+        """
+        Returns the docstring of the object at the given path, or None if not found.
+        The triple quotes are stripped from the raw text, like in the RedBaron retriever.
+        """
+        scope = self.find_scope(object_path)
+        if scope is None:
+            return None
+        span = self.docstring_span if scope == MODULE_SCOPE else self.scopes[scope].docstring_span
+        if not span:
+            return ""
+        return self.source[span[0] : span[1]].replace('"""', "").replace("'''", "")
+
+    def get_source_without_docstrings(self, object_path: Optional[str]) -> Optional[str]:
+        """
+        Returns the source of the object at the given path without the docstrings of the object
+        and of every nested def or class, or None if not found. The result is assembled from slices
+        of the raw source around the docstring spans and cached for this version of the module.
+        """
+        if object_path in self._stripped_source_cache:
+            return self._stripped_source_cache[object_path]
+
+        scope = self.find_scope(object_path)
+        if scope is None:
+            return None
+        if scope == MODULE_SCOPE:
+            start_offset, end_offset = 0, len(self.source)
+        else:
+            start_offset, end_offset = (
+                self.scopes[scope].start_offset,
+                self.scopes[scope].end_offset,
+            )
+
+        chunks = []
+        position = start_offset
+        first_span = bisect_left(self.docstring_line_spans, (start_offset,))
+        for span_start, span_end in self.docstring_line_spans[first_span:]:
+            if span_start >= end_offset:
+                break
+            chunks.append(self.source[position:span_start])
+            position = min(span_end, end_offset)
+        chunks.append(self.source[position:end_offset])
+
+        result = "".join(chunks)
+        self._stripped_source_cache[object_path] = result
+        return result
+
+    def find_innermost_scope_by_line(self, line_number: int, kind: Optional[str] = None) -> int:
+        """
+        Finds the innermost scope enclosing a line.
+
+        Args:
+            line_number (int): The 1-indexed line number.
+            kind (Optional[str]): Restrict the search to "def" or "class" scopes.
+
+        Returns:
+            int: The index of the scope, or MODULE_SCOPE if the line is at module level.
+        """
+        line_scope_table = self._get_line_scope_table(kind)
+        if 0 < line_number < len(line_scope_table):
+            return int(line_scope_table[line_number])
+        return MODULE_SCOPE
+
+    def find_innermost_scopes_by_lines(
+        self, line_numbers: Iterable[int], kind: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Vectorized version of `find_innermost_scope_by_line`.
+
+        Args:
+            line_numbers (Iterable[int]): The 1-indexed line numbers.
+            kind (Optional[str]): Restrict the search to "def" or "class" scopes.
+
+        Returns:
+            np.ndarray: The index of the scope enclosing each line, MODULE_SCOPE for module level lines.
+        """
+        line_scope_table = self._get_line_scope_table(kind)
+        lines = np.fromiter(line_numbers, dtype=np.int64)
+        in_range = (lines > 0) & (lines < len(line_scope_table))
+        # Line 0 does not exist, so it maps to the module scope
+        return line_scope_table[np.where(in_range, lines, 0)]
+
+    def get_scope_line_counts(self, scopes: np.ndarray) -> np.ndarray:
+        """Returns the number of lines spanned by each of the given scopes, from decorators to body."""
+        if self._scope_line_counts is None:
+            self._scope_line_counts = np.array(
+                [entry.end_line - entry.start_line + 1 for entry in self.scopes], dtype=np.int64
+            )
+        return self._scope_line_counts[scopes]
+
+    def get_context_line_numbers(self, line_number: int) -> Optional[List[int]]:
+        """
+        Selects the lines that show the code enclosing a line in context. The innermost def or class
+        enclosing the line (or the top level statement) is kept whole. Every enclosing scope contributes
+        its header and docstring, along with the headers and docstrings of the defs and classes that
+        precede the next enclosing scope.
+
+        Args:
+            line_number (int): The 1-indexed line number.
+
+        Returns:
+            Optional[List[int]]: The sorted line numbers, or None if the line is outside any statement.
+        """
+        scope = self.find_innermost_scope_by_line(line_number)
+        if scope == MODULE_SCOPE:
+            statement = bisect_right(
+                self.statement_line_spans, (line_number, len(self.line_offsets))
+            )
+            if not statement or self.statement_line_spans[statement - 1][1] < line_number:
+                return None
+            target_start_line, target_end_line = self.statement_line_spans[statement - 1]
+        else:
+            target_start_line, target_end_line = (
+                self.scopes[scope].start_line,
+                self.scopes[scope].end_line,
+            )
+
+        # The scopes enclosing the target, from the module down to the parent of the target
+        enclosing_scopes = [MODULE_SCOPE]
+        while scope != MODULE_SCOPE and self.scopes[scope].parent != enclosing_scopes[-1]:
+            child = scope
+            while self.scopes[child].parent != enclosing_scopes[-1]:
+                child = self.scopes[child].parent
+            enclosing_scopes.append(child)
+
+        line_numbers = set(range(target_start_line, target_end_line + 1))
+        for depth, enclosing_scope in enumerate(enclosing_scopes):
+            next_start_line = (
+                self.scopes[enclosing_scopes[depth + 1]].start_line
+                if depth + 1 < len(enclosing_scopes)
+                else target_start_line
+            )
+            if enclosing_scope != MODULE_SCOPE:
+                line_numbers.update(self._get_header_line_numbers(enclosing_scope))
+            line_numbers.update(self._get_docstring_line_numbers(enclosing_scope))
+            for sibling in self._get_child_scopes(enclosing_scope):
+                if self.scopes[sibling].start_line >= next_start_line:
+                    break
+                line_numbers.update(self._get_header_line_numbers(sibling))
+                line_numbers.update(self._get_docstring_line_numbers(sibling))
+        return sorted(line_numbers)
+
+    def get_lines(self, start_line: int, end_line: int) -> str:
+        """Returns the text of the 1-indexed lines from start_line to end_line included, with line breaks."""
+        return self.source[self.line_offsets[start_line - 1] : self.line_offsets[end_line]]
+
+    def get_body_indent(self, scope: int) -> str:
+        """Returns the indentation of the body of a def or class."""
+        entry = self.scopes[scope]
+        header_indent = self.source[self.line_offsets[entry.start_line - 1] : entry.start_offset]
+        header_end_line = self._get_header_line_numbers(scope)[-1]
+        if header_end_line < entry.end_line:
+            for line_number in range(header_end_line + 1, entry.end_line + 1):
+                line = self.get_line(line_number)
+                if line.strip():
+                    return line[: len(line) - len(line.lstrip())]
+        return header_indent + "    "
+
+    def get_line(self, line_number: int) -> str:
+        """Returns the text of a 1-indexed line, without the line break."""
+        return self.source[
+            self.line_offsets[line_number - 1] : self.line_offsets[line_number]
+        ].rstrip("\r\n")
+
+    def get_qualified_name(self, scope: int) -> str:
+        """Returns the name of a scope, prefixed by the enclosing class name for methods."""
+        entry = self.scopes[scope]
+        if entry.parent != MODULE_SCOPE and self.scopes[entry.parent].kind == "class":
+            return f"{self.scopes[entry.parent].name}{DOT_SEP}{entry.name}"
+        return entry.name
+
+    def _get_line_scope_table(self, kind: Optional[str]) -> np.ndarray:
+        """Builds the line to innermost scope table for a scope kind on first use."""
+        if kind not in self._line_scope_tables:
+            line_scope_table = np.full(len(self.line_offsets), MODULE_SCOPE, dtype=np.int32)
+            # Scopes are stored in pre-order, so nested scopes overwrite the lines of their parents
+            for scope, entry in enumerate(self.scopes):
+                if kind is None or entry.kind == kind:
+                    line_scope_table[entry.start_line : entry.end_line + 1] = scope
+            self._line_scope_tables[kind] = line_scope_table
+        return self._line_scope_tables[kind]
+
+    def _get_child_scopes(self, scope: int) -> List[int]:
+        """Returns the scopes directly nested in scope, in source order."""
+        if scope == MODULE_SCOPE:
+            candidates = range(0, len(self.scopes))
+        else:
+            candidates = range(scope + 1, self.scopes[scope].subtree_end)
+        return [candidate for candidate in candidates if self.scopes[candidate].parent == scope]
+
+    def _get_header_line_numbers(self, scope: int) -> range:
+        """Returns the lines of the decorators and signature of a scope, up to the closing colon."""
+        if scope not in self._header_end_lines:
+            entry = self.scopes[scope]
+            lines = chain(
+                [self.source[entry.start_offset : self.line_offsets[entry.start_line]]],
+                (
+                    self.source[self.line_offsets[line_index] : self.line_offsets[line_index + 1]]
+                    for line_index in range(entry.start_line, len(self.line_offsets) - 1)
+                ),
+            )
+            header_end_line = entry.start_line
+            depth = 0
+            for token in tokenize.generate_tokens(lines.__next__):
+                if token.type != tokenize.OP:
+                    continue
+                if token.string in "([{":
+                    depth += 1
+                elif token.string in ")]}":
+                    depth -= 1
+                elif token.string == ":" and depth == 0:
+                    header_end_line = entry.start_line + token.end[0] - 1
+                    break
+            self._header_end_lines[scope] = header_end_line
+        return range(self.scopes[scope].start_line, self._header_end_lines[scope] + 1)
+
+    def _get_docstring_line_numbers(self, scope: int) -> range:
+        """Returns the lines of the docstring of a scope, or an empty range if it has none."""
+        span = self.docstring_span if scope == MODULE_SCOPE else self.scopes[scope].docstring_span
+        if not span:
+            return range(0)
+        return range(
+            bisect_right(self.line_offsets, span[0]),
+            bisect_right(self.line_offsets, span[1] - 1) + 1,
+        )
+
+    def _collect_scopes(self, node: ast.AST, parent: int, lines: List[str]) -> None:
+        """Appends the def and class nodes found under node to the scopes, in pre-order."""
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                scope = len(self.scopes)
+                self.scopes.append(self._build_scope_entry(child, parent, lines))
+                self._collect_scopes(child, scope, lines)
+                self.scopes[scope].subtree_end = len(self.scopes)
+            else:
+                self._collect_scopes(child, parent, lines)
+
+    def _build_scope_entry(self, node: ScopeNode, parent: int, lines: List[str]) -> ScopeEntry:
+        start_line = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        end_line = cast(int, node.end_lineno)
+
+        # Extend the span over the trailing blank and comment lines, up to the indentation
+        # of the next line of code
+        end_offset = len(self.source)
+        for line_index in range(end_line, len(lines)):
+            stripped = lines[line_index].lstrip()
+            if stripped and not stripped.startswith("#"):
+                indent = len(lines[line_index]) - len(stripped)
+                end_offset = self.line_offsets[line_index] + indent
+                break
+
+        return ScopeEntry(
+            name=node.name,
+            kind="class" if isinstance(node, ast.ClassDef) else "def",
+            parent=parent,
+            start_line=start_line,
+            end_line=end_line,
+            start_offset=self.line_offsets[start_line - 1] + node.col_offset,
+            end_offset=end_offset,
+            docstring_span=self._find_docstring_span(node),
+        )
+
+    def _find_docstring_span(
+        self, node: Union[ast.Module, ScopeNode]
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Returns the offsets of the string literal opening the body of node, if any.
+        Like in the RedBaron retriever, only plain (unprefixed) string literals are docstrings.
+        """
+        if not node.body:
+            return None
+        first = node.body[0]
+        if not (
+            isinstance(first, ast.Expr)
+            and isinstance(first.value, ast.Constant)
+            and isinstance(first.value.value, str)
+        ):
+            return None
+        start_offset = self._to_offset(first.value.lineno, first.value.col_offset)
+        if self.source[start_offset] not in ('"', "'"):
+            return None
+        end_offset = self._to_offset(
+            cast(int, first.value.end_lineno), cast(int, first.value.end_col_offset)
+        )
+        return (start_offset, end_offset)
+
+    def _to_line_span(self, span: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Widens a docstring span to the full lines it occupies when no other code shares them,
+        which matches the text RedBaron removes along with a docstring node.
+        """
+        start_offset, end_offset = span
+        line_start = self.source.rfind("\n", 0, start_offset) + 1
+        line_end = self.source.find("\n", end_offset)
+        line_end = len(self.source) if line_end == -1 else line_end + 1
+        if (
+            self.source[line_start:start_offset].strip()
+            or self.source[end_offset:line_end].strip()
+        ):
+            return span
+        return (line_start, line_end)
+
+    def _to_offset(self, line_number: int, byte_col: int) -> int:
+        """Converts an ast position, whose columns are utf-8 byte offsets, to a string offset."""
+        line_start = self.line_offsets[line_number - 1]
+        line = self.source[line_start : self.line_offsets[line_number]]
+        if line.isascii():
+            return line_start + byte_col
+        return line_start + len(line.encode("utf-8")[:byte_col].decode("utf-8", errors="ignore"))
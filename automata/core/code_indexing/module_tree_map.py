@@ -1,10 +1,12 @@
 import logging
 import os.path
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from redbaron import RedBaron
 
+from automata.core.code_indexing.module_source_index import ModuleSourceIndex
 from automata.core.code_indexing.utils import DOT_SEP, convert_fpath_to_module_dotpath
 from automata.core.utils import root_path, root_py_path
 
@@ -52,6 +54,11 @@ class DotPathMap:
             self._module_dotpath_to_fpath_map[module_dotpath] = file_path
             self._module_fpath_to_dotpath_map[file_path] = module_dotpath
 
+    def remove_module(self, module_dotpath: str):
+        module_fpath = self._module_dotpath_to_fpath_map.pop(module_dotpath, None)
+        if module_fpath:
+            self._module_fpath_to_dotpath_map.pop(module_fpath, None)
+
     def items(self):
         return self._module_dotpath_to_fpath_map.items()
 
@@ -60,24 +67,162 @@ class LazyModuleTreeMap:
     """
     This map works as a lazy dictionary between module dotpaths and their corresponding RedBaron FST objects.
     It will load and cache modules in memory as they get accessed
+
+    Read-only queries should go through `get_source_index`, which serves an `ast` based index of the module
+    source. The RedBaron FST is only parsed when a caller needs to mutate the tree, e.g. the PythonWriter.
+
+    Queries that scan every module (exact search, expression context) should call `warm_up` ahead of time,
+    which indexes all modules in a process pool.
     """
 
     def __init__(self, path: str):
         self._dotpath_map = DotPathMap(path)
         self._loaded_modules: Dict[str, Optional[RedBaron]] = {}
+        self._source_indices: Dict[str, Optional[ModuleSourceIndex]] = {}
 
     def get_module(self, module_dotpath: str) -> Optional[RedBaron]:
         if not self._dotpath_map.contains_dotpath(module_dotpath):
             return None
 
         if module_dotpath not in self._loaded_modules:
-            module_fpath = self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
-            self._loaded_modules[module_dotpath] = self._load_module_from_fpath(module_fpath)
+            source_index = self._source_indices.get(module_dotpath)
+            if source_index:
+                self._loaded_modules[module_dotpath] = self._load_module_from_source(
+                    source_index.source, module_dotpath
+                )
+            else:
+                module_fpath = self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
+                self._loaded_modules[module_dotpath] = self._load_module_from_fpath(module_fpath)
         return self._loaded_modules[module_dotpath]
 
     def put_module(self, module_dotpath: str, module: RedBaron):
         self._loaded_modules[module_dotpath] = module
         self._dotpath_map.put_module(module_dotpath)
+        self.invalidate_source_index(module_dotpath)
+
+    def put_module_source(self, module_dotpath: str, source_index: ModuleSourceIndex) -> None:
+        """
+        Replaces the source of a module without parsing its FST, which is rebuilt from the source when
+        the module is next accessed with `get_module`.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+            source_index (ModuleSourceIndex): The index of the new source of the module.
+        """
+        self._loaded_modules.pop(module_dotpath, None)
+        self._dotpath_map.put_module(module_dotpath)
+        self._source_indices[module_dotpath] = source_index
+
+    def is_module_loaded(self, module_dotpath: str) -> bool:
+        """
+        Returns whether the FST of a module has been parsed.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+        """
+        return self._loaded_modules.get(module_dotpath) is not None
+
+    def remove_module(self, module_dotpath: str) -> None:
+        """
+        Removes a module from the map, e.g. a module that was created in memory but never written to disk.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+        """
+        self._loaded_modules.pop(module_dotpath, None)
+        self._dotpath_map.remove_module(module_dotpath)
+        self.invalidate_source_index(module_dotpath)
+
+    def get_source_index(self, module_dotpath: str) -> Optional[ModuleSourceIndex]:
+        """
+        Returns the read-only source index for the specified module, building it on first access.
+        If the module FST has been loaded, the index reflects the in-memory state of the FST.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+
+        Returns:
+            Optional[ModuleSourceIndex]: The source index, or None if the module cannot be found or parsed.
+        """
+        if not self._dotpath_map.contains_dotpath(module_dotpath):
+            return None
+
+        if module_dotpath not in self._source_indices:
+            module = self._loaded_modules.get(module_dotpath)
+            if module is not None:
+                source: Optional[str] = module.dumps()
+            else:
+                module_fpath = self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
+                source = self._read_source_from_fpath(module_fpath)
+            self._source_indices[module_dotpath] = (
+                self._build_source_index(source, module_dotpath) if source is not None else None
+            )
+        return self._source_indices[module_dotpath]
+
+    def warm_up(self, max_workers: Optional[int] = None) -> None:
+        """
+        Builds the source index of every module that is not indexed yet, parsing them in a process pool.
+        Unlike RedBaron FSTs, the indices are plain data, so they are cheap to send back to this process.
+
+        Args:
+            max_workers (Optional[int]): The number of worker processes, defaults to the number of CPUs.
+        """
+        pending_modules = [
+            (module_dotpath, module_fpath)
+            for module_dotpath, module_fpath in list(self._dotpath_map.items())
+            if module_dotpath not in self._source_indices
+            and module_dotpath not in self._loaded_modules
+        ]
+        if not pending_modules:
+            return
+
+        module_dotpaths = [module_dotpath for module_dotpath, _ in pending_modules]
+        module_fpaths = [module_fpath for _, module_fpath in pending_modules]
+        max_workers = max_workers or os.cpu_count() or 1
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                source_indices: List[Optional[ModuleSourceIndex]] = list(
+                    executor.map(
+                        self._index_module_from_fpath,
+                        module_fpaths,
+                        module_dotpaths,
+                        chunksize=max(1, len(pending_modules) // (4 * max_workers)),
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Failed to index modules in parallel due to: {e}, indexing sequentially")
+            source_indices = [
+                self._index_module_from_fpath(module_fpath, module_dotpath)
+                for module_dotpath, module_fpath in pending_modules
+            ]
+
+        for module_dotpath, source_index in zip(module_dotpaths, source_indices):
+            # A module loaded in the meantime may have been modified, its index is built from the FST
+            if module_dotpath not in self._loaded_modules:
+                self._source_indices.setdefault(module_dotpath, source_index)
+        logger.debug(f"Warmed up the source indices of {len(pending_modules)} modules")
+
+    def source_index_items(self) -> Iterator[Tuple[str, ModuleSourceIndex]]:
+        """
+        Iterates over the source indices of all the modules that can be parsed, warming up the map first.
+
+        Returns:
+            Iterator[Tuple[str, ModuleSourceIndex]]: The module dotpaths and their source indices.
+        """
+        self.warm_up()
+        for module_dotpath, _ in list(self._dotpath_map.items()):
+            source_index = self.get_source_index(module_dotpath)
+            if source_index:
+                yield module_dotpath, source_index
+
+    def invalidate_source_index(self, module_dotpath: str) -> None:
+        """
+        Drops the cached source index of a module, must be called after its FST is mutated.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+        """
+        self._source_indices.pop(module_dotpath, None)
 
     @staticmethod
     def _load_module_from_fpath(path) -> Optional[RedBaron]:
@@ -92,12 +237,45 @@ class LazyModuleTreeMap:
         """
 
         try:
-            module = RedBaron(open(path).read())
+            with open(path) as f:
+                module = RedBaron(f.read())
             return module
         except Exception as e:
             logger.error(f"Failed to load module '{path}' due to: {e}")
             return None
 
+    @staticmethod
+    def _load_module_from_source(source: str, module_dotpath: str) -> Optional[RedBaron]:
+        try:
+            return RedBaron(source)
+        except Exception as e:
+            logger.error(f"Failed to load module '{module_dotpath}' due to: {e}")
+            return None
+
+    @staticmethod
+    def _read_source_from_fpath(path: str) -> Optional[str]:
+        try:
+            with open(path) as f:
+                return f.read()
+        except Exception as e:
+            logger.error(f"Failed to read module '{path}' due to: {e}")
+            return None
+
+    @staticmethod
+    def _index_module_from_fpath(path: str, module_dotpath: str) -> Optional[ModuleSourceIndex]:
+        source = LazyModuleTreeMap._read_source_from_fpath(path)
+        if source is None:
+            return None
+        return LazyModuleTreeMap._build_source_index(source, module_dotpath)
+
+    @staticmethod
+    def _build_source_index(source: str, module_dotpath: str) -> Optional[ModuleSourceIndex]:
+        try:
+            return ModuleSourceIndex.from_source(source)
+        except Exception as e:
+            logger.error(f"Failed to index module '{module_dotpath}' due to: {e}")
+            return None
+
     def get_existing_module_dotpath(self, module_obj: RedBaron) -> Optional[str]:
         """
         Returns the module dotpath for the specified module object.
@@ -125,7 +303,7 @@ class LazyModuleTreeMap:
             str: The module fpath for the specified module dotpath.
         """
 
-        if module_dotpath in self._loaded_modules:
+        if module_dotpath in self._loaded_modules or self._source_indices.get(module_dotpath):
             return self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
         return None
 
@@ -137,9 +315,8 @@ class LazyModuleTreeMap:
         return self._loaded_modules.items()
 
     def _load_all_modules(self):
-        for module_dotpath, fpath in self._dotpath_map.items():
-            if module_dotpath not in self._loaded_modules:
-                self._loaded_modules[module_dotpath] = self._load_module_from_fpath(fpath)
+        for module_dotpath, _ in list(self._dotpath_map.items()):
+            self.get_module(module_dotpath)
 
     def __contains__(self, item):
         return self._dotpath_map.contains_dotpath(item)
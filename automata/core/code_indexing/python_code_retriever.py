@@ -2,16 +2,15 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Optional, Union
+from typing import List, Optional, Sequence, Union
 
-from redbaron import ClassNode, DefNode, Node, RedBaron, StringNode
+import numpy as np
 
+from automata.core.code_indexing.module_source_index import MODULE_SCOPE
 from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
-from automata.core.code_indexing.syntax_tree_navigation import find_syntax_tree_node
 from automata.core.code_indexing.utils import NO_RESULT_FOUND_STR
 
 logger = logging.getLogger(__name__)
-FSTNode = Union[Node, RedBaron]
 
 
 class PythonCodeRetriever:
@@ -34,11 +33,11 @@ class PythonCodeRetriever:
                 if not found.
         """
 
-        module = self.module_tree_map.get_module(module_dotpath)
-        if module:
-            result = find_syntax_tree_node(module, object_path)
-            if result:
-                return result.dumps()
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            result = source_index.get_source(object_path)
+            if result is not None:
+                return result
 
         return NO_RESULT_FOUND_STR
 
@@ -56,9 +55,11 @@ class PythonCodeRetriever:
                 if not found.
         """
 
-        module = self.module_tree_map.get_module(module_dotpath)
-        if module:
-            return PythonCodeRetriever._get_docstring(find_syntax_tree_node(module, object_path))
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            result = source_index.get_docstring(object_path)
+            if result is not None:
+                return result
         return NO_RESULT_FOUND_STR
 
     def get_source_code_without_docstrings(
@@ -77,61 +78,61 @@ class PythonCodeRetriever:
                 if not found.
         """
 
-        def _remove_docstrings(node: FSTNode) -> None:
-            """
-            Remove docstrings from the specified node, recursively.
-
-            Args:
-                node: The FST node
-                    to remove docstrings from.
-            """
-
-            if isinstance(node, (DefNode, ClassNode, RedBaron)):
-                filtered_node = node.filtered()
-                if filtered_node and isinstance(filtered_node[0], StringNode):
-                    index = filtered_node[0].index_on_parent
-                    node.pop(index)
-                child_nodes = node.find_all(lambda identifier: identifier in ("def", "class"))
-                for child_node in child_nodes:
-                    if child_node is not node:
-                        _remove_docstrings(child_node)
-
-        module = self.module_tree_map.get_module(module_dotpath)
-
-        if module:
-            module_copy = RedBaron(module.dumps())
-            result = find_syntax_tree_node(module_copy, object_path)
-
-            if result:
-                _remove_docstrings(result)
-                return result.dumps()
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            result = source_index.get_source_without_docstrings(object_path)
+            if result is not None:
+                return result
         return NO_RESULT_FOUND_STR
 
     def get_parent_function_name_by_line(self, module_dotpath: str, line_number: int) -> str:
         """
-        Retrieve code for a specified module, class, or function/method.
+        Retrieve the name of the function or method enclosing the specified line.
 
         Args:
             module_dotpath (str): The path of the module in dot-separated format (e.g. 'package.module').
             line_number (int): The line number of the code to retrieve.
 
         Returns:
-            str: The code for the specified module, class, or function/method, or "No Result Found."
-                if not found.
+            str: The name of the function, or 'ClassName.method_name' for methods, or "No Result Found."
+                if the line is not inside a function.
         """
 
-        module = self.module_tree_map.get_module(module_dotpath)
-        if module:
-            node = module.at(line_number)
-            if node.type != "def":
-                node = node.parent_find("def")
-            if node:
-                if node.parent[0].type == "class":
-                    return f"{node.parent.name}.{node.name}"
-                else:
-                    return node.name
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            scope = source_index.find_innermost_scope_by_line(line_number, kind="def")
+            if scope != MODULE_SCOPE:
+                return source_index.get_qualified_name(scope)
         return NO_RESULT_FOUND_STR
 
+    def get_parent_function_names_by_lines(
+        self, module_dotpath: str, line_numbers: Sequence[int]
+    ) -> List[str]:
+        """
+        Vectorized version of `get_parent_function_name_by_line`, resolves all lines in one table lookup.
+
+        Args:
+            module_dotpath (str): The path of the module in dot-separated format (e.g. 'package.module').
+            line_numbers (Sequence[int]): The line numbers to resolve.
+
+        Returns:
+            List[str]: The name of the function enclosing each line, or "No Result Found."
+                if the line is not inside a function.
+        """
+
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if not source_index:
+            return [NO_RESULT_FOUND_STR] * len(line_numbers)
+
+        scopes = source_index.find_innermost_scopes_by_lines(line_numbers, kind="def")
+        names = {
+            scope: source_index.get_qualified_name(scope)
+            if scope != MODULE_SCOPE
+            else NO_RESULT_FOUND_STR
+            for scope in np.unique(scopes).tolist()
+        }
+        return [names[scope] for scope in scopes.tolist()]
+
     def get_parent_function_num_code_lines(
         self, module_dotpath: str, line_number: int
     ) -> Union[int, str]:
@@ -146,18 +147,35 @@ class PythonCodeRetriever:
             int: The number of code lines for the specified module, class, or function/method, or "No Result Found."
 
         """
-        module = self.module_tree_map.get_module(module_dotpath)
-        if module:
-            node = module.at(line_number)
-            if node.type != "def":
-                node = node.parent_find("def")
-            if node:
-                return (
-                    node.absolute_bounding_box.bottom_right.line
-                    - node.absolute_bounding_box.top_left.line
-                    + 1
-                )
-        return NO_RESULT_FOUND_STR
+        return self.get_parent_function_num_code_lines_by_lines(module_dotpath, [line_number])[0]
+
+    def get_parent_function_num_code_lines_by_lines(
+        self, module_dotpath: str, line_numbers: Sequence[int]
+    ) -> List[Union[int, str]]:
+        """
+        Vectorized version of `get_parent_function_num_code_lines`.
+
+        Args:
+            module_dotpath (str): The path of the module in dot-separated format (e.g. 'package.module').
+            line_numbers (Sequence[int]): The line numbers to resolve.
+
+        Returns:
+            List[Union[int, str]]: The number of code lines of the function enclosing each line, or
+                "No Result Found." if the line is not inside a function.
+        """
+
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if not source_index:
+            return [NO_RESULT_FOUND_STR] * len(line_numbers)
+
+        scopes = source_index.find_innermost_scopes_by_lines(line_numbers, kind="def")
+        in_function = scopes != MODULE_SCOPE
+        num_code_lines = np.zeros(len(scopes), dtype=np.int64)
+        num_code_lines[in_function] = source_index.get_scope_line_counts(scopes[in_function])
+        return [
+            num_lines if is_in_function else NO_RESULT_FOUND_STR
+            for num_lines, is_in_function in zip(num_code_lines.tolist(), in_function.tolist())
+        ]
 
     def get_parent_code_by_line(
         self, module_dotpath: str, line_number: int, return_numbered=False
@@ -175,68 +193,22 @@ class PythonCodeRetriever:
                 if not found.
         """
 
-        module = self.module_tree_map.get_module(module_dotpath)
-        if module:
-            node = module.at(line_number)
-
-            # retarget def or class node
-            if node.type not in ("def", "class") and node.parent_find(
-                lambda identifier: identifier in ("def", "class")
-            ):
-                node = node.parent_find(lambda identifier: identifier in ("def", "class"))
-
-            path = node.path().to_baron_path()
-            pointer = module
-            result = []
-
-            for entry in path:
-                if isinstance(entry, int):
-                    pointer = pointer.node_list
-                    for x in range(entry):
-                        start_line, start_col = (
-                            pointer[x].absolute_bounding_box.top_left.line,
-                            pointer[x].absolute_bounding_box.top_left.column,
-                        )
-
-                        if pointer[x].type == "string" and pointer[x].value.startswith('"""'):
-                            result += self._create_line_number_tuples(
-                                pointer[x], start_line, start_col
-                            )
-                        if pointer[x].type in ("def", "class"):
-                            docstring = PythonCodeRetriever._get_docstring(pointer[x])
-                            node_copy = pointer[x].copy()
-                            node_copy.value = '"""' + docstring + '"""'
-                            result += self._create_line_number_tuples(
-                                node_copy, start_line, start_col
-                            )
-                    pointer = pointer[entry]
-                else:
-                    start_line, start_col = (
-                        pointer.absolute_bounding_box.top_left.line,
-                        pointer.absolute_bounding_box.top_left.column,
-                    )
-                    node_copy = pointer.copy()
-                    node_copy.value = ""
-                    result += self._create_line_number_tuples(node_copy, start_line, start_col)
-                    pointer = getattr(pointer, entry)
-
-            start_line, start_col = (
-                pointer.absolute_bounding_box.top_left.line,
-                pointer.absolute_bounding_box.top_left.column,
-            )
-            result += self._create_line_number_tuples(pointer, start_line, start_col)
-
-            prev_line = 1
-            result_str = ""
-            for t in result:
-                if t[0] > prev_line + 1:
-                    result_str += "...\n"
-                if return_numbered:
-                    result_str += f"{t[0]}: {t[1]}\n"
-                else:
-                    result_str += f"{t[1]}\n"
-                prev_line = t[0]
-            return result_str
+        source_index = self.module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            context_line_numbers = source_index.get_context_line_numbers(line_number)
+            if context_line_numbers is not None:
+                prev_line = 1
+                result_str = ""
+                for context_line_number in context_line_numbers:
+                    line = source_index.get_line(context_line_number)
+                    if context_line_number > prev_line + 1:
+                        result_str += "...\n"
+                    if return_numbered:
+                        result_str += f"{context_line_number}: {line}\n"
+                    else:
+                        result_str += f"{line}\n"
+                    prev_line = context_line_number
+                return result_str
         return NO_RESULT_FOUND_STR
 
     def get_expression_context(
@@ -258,11 +230,11 @@ class PythonCodeRetriever:
 
         result = ""
         pattern = re.compile(expression)
-        for module_dotpath, module in self.module_tree_map.items():
-            module = self.module_tree_map.get_module(module_dotpath)
-            if not module:
-                raise Exception(f"Could not find expected module {module_dotpath}")
-            lines = module.dumps().splitlines()
+        for module_dotpath, source_index in self.module_tree_map.source_index_items():
+            lines = [
+                source_index.get_line(line_number)
+                for line_number in range(1, len(source_index.line_offsets))
+            ]
             for i, line in enumerate(lines):
                 lineno = i + 1  # rebardon lines are 1 indexed, same as in an editor
                 if pattern.search(line):
@@ -272,12 +244,9 @@ class PythonCodeRetriever:
                     raw_code = "\n".join(lines[lower_index : upper_index + 1])
                     result += f"{module_dotpath}"
 
-                    node = module.at(lineno)
-                    if node.type not in ("def", "class"):
-                        node = node.parent_find(lambda identifier: identifier in ("def", "class"))
-
-                    if node:
-                        result += f".{node.name}"
+                    scope = source_index.find_innermost_scope_by_line(lineno)
+                    if scope != MODULE_SCOPE:
+                        result += f".{source_index.scopes[scope].name}"
 
                     linespan_str = (
                         f"L{lineno}"
@@ -287,23 +256,3 @@ class PythonCodeRetriever:
                     result += f"\n{linespan_str}\n```{raw_code}```\n\n"
 
         return result
-
-    @staticmethod
-    def _create_line_number_tuples(node: FSTNode, start_line: int, start_col: int):
-        result = []
-        for i, line in enumerate(node.dumps().strip().splitlines()):
-            if i == 0 and not line.startswith(" " * (start_col - 1)):
-                line = " " * (start_col - 1) + line
-            result.append((start_line + i, line))
-        return result
-
-    @staticmethod
-    def _get_docstring(node: Optional[FSTNode]) -> str:
-        if not node:
-            return NO_RESULT_FOUND_STR
-
-        if isinstance(node, (ClassNode, DefNode, RedBaron)):
-            filtered_nodes = node.filtered()  # get rid of extra whitespace
-            if isinstance(filtered_nodes[0], StringNode):
-                return filtered_nodes[0].value.replace('"""', "").replace("'''", "")
-        return ""
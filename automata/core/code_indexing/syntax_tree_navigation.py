@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional, Union
+from typing import Dict, Optional, Set, Union
 
-from redbaron import ClassNode, DefNode, FromImportNode, ImportNode, Node, NodeList, RedBaron
+from redbaron import ClassNode, DefNode, Node, NodeList, RedBaron
 
 from automata.core.code_indexing.utils import DOT_SEP
 
@@ -67,24 +67,6 @@ def find_import_syntax_tree_nodes(module: RedBaron) -> Optional[NodeList]:
     return module.find_all(lambda identifier: identifier in ("import", "from_import"))
 
 
-def find_import_syntax_tree_node_by_name(
-    module: RedBaron, import_name: str
-) -> Optional[Union[ImportNode, FromImportNode]]:
-    """
-    Find an import by name.
-
-    Args:
-        module (RedBaron): The module to search.
-        import_name (str): The name of the import to find.
-
-    Returns:
-        Optional[Union[ImportNode, FromImportNode]]: The found import, or None if not found.
-    """
-    return module.find(
-        lambda identifier: identifier in ("import", "from_import"), name=import_name
-    )
-
-
 def find_all_function_and_class_syntax_tree_nodes(module: RedBaron) -> NodeList:
     """
     Find all imports in a module.
@@ -96,3 +78,82 @@ def find_all_function_and_class_syntax_tree_nodes(module: RedBaron) -> NodeList:
         NodeList: A list of ClassNode and DefNode objects.
     """
     return module.find_all(lambda identifier: identifier in ("class", "def"))
+
+
+class SyntaxTreeNameIndex:
+    """
+    An index of the first def or class with each name in the subtree of a node, in the order
+    `find_syntax_tree_node` searches it. It answers single name lookups without walking the subtree,
+    and is kept up to date when its nodes are replaced or children are appended to the indexed node.
+    """
+
+    def __init__(self, code_obj: Union[RedBaron, ClassNode, DefNode]):
+        self.code_obj = code_obj
+        self._nodes: Dict[str, Union[DefNode, ClassNode]] = {}
+        # Names whose first match was in a replaced subtree, searched again when they are next looked up
+        self._stale_names: Set[str] = set()
+        for node in find_all_function_and_class_syntax_tree_nodes(code_obj):
+            self._nodes.setdefault(node.name, node)
+
+    def find(self, obj_name: str) -> Optional[Union[DefNode, ClassNode]]:
+        """
+        Find the first def or class with the specified name in the indexed subtree.
+
+        Args:
+            obj_name (str): The name of the object to find.
+
+        Returns:
+            Optional[Union[DefNode, ClassNode]]: The found node, or None.
+        """
+        if obj_name in self._stale_names:
+            self._stale_names.discard(obj_name)
+            node = _find_subnode(self.code_obj, obj_name)
+            if node:
+                self._nodes[obj_name] = node
+            else:
+                self._nodes.pop(obj_name, None)
+        return self._nodes.get(obj_name)
+
+    def replace(self, existing_node: Union[DefNode, ClassNode], new_node: Node) -> None:
+        """
+        Replace an indexed node with a new node, in place, and update the index.
+
+        Args:
+            existing_node (Union[DefNode, ClassNode]): The node to replace.
+            new_node (Node): The replacement.
+        """
+        replaced_node_ids = {
+            id(node)
+            for node in find_all_function_and_class_syntax_tree_nodes(existing_node)
+            if node is not existing_node
+        }
+        existing_node.replace(new_node)
+        for obj_name, node in self._nodes.items():
+            if id(node) in replaced_node_ids:
+                self._stale_names.add(obj_name)
+
+        # The replaced node keeps its position, so a name that was not found before it is first found
+        # in its new subtree. A name found elsewhere may be found before or after it, so it is searched again.
+        indexed_names: Set[str] = set()
+        for node in find_all_function_and_class_syntax_tree_nodes(existing_node):
+            if node is existing_node or node.name in indexed_names:
+                continue
+            indexed_names.add(node.name)
+            if node.name in self._stale_names or node.name not in self._nodes:
+                self._stale_names.discard(node.name)
+                self._nodes[node.name] = node
+            else:
+                self._stale_names.add(node.name)
+
+    def append(self, new_node: Node) -> None:
+        """
+        Append a new node to the indexed node and update the index.
+
+        Args:
+            new_node (Node): The node to append.
+        """
+        self.code_obj.append(new_node)
+        # The appended node comes last in the subtree, so it is only the first match for new names
+        for node in find_all_function_and_class_syntax_tree_nodes(self.code_obj[-1]):
+            if node.name not in self._stale_names:
+                self._nodes.setdefault(node.name, node)
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
+
+
+@pytest.fixture
+def module_map():
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    return LazyModuleTreeMap(sample_dir)
+
+
+def test_warm_up_indexes_all_modules(module_map):
+    module_map.warm_up(max_workers=2)
+
+    assert set(module_map._source_indices.keys()) == {"sample", "sample2"}
+    assert not module_map._loaded_modules
+    cold_module_map = LazyModuleTreeMap(module_map._dotpath_map._abs_path)
+    for module_dotpath in ("sample", "sample2"):
+        warm_source_index = module_map.get_source_index(module_dotpath)
+        cold_source_index = cold_module_map.get_source_index(module_dotpath)
+        assert warm_source_index.source == cold_source_index.source  # type: ignore
+        assert warm_source_index.scopes == cold_source_index.scopes  # type: ignore
+
+
+def test_warm_up_keeps_loaded_modules(module_map):
+    module = module_map.get_module("sample")
+    module.append("def added_function():\n    pass\n")
+    module_map.put_module("sample", module)
+
+    module_map.warm_up(max_workers=2)
+
+    assert "added_function" in module_map.get_source_index("sample").source  # type: ignore
+
+
+def test_source_index_items(module_map):
+    items = dict(module_map.source_index_items())
+
+    assert set(items.keys()) == {"sample", "sample2"}
+    assert items["sample"] is module_map.get_source_index("sample")
@@ -1,11 +1,14 @@
 import os
+import shutil
 import textwrap
+from unittest.mock import patch
 
 import pytest
 
+from automata.core.code_indexing import utils
 from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
 from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
-from automata.core.code_indexing.utils import build_repository_overview
+from automata.core.code_indexing.utils import NO_RESULT_FOUND_STR, build_repository_overview
 
 
 @pytest.fixture
@@ -29,6 +32,46 @@ def test_build_overview():
     assert first_module_overview in result
 
 
+def test_build_overview_cached(tmp_path):
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    repository_dir = str(tmp_path / "repository")
+    shutil.copytree(sample_dir, repository_dir)
+    cache_path = str(tmp_path / "cache" / "overview_cache.json")
+
+    result = build_repository_overview(repository_dir, cache_path=cache_path)
+    assert result == build_repository_overview(sample_dir)
+    assert os.path.exists(cache_path)
+
+    # Served from the persistent cache in a new process, and from memory afterwards
+    utils._overview_memo.clear()
+    with patch.object(utils, "_build_module_overview") as build_module_overview:
+        cached_result = build_repository_overview(repository_dir, cache_path=cache_path)
+        assert cached_result == result
+        assert build_repository_overview(repository_dir, cache_path=cache_path) is cached_result
+        build_module_overview.assert_not_called()
+
+    # A touched file with the same content is matched by its hash
+    sample_path = os.path.join(repository_dir, "sample.py")
+    os.utime(sample_path, ns=(0, 0))
+    with patch.object(utils, "_build_module_overview") as build_module_overview:
+        assert build_repository_overview(repository_dir, cache_path=cache_path) == result
+        build_module_overview.assert_not_called()
+
+    with open(sample_path, "a") as f:
+        f.write("\n\ndef new_function():\n    pass\n")
+    result = build_repository_overview(repository_dir, cache_path=cache_path)
+    assert "     - cls EmptyClass\n     - cls OuterClass" in result
+    assert "     - func new_function\nsample2" in result
+
+    # The entry of a deleted module is pruned from the persistent cache
+    os.remove(os.path.join(repository_dir, "sample2.py"))
+    result = build_repository_overview(repository_dir, cache_path=cache_path)
+    assert "sample2" not in result
+    assert os.path.abspath(
+        os.path.join(repository_dir, "sample2.py")
+    ) not in utils._load_overview_cache(cache_path)
+
+
 def test_get_docstring_function(getter):
     module_name = "sample"
     object_path = "sample_function"
@@ -84,6 +127,21 @@ def test_find_expression_context(getter):
     assert result == expected_match
 
 
+def test_get_source_code_with_unicode_line_separators(tmp_path):
+    # Form feeds and unicode separators are not line breaks in python source
+    with open(tmp_path / "separators.py", "w", encoding="utf-8", newline="") as f:
+        f.write(
+            'X = "a\x0cb\x85c"\n\x0c\ndef f():\r\n    return "\u2028\x1c"\r\n\n\ndef g():\n    pass\n'
+        )
+    getter = PythonCodeRetriever(LazyModuleTreeMap(str(tmp_path)))
+
+    assert getter.get_source_code("separators", "g") == "def g():\n    pass\n"
+    assert getter.get_parent_function_name_by_line("separators", 4) == "f"
+    assert getter.get_expression_context("pass", symmetric_width=0).startswith(
+        "separators.g\nL8\n"
+    )
+
+
 def test_get_docstring_multiline(getter):
     module_name = "sample2"
     object_path = "PythonAgentToolBuilder.__init__"
@@ -115,3 +173,90 @@ def test_get_docstring_nested_class_method(getter):
     result = getter.get_docstring(module_name, object_path)
     expected_match = "Inner method doc strings"
     assert result == expected_match
+
+
+def test_get_source_code_method(getter):
+    module_name = "sample"
+    object_path = "Person.say_hello"
+    result = getter.get_source_code(module_name, object_path)
+    expected_match = 'def say_hello(self):\n        """This is a sample method."""\n        return f"Hello, I am {self.name}."\n\n    '
+    assert result == expected_match
+
+
+def test_get_source_code_not_found(getter):
+    assert getter.get_source_code("sample", "Person.missing_method") == NO_RESULT_FOUND_STR
+    assert getter.get_source_code("missing_module", None) == NO_RESULT_FOUND_STR
+
+
+def test_get_parent_function_name_by_line(getter):
+    module_name = "sample"
+    assert getter.get_parent_function_name_by_line(module_name, 6) == "sample_function"
+    assert getter.get_parent_function_name_by_line(module_name, 19) == "Person.say_hello"
+    assert getter.get_parent_function_name_by_line(module_name, 39) == "InnerClass.inner_method"
+    assert getter.get_parent_function_name_by_line(module_name, 2) == NO_RESULT_FOUND_STR
+    assert getter.get_parent_function_name_by_line(module_name, 8) == NO_RESULT_FOUND_STR
+    assert getter.get_parent_function_name_by_line(module_name, 11) == NO_RESULT_FOUND_STR
+
+
+def test_get_code_no_docstring_nested_class(getter):
+    module_name = "sample"
+    object_path = "OuterClass"
+    result = getter.get_source_code_without_docstrings(module_name, object_path)
+    expected_match = (
+        "class OuterClass:\n    class InnerClass:\n\n        def inner_method(self):\n"
+    )
+    assert result == expected_match
+
+
+def test_get_code_no_docstring_is_cached_per_module_version(getter):
+    module_name = "sample"
+    object_path = "Person"
+    result = getter.get_source_code_without_docstrings(module_name, object_path)
+    assert getter.get_source_code_without_docstrings(module_name, object_path) is result
+
+    getter.module_tree_map.invalidate_source_index(module_name)
+    assert getter.get_source_code_without_docstrings(module_name, object_path) == result
+    assert getter.get_source_code_without_docstrings(module_name, object_path) is not result
+
+
+def test_get_parent_function_names_by_lines(getter):
+    module_name = "sample"
+    line_numbers = [6, 19, 39, 2, 8, 11, 0, 1000]
+    result = getter.get_parent_function_names_by_lines(module_name, line_numbers)
+    assert result == [
+        getter.get_parent_function_name_by_line(module_name, line_number)
+        for line_number in line_numbers
+    ]
+    assert getter.get_parent_function_names_by_lines("missing_module", [1, 2]) == [
+        NO_RESULT_FOUND_STR,
+        NO_RESULT_FOUND_STR,
+    ]
+
+
+def test_get_parent_function_num_code_lines(getter):
+    module_name = "sample"
+    assert getter.get_parent_function_num_code_lines(module_name, 7) == 3
+    assert getter.get_parent_function_num_code_lines(module_name, 22) == 2
+    assert getter.get_parent_function_num_code_lines(module_name, 11) == NO_RESULT_FOUND_STR
+    assert getter.get_parent_function_num_code_lines_by_lines(module_name, [15, 31, 39]) == [
+        3,
+        NO_RESULT_FOUND_STR,
+        2,
+    ]
+
+
+def test_get_code_by_line_nested_method(getter):
+    module_name = "sample"
+    line_number = 39
+    result = getter.get_parent_code_by_line(module_name, line_number, True)
+    expected_match = '1: """This is a sample module"""\n...\n5: def sample_function(name):\n6:     """This is a sample function."""\n...\n10: class Person:\n11:     """This is a sample class."""\n...\n25: def f(x) -> int:\n26:     """This is my new function"""\n...\n30: class EmptyClass:\n...\n34: class OuterClass:\n35:     class InnerClass:\n36:         """Inner doc strings"""\n...\n38:         def inner_method(self):\n39:             """Inner method doc strings"""\n'
+    assert result == expected_match
+
+
+def test_get_code_by_line_module_level(getter):
+    module_name = "sample"
+    assert (
+        getter.get_parent_code_by_line(module_name, 2)
+        == '"""This is a sample module"""\nimport math\n'
+    )
+    assert getter.get_parent_code_by_line(module_name, 3) == NO_RESULT_FOUND_STR
@@ -0,0 +1,118 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pytest
+from redbaron import RedBaron
+
+from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
+from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
+from automata.core.code_indexing.syntax_tree_navigation import find_syntax_tree_node
+from automata.core.utils import root_py_path
+
+BENCHMARK_MODULE_LIMIT = 20
+
+ObjectQuery = Tuple[str, Optional[str]]
+
+
+@pytest.fixture(scope="module")
+def repository_queries() -> List[ObjectQuery]:
+    """Builds (module, object) queries over the largest modules of this repository."""
+    module_map = LazyModuleTreeMap(root_py_path())
+    indices = [
+        (module_dotpath, module_map.get_source_index(module_dotpath))
+        for module_dotpath, _ in module_map._dotpath_map.items()
+        if "test" not in module_dotpath
+    ]
+    indices = sorted(
+        [(module_dotpath, index) for module_dotpath, index in indices if index],
+        key=lambda item: -len(item[1].source),  # type: ignore
+    )[:BENCHMARK_MODULE_LIMIT]
+
+    queries: List[ObjectQuery] = []
+    for module_dotpath, index in indices:
+        queries.append((module_dotpath, None))
+        queries.extend((module_dotpath, scope.name) for scope in index.scopes)  # type: ignore
+    return queries
+
+
+def _time_per_call(func: Callable[[str, Optional[str]], str], queries: List[ObjectQuery]):
+    start = time.perf_counter()
+    results = [func(module_dotpath, object_path) for module_dotpath, object_path in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+@pytest.mark.benchmark
+def test_benchmark_get_source_code(repository_queries):
+    def redbaron_get_source_code(module_dotpath: str, object_path: Optional[str]) -> str:
+        if module_dotpath not in redbaron_modules:
+            source = module_map.get_source_index(module_dotpath).source  # type: ignore
+            redbaron_modules[module_dotpath] = RedBaron(source)
+        return find_syntax_tree_node(redbaron_modules[module_dotpath], object_path).dumps()  # type: ignore
+
+    # The modules RedBaron cannot parse, e.g. some async syntax, are only served by the ast index
+    fst_module_map = LazyModuleTreeMap(root_py_path())
+    queries = [
+        (module_dotpath, object_path)
+        for module_dotpath, object_path in repository_queries
+        if fst_module_map.get_module(module_dotpath) is not None
+    ]
+
+    module_map = LazyModuleTreeMap(root_py_path())
+    redbaron_modules: Dict[str, RedBaron] = {}
+    redbaron_cold_latency, redbaron_results = _time_per_call(redbaron_get_source_code, queries)
+    redbaron_warm_latency, _ = _time_per_call(redbaron_get_source_code, queries)
+
+    retriever = PythonCodeRetriever(LazyModuleTreeMap(root_py_path()))
+    ast_cold_latency, ast_results = _time_per_call(retriever.get_source_code, queries)
+    ast_warm_latency, _ = _time_per_call(retriever.get_source_code, queries)
+
+    print(
+        f"\nget_source_code over {len(queries)} queries:"
+        f"\n  redbaron (cold): {redbaron_cold_latency * 1e3:.3f} ms/call"
+        f"\n  redbaron (warm): {redbaron_warm_latency * 1e3:.3f} ms/call"
+        f"\n  ast index (cold): {ast_cold_latency * 1e3:.3f} ms/call"
+        f"\n  ast index (warm): {ast_warm_latency * 1e3:.3f} ms/call"
+    )
+    assert ast_results == redbaron_results
+
+
+@pytest.mark.benchmark
+def test_benchmark_get_parent_function_name_by_line(repository_queries):
+    module_dotpaths = sorted({module_dotpath for module_dotpath, _ in repository_queries})
+    retriever = PythonCodeRetriever(LazyModuleTreeMap(root_py_path()))
+    line_queries = [
+        (module_dotpath, line_number)
+        for module_dotpath in module_dotpaths
+        for line_number in range(
+            1, len(retriever.module_tree_map.get_source_index(module_dotpath).line_offsets)  # type: ignore
+        )
+    ]
+
+    start = time.perf_counter()
+    results = [
+        retriever.get_parent_function_name_by_line(module_dotpath, line_number)
+        for module_dotpath, line_number in line_queries
+    ]
+    latency = (time.perf_counter() - start) / len(line_queries)
+
+    start = time.perf_counter()
+    batch_results = []
+    for module_dotpath in module_dotpaths:
+        batch_results.extend(
+            retriever.get_parent_function_names_by_lines(
+                module_dotpath,
+                [
+                    line_number
+                    for dotpath, line_number in line_queries
+                    if dotpath == module_dotpath
+                ],
+            )
+        )
+    batch_latency = (time.perf_counter() - start) / len(line_queries)
+
+    print(
+        f"\nget_parent_function_name_by_line over {len(line_queries)} lines:"
+        f"\n  ast index: {latency * 1e3:.3f} ms/call"
+        f"\n  ast index (batched per module): {batch_latency * 1e3:.3f} ms/line"
+    )
+    assert batch_results == results
@@ -1,9 +1,21 @@
 import ast
+import hashlib
+import json
+import logging
 import os
 from _ast import AsyncFunctionDef, ClassDef, FunctionDef
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 NO_RESULT_FOUND_STR = "No Result Found."
 DOT_SEP = "."
+# Below this number of modules to parse, a process pool costs more than it saves
+MIN_MODULES_FOR_PARALLEL_PARSE = 32
+
+OverviewFingerprint = Tuple[Tuple[str, int, int], ...]
+_overview_memo: Dict[Tuple[str, bool], Tuple[OverviewFingerprint, str]] = {}
 
 
 def convert_fpath_to_module_dotpath(root_abs_path, module_path):
@@ -11,26 +23,130 @@ def convert_fpath_to_module_dotpath(root_abs_path, module_path):
     return module_rel_path
 
 
-def build_repository_overview(path: str, skip_test: bool = True) -> str:
+def build_repository_overview(
+    path: str, skip_test: bool = True, cache_path: Optional[str] = None
+) -> str:
     """
     Loops over the directory python files and returns a string that provides an overview of the PythonParser's state.
+
+    The overview of each module is cached, in memory and in the JSON file at cache_path if provided.
+    Entries are keyed by file path and checked against the file mtime and size, then against a hash of
+    its content, so only new or modified modules are parsed, in parallel if there are many of them.
+
+    Args:
+        path (str): The directory to walk.
+        skip_test (bool): Whether to skip the files with "test" in their name.
+        cache_path (Optional[str]): The path of the persistent cache of module overviews.
     Returns:
         str: A string that provides an overview of the PythonParser's state.
     **NOTE: This method uses AST, not RedBaron, because RedBaron initialization is slow and unnecessary for this method.
     """
-    result_lines = []
-
+    module_paths = []
     for root, _, files in os.walk(path):
         for file in files:
             if "test" in file and skip_test:
                 continue
             if file.endswith(".py"):
-                module_path = os.path.join(root, file)
-                module = ast.parse(open(module_path).read())
-                relative_module_path = convert_fpath_to_module_dotpath(path, module_path)
-                result_lines.append(relative_module_path)
-                _overview_traverse_helper(module, result_lines)
-    return "\n".join(result_lines)
+                module_paths.append(os.path.join(root, file))
+
+    module_stats = [os.stat(module_path) for module_path in module_paths]
+    fingerprint = tuple(
+        (module_path, module_stat.st_mtime_ns, module_stat.st_size)
+        for module_path, module_stat in zip(module_paths, module_stats)
+    )
+    memo_key = (os.path.abspath(path), skip_test)
+    if memo_key in _overview_memo and _overview_memo[memo_key][0] == fingerprint:
+        return _overview_memo[memo_key][1]
+
+    cache = _load_overview_cache(cache_path)
+    # The entries of deleted modules are pruned, the cache is shared by the overviews of every path
+    is_cache_modified = _prune_overview_cache(cache)
+    modules_to_parse: Dict[str, str] = {}
+    for module_path, module_mtime_ns, module_size in fingerprint:
+        cache_key = os.path.abspath(module_path)
+        cache_entry = cache.get(cache_key)
+        if (
+            cache_entry
+            and cache_entry["mtime_ns"] == module_mtime_ns
+            and cache_entry["size"] == module_size
+        ):
+            continue
+        with open(module_path, "rb") as f:
+            source = f.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+        if not cache_entry or cache_entry["sha256"] != source_hash:
+            modules_to_parse[cache_key] = source.decode("utf-8")
+            cache_entry = {"lines": []}
+        cache[cache_key] = {
+            **cache_entry,
+            "mtime_ns": module_mtime_ns,
+            "size": module_size,
+            "sha256": source_hash,
+        }
+        is_cache_modified = True
+
+    for cache_key, module_lines in zip(
+        modules_to_parse.keys(), _build_module_overviews(list(modules_to_parse.values()))
+    ):
+        cache[cache_key]["lines"] = module_lines
+
+    result_lines = []
+    for module_path in module_paths:
+        result_lines.append(convert_fpath_to_module_dotpath(path, module_path))
+        result_lines.extend(cache[os.path.abspath(module_path)]["lines"])
+    overview = "\n".join(result_lines)
+
+    if cache_path and is_cache_modified:
+        _save_overview_cache(cache_path, cache)
+    _overview_memo[memo_key] = (fingerprint, overview)
+    return overview
+
+
+def _build_module_overviews(sources: List[str]) -> List[List[str]]:
+    """Parses the given module sources into overview lines, in a process pool if there are many of them."""
+    if len(sources) < MIN_MODULES_FOR_PARALLEL_PARSE:
+        return [_build_module_overview(source) for source in sources]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(_build_module_overview, sources, chunksize=8))
+
+
+def _build_module_overview(source: str) -> List[str]:
+    line_items: List[str] = []
+    _overview_traverse_helper(ast.parse(source), line_items)
+    return line_items
+
+
+def _load_overview_cache(cache_path: Optional[str]) -> Dict[str, Dict]:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load the repository overview cache '{cache_path}' due to: {e}")
+        return {}
+
+
+def _prune_overview_cache(cache: Dict[str, Dict]) -> bool:
+    """Removes the entries of the modules that no longer exist, returns whether any was removed."""
+    deleted_module_paths = [
+        module_path for module_path in cache if not os.path.exists(module_path)
+    ]
+    for module_path in deleted_module_paths:
+        del cache[module_path]
+    return bool(deleted_module_paths)
+
+
+def _save_overview_cache(cache_path: str, cache: Dict[str, Dict]) -> None:
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        # Write to a temporary file first, so that concurrent readers never see a partial cache
+        tmp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_cache_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_cache_path, cache_path)
+    except Exception as e:
+        logger.error(f"Failed to save the repository overview cache '{cache_path}' due to: {e}")
 
 
 def _overview_traverse_helper(node, line_items, num_spaces=1):
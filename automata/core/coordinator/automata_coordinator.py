@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING, List
 
 from automata.configs.config_enums import AgentConfigName
 from automata.core.agent.automata_actions import AgentAction
+from automata.core.base.tool_result_cache import ToolResultCache
 from automata.core.coordinator.automata_instance import AutomataInstance
 
 if TYPE_CHECKING:
@@ -15,6 +16,7 @@ class AutomataCoordinator:
         multiple AutomataInstances.
         """
         self.agent_instances: List[AutomataInstance] = []
+        self.tool_result_cache = ToolResultCache()
 
     def add_agent_instance(self, agent_instance: AutomataInstance) -> None:
         """
@@ -29,6 +31,8 @@ class AutomataCoordinator:
         # Check agent has not already been added via name field
         if agent_instance.config_name in [ele.config_name for ele in self.agent_instances]:
             raise ValueError("Agent already exists.")
+        # The agents of the instance share the outputs of their cacheable tools with the main agent
+        agent_instance.tool_result_cache = self.tool_result_cache
         self.agent_instances.append(agent_instance)
 
     def remove_agent_instance(self, config_name: AgentConfigName) -> None:
@@ -78,6 +82,23 @@ class AutomataCoordinator:
         except Exception as e:
             return str("Execution fail with error: " + str(e))
 
+    async def arun_agent(self, action: AgentAction) -> str:
+        """
+        Executes the specified action on the selected agent instance asynchronously and returns the result.
+
+        Args:
+            action (AgentAction): The action to be executed on the agent instance.
+
+        Returns:
+            str: The output produced by the agent instance.
+        """
+        try:
+            agent_instance = self._select_agent_instance(action.agent_version)
+            output = await agent_instance.arun("\n".join(action.agent_instruction))
+            return output
+        except Exception as e:
+            return str("Execution fail with error: " + str(e))
+
     def _select_agent_instance(self, config_name: AgentConfigName) -> AutomataInstance:
         """
         Retrieves an AutomataInstance from the list of managed agent instances by its config_name.
@@ -1,16 +1,18 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel
 
 from automata.configs.automata_agent_config_utils import AutomataAgentConfigFactory
 from automata.configs.config_enums import AgentConfigName
 from automata.core.agent.automata_agent_utils import AutomataAgentFactory
+from automata.core.base.tool_result_cache import ToolResultCache
 
 
 class AutomataInstance(BaseModel):
     config_name: AgentConfigName = AgentConfigName.DEFAULT
     description: str = ""
     kwargs: Dict[str, Any] = {}
+    tool_result_cache: Optional[ToolResultCache] = None
 
     @classmethod
     def create(cls, config_name: AgentConfigName, description: str = "", **kwargs):
@@ -35,9 +37,36 @@ class AutomataInstance(BaseModel):
         )
 
         agent = AutomataAgentFactory.create_agent(instructions, config=main_config)
+        if self.tool_result_cache:
+            agent.tool_result_cache = self.tool_result_cache
         result = agent.run()
         del agent
         return result
 
+    async def arun(self, instructions: str) -> str:
+        """
+        Executes the specified instructions on an agent built from this instance's configuration
+        asynchronously and returns the result.
+
+        Args:
+            instructions (str): The instructions to be executed by the agent.
+
+        Returns:
+            str: The output produced by the agent.
+
+        Raises:
+            Exception: If any error occurs during agent execution.
+        """
+        main_config = AutomataAgentConfigFactory.create_config(
+            main_config_name=self.config_name, **self.kwargs
+        )
+
+        agent = AutomataAgentFactory.create_agent(instructions, config=main_config)
+        if self.tool_result_cache:
+            agent.tool_result_cache = self.tool_result_cache
+        result = await agent.arun()
+        del agent
+        return result
+
     class Config:
         arbitrary_types_allowed = True
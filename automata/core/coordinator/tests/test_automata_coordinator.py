@@ -64,6 +64,15 @@ def test_set_coordinator_main(coordinator, main_agent):
     main_agent.set_coordinator(coordinator)
 
 
+def test_coordinator_shares_tool_result_cache(coordinator, main_agent):
+    agent_instance = AutomataInstance(config_name=AgentConfigName.TEST)
+    coordinator.add_agent_instance(agent_instance)
+    main_agent.set_coordinator(coordinator)
+
+    assert agent_instance.tool_result_cache is coordinator.tool_result_cache
+    assert main_agent.tool_result_cache is coordinator.tool_result_cache
+
+
 def test_cannot_add_agent_twice(coordinator):
     agent_instance = AutomataInstance(config_name=AgentConfigName.TEST)
 
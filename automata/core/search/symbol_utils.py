@@ -111,8 +111,8 @@ def find_pattern_in_modules(pattern: str) -> Dict[str, List[int]]:
     """
     matches = {}
     module_map = LazyModuleTreeMap.cached_default()
-    for module_path, module in module_map.items():
-        lines = module.dumps().splitlines()
+    for module_path, source_index in module_map.source_index_items():
+        lines = source_index.source.splitlines()
         line_numbers = [i + 1 for i, line in enumerate(lines) if pattern in line.strip()]
         if line_numbers:
             matches[module_path] = line_numbers
@@ -6,11 +6,12 @@ from flask_cors import CORS
 
 from automata.cli.cli_utils import reconfigure_logging
 from automata.cli.scripts.run_task import run
-from automata.config import GITHUB_API_KEY, REPOSITORY_NAME, TASK_DB_PATH
+from automata.config import GITHUB_API_KEY, REPOSITORY_NAME, TASK_DB_PATH, WARM_UP_MODULE_MAP
 from automata.configs.config_enums import AgentConfigName
 from automata.core.agent.automata_agent import AutomataAgent
 from automata.core.agent.automata_database_manager import AutomataConversationDatabase
 from automata.core.base.github_manager import GitHubManager
+from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
 from automata.core.tasks.automata_task_executor import TaskExecutor, TestExecuteBehavior
 from automata.core.tasks.automata_task_registry import AutomataTaskDatabase, AutomataTaskRegistry
 
@@ -20,6 +21,11 @@ GLOBAL_DEFAULT_SETTING = logging.DEBUG
 app = Flask(__name__)
 cors = CORS(app)
 
+if WARM_UP_MODULE_MAP:
+    # Tasks run in forked processes, the module indices are warmed up before serving so that they
+    # inherit the complete indices, and no task forks while the warm up pool runs
+    LazyModuleTreeMap.cached_default().warm_up()
+
 
 @app.before_request
 def before_request():
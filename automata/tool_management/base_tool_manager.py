@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from contextlib import nullcontext
+from typing import Any, ContextManager
 
 
 class BaseToolManager(ABC):
@@ -9,3 +10,10 @@ class BaseToolManager(ABC):
     @abstractmethod
     def build_tools(self) -> Any:
         pass
+
+    def turn_context(self) -> ContextManager[None]:
+        """
+        Returns the context in which the tools of one agent turn are run,
+        managers override it to batch the side effects of several tool calls.
+        """
+        return nullcontext()
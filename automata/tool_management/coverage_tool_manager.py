@@ -1,5 +1,6 @@
 from typing import List
 
+from automata.config import COVERAGE_JOB_TIMEOUT, COVERAGE_WAIT_TIMEOUT
 from automata.core.base.tool import Tool
 from automata.tool_management.base_tool_manager import BaseToolManager
 from automata.tools.coverage_tools.coverage_analyzer import CoverageAnalyzer
@@ -9,12 +10,29 @@ from automata.tools.coverage_tools.coverage_processor import CoverageProcessor
 class CoverageToolManager(BaseToolManager):
     def __init__(self, **kwargs):
         coverage_analyzer = CoverageAnalyzer()
-        self.coverage_processor = CoverageProcessor(coverage_analyzer, do_create_issue=True)
+        self.coverage_processor = CoverageProcessor(
+            coverage_analyzer,
+            do_create_issue=True,
+            wait_timeout=COVERAGE_WAIT_TIMEOUT or None,
+            job_timeout=COVERAGE_JOB_TIMEOUT or None,
+        )
         self.model = kwargs.get("model") or "gpt-4"
         self.temperature = kwargs.get("temperature") or 0.7
         self.verbose = kwargs.get("verbose") or False
         self.stream = kwargs.get("stream") or True
 
+    def _run_start_coverage_collection(self):
+        try:
+            return self.coverage_processor.start_coverage_collection().describe()
+        except Exception as e:
+            return str(e)
+
+    def _run_get_coverage_status(self):
+        try:
+            return self.coverage_processor.get_coverage_status()
+        except Exception as e:
+            return str(e)
+
     def _run_list_coverage_gaps(self, input_module):
         try:
             return self.coverage_processor.list_coverage_gaps(input_module)
@@ -29,10 +47,23 @@ class CoverageToolManager(BaseToolManager):
 
     def build_tools(self) -> List[Tool]:
         tools = [
+            Tool(
+                name="start-coverage-collection",
+                description="Useful for running the tests under coverage in the background, while using other tools."
+                " Returns the status of the coverage collection. Input is ignored.",
+                func=lambda _: self._run_start_coverage_collection(),
+            ),
+            Tool(
+                name="get-coverage-status",
+                description="Useful for checking the progress of the coverage collection."
+                " Returns the status and the number of completed test files. Input is ignored.",
+                func=lambda _: self._run_get_coverage_status(),
+            ),
             Tool(
                 name="list-coverage-gaps",
                 description="Useful for listing coverage gaps."
-                "Returns a table of coverage gaps including the module, object, and the overall covered percentage. Input must be a python module path",
+                " Returns a table of coverage gaps including the module, object, and the overall covered percentage. Input must be a python module path."
+                " The results are partial when the coverage collection is still running.",
                 func=lambda module_object_tuple: self._run_list_coverage_gaps(
                     *module_object_tuple
                 ),
@@ -41,7 +72,7 @@ class CoverageToolManager(BaseToolManager):
             Tool(
                 name="process-coverage-gap",
                 description="Useful for creating the context needed to write a test to satisfy a coverage gap. Input should be the coverage gap module and object."
-                "Returns relevant info, like the module, function, uncovered lines, and raw code with uncovered lines marked.",
+                " Returns relevant info, like the module, function, uncovered lines, and raw code with uncovered lines marked.",
                 func=lambda module_object_tuple: self._run_select_and_process_coverage_gap(
                     *module_object_tuple
                 ),
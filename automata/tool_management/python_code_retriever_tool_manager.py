@@ -56,6 +56,8 @@ class PythonCodeRetrieverToolManager(BaseToolManager):
                 f"  - tool_args\n    - my_directory.my_file\n    - MyClass.my_function\n\n",
                 return_direct=True,
                 verbose=True,
+                side_effect_free=True,
+                cacheable=True,
             ),
             Tool(
                 name="python-indexer-retrieve-docstring",
@@ -63,6 +65,8 @@ class PythonCodeRetrieverToolManager(BaseToolManager):
                 description=f"Identical to python-indexer-retrieve-code, except returns the docstring instead of raw code.",
                 return_direct=True,
                 verbose=True,
+                side_effect_free=True,
+                cacheable=True,
             ),
             Tool(
                 name="python-indexer-retrieve-raw-code",
@@ -70,6 +74,8 @@ class PythonCodeRetrieverToolManager(BaseToolManager):
                 description=f"Identical to python-indexer-retrieve-code, except returns the raw text (e.g. code + docstrings) of the module.",
                 return_direct=True,
                 verbose=True,
+                side_effect_free=True,
+                cacheable=True,
             ),
         ]
         return tools
@@ -78,33 +84,19 @@ class PythonCodeRetrieverToolManager(BaseToolManager):
         self, module_path: str, object_path: Optional[str] = None
     ) -> str:
         """PythonIndexer retrieves the code of the python package, module, standalone function, class, or method at the given python path, without docstrings."""
-        try:
-            result = self.code_retriever.get_source_code_without_docstrings(
-                module_path, object_path
-            )
-            return result
-        except Exception as e:
-            return "Failed to retrieve code with error - " + str(e)
+        return self.code_retriever.get_source_code_without_docstrings(module_path, object_path)
 
     def _run_indexer_retrieve_docstring(
         self, module_path: str, object_path: Optional[str] = None
     ) -> str:
         """PythonIndexer retrieves the docstring of the python package, module, standalone function, class, or method at the given python path, without docstrings."""
-        try:
-            result = self.code_retriever.get_docstring(module_path, object_path)
-            return result
-        except Exception as e:
-            return "Failed to retrieve docstring with error - " + str(e)
+        return self.code_retriever.get_docstring(module_path, object_path)
 
     def _run_indexer_retrieve_raw_code(
         self, module_path: str, object_path: Optional[str] = None
     ) -> str:
         """PythonIndexer retrieves the raw code of the python package, module, standalone function, class, or method at the given python path, with docstrings."""
-        try:
-            result = self.code_retriever.get_source_code(module_path, object_path)
-            return result
-        except Exception as e:
-            return "Failed to retrieve raw code with error - " + str(e)
+        return self.code_retriever.get_source_code(module_path, object_path)
 
     def _func_retrieve_code(self, module_object_tuple):
         return self._run_indexer_retrieve_code(*module_object_tuple)
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Optional
+from typing import ContextManager, List, Optional
 
 from automata.configs.config_enums import AgentConfigName
 from automata.core.base.tool import Tool
@@ -97,6 +97,14 @@ class PythonWriterToolManager(BaseToolManager):
         ]
         return tools
 
+    def turn_context(self) -> ContextManager[None]:
+        """
+        Applies the module edits of an agent turn as one transaction, written at the end of the turn with
+        one formatting pass per module. If the edits cannot be written, they are all rolled back and the
+        agent reports the error in place of the outputs of the writer tools of the turn.
+        """
+        return self.writer.transaction()
+
     def _update_existing_module(
         self,
         module_dotpath: str,
@@ -106,7 +114,12 @@ class PythonWriterToolManager(BaseToolManager):
         """Writes the given code to the given module path and class name."""
         try:
             print("Attempting to write update to existing module_path = ", module_dotpath)
-            self.writer.update_existing_module(module_dotpath, code, disambiguator, self.do_write)
+            # Within an agent turn, a failed call only rolls back its own edits, outside of a turn the
+            # call is written on its own
+            with self.writer.transaction():
+                self.writer.update_existing_module(
+                    module_dotpath, code, disambiguator, self.do_write
+                )
             return "Success"
         except Exception as e:
             return "Failed to update the module with error - " + str(e)
@@ -119,7 +132,10 @@ class PythonWriterToolManager(BaseToolManager):
         """Writes the given code to the given module path and class name."""
         try:
             print("Attempting to reduce existing module_path = ", module_dotpath)
-            self.writer.delete_from_existing__module(module_dotpath, object_dotpath, self.do_write)
+            with self.writer.transaction():
+                self.writer.delete_from_existing__module(
+                    module_dotpath, object_dotpath, self.do_write
+                )
             return "Success"
         except Exception as e:
             return "Failed to reduce the module with error - " + str(e)
@@ -128,7 +144,8 @@ class PythonWriterToolManager(BaseToolManager):
         """Writes the given code to the given module path and class name."""
         try:
             print("Attempting to write new module_path = ", module_dotpath)
-            self.writer.create_new_module(module_dotpath, code, self.do_write)
+            with self.writer.transaction():
+                self.writer.create_new_module(module_dotpath, code, self.do_write)
             return "Success"
         except Exception as e:
             return "Failed to create the module with error - " + str(e)
@@ -47,6 +47,8 @@ class SymbolSearcherToolManager:
                 name=tool_type.value,
                 func=tool_funcs[tool_type],
                 description=tool_descriptions[tool_type],
+                side_effect_free=True,
+                cacheable=True,
             )
         raise ValueError(f"Invalid tool type: {tool_type}")
 
@@ -2,6 +2,7 @@ import inspect
 import os
 import shutil
 import textwrap
+from unittest.mock import patch
 
 import pytest
 
@@ -82,6 +83,65 @@ def test_extend_module_with_new_function(python_writer_tool_builder):
         f.write(prev_text)
 
 
+# Check that an update which cannot be written is reported as failed and rolled back
+def test_update_module_reports_failed_write(python_writer_tool_builder, monkeypatch):
+    current_file = inspect.getframeinfo(inspect.currentframe()).filename
+    absolute_path = os.sep.join(os.path.abspath(current_file).split(os.sep)[:-1])
+    file_abs_path = os.path.join(absolute_path, "sample_code", "sample.py")
+    with open(file_abs_path, "r", encoding="utf-8") as f:
+        prev_text = f.read()
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("automata.tools.python_tools.python_writer.os.replace", failing_replace)
+    code_writer = python_writer_tool_builder.build_tools()[0]
+    output = code_writer.func(("sample_code.sample", None, "def g(x):\n    return x + 1"))
+
+    assert output.startswith("Failed to update the module")
+    with open(file_abs_path, "r", encoding="utf-8") as f:
+        assert f.read() == prev_text
+    retriever = python_writer_tool_builder.writer.code_retriever
+    assert "def g(x)" not in retriever.get_source_code("sample_code.sample")
+
+
+# Check that the edits of a turn are written at the end of the turn, formatting each module once
+def test_turn_context_formats_each_module_once(python_writer_tool_builder):
+    current_file = inspect.getframeinfo(inspect.currentframe()).filename
+    absolute_path = os.sep.join(os.path.abspath(current_file).split(os.sep)[:-1])
+    file_abs_path = os.path.join(absolute_path, "sample_code", "sample.py")
+    new_file_abs_path = os.path.join(absolute_path, "sample_code", "sample3.py")
+    with open(file_abs_path, "r", encoding="utf-8") as f:
+        prev_text = f.read()
+
+    writer = python_writer_tool_builder.writer
+    code_writer, create_module_tool = python_writer_tool_builder.build_tools()[:2]
+    with patch.object(
+        writer.formatter, "format_source", wraps=writer.formatter.format_source
+    ) as format_source:
+        with python_writer_tool_builder.turn_context():
+            for name in ["g", "h", "k"]:
+                code_writer.func(("sample_code.sample", None, f"def {name}(x):\n    return x"))
+            create_module_tool.func(("sample_code.sample3", "def f(x):\n    return x + 1"))
+            code_writer.func(("sample_code.sample3", None, "def m(x):\n    return x"))
+            with open(file_abs_path, "r", encoding="utf-8") as f:
+                assert f.read() == prev_text
+            assert not os.path.exists(new_file_abs_path)
+
+    try:
+        formatted_fpaths = [os.path.abspath(call.args[1]) for call in format_source.call_args_list]
+        assert sorted(formatted_fpaths) == sorted([file_abs_path, new_file_abs_path])
+        with open(file_abs_path, "r", encoding="utf-8") as f:
+            new_sample_text = f.read()
+        assert all(f"def {name}(x)" in new_sample_text for name in ["g", "h", "k"])
+        with open(new_file_abs_path, "r", encoding="utf-8") as f:
+            assert "def m(x)" in f.read()
+    finally:
+        with open(file_abs_path, "w", encoding="utf-8") as f:
+            f.write(prev_text)
+        os.remove(new_file_abs_path)
+
+
 # Check that we can extend existing module "sample.py" with a new function
 # that has documentation and type hints, e.g. "f(x) -> int;    return x + 1"
 def test_extend_module_with_documented_new_function(python_writer_tool_builder):
@@ -71,7 +71,7 @@ class ToolkitBuilder:
         if not tool_manager:
             raise ValueError("Unknown toolkit type: %s" % toolkit_type)
         tools = ToolkitBuilder.build_tools(tool_manager)
-        return Toolkit(tools)
+        return Toolkit(tools, turn_context=tool_manager.turn_context)
 
     @staticmethod
     def build_tools(tool_manager: BaseToolManager) -> List[Tool]:
@@ -1,53 +1,188 @@
+import hashlib
+import json
 import logging
 import os
 import subprocess
-import xml.etree.ElementTree as ET
-from typing import Optional, cast
+import time
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
+from coverage import Coverage, CoverageData
 
-from automata.config import REPOSITORY_PATH
+from automata.config import COVERAGE_NUM_WORKERS, REPOSITORY_PATH
+from automata.core.code_indexing.module_source_index import MODULE_SCOPE
 from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
-from automata.core.code_indexing.utils import NO_RESULT_FOUND_STR
+
+if TYPE_CHECKING:
+    from automata.tools.coverage_tools.coverage_job import CoverageJob
 
 logger = logging.getLogger(__name__)
 
 
 class CoverageAnalyzer:
     """
-    A class to produce a coverage report, load it and parse it into a dataframe.
+    A class to collect coverage data and compute the coverage gaps of a module as a dataframe.
     The df is generated so the info could be consumed by python inspector.
+
+    The test suite runs under coverage at most once per revision of the source tree, the raw coverage
+    data is persisted along with the hashes of the files it was collected from, and the per-module
+    gaps are computed from it with the coverage data API. Each line is recorded with the tests that
+    ran it, so in incremental mode only the tests that ran a changed file, or that changed themselves,
+    are run again. The tests can be sharded across several worker processes, see COVERAGE_NUM_WORKERS.
     # TODO: The nested definitions are not super consistently handled but the inspector should be robust against that given good naming
-    # TODO: this is pretty slow
     """
 
     ROOT_DIR = REPOSITORY_PATH
     ROOT_MODULE = "automata"
     DIR_TO_INDEX = os.path.join(ROOT_DIR, ROOT_MODULE)
-    COVERAGE_FILE_NAME = ".coverage_analyzer_report.xml"
-    COVERAGE_FILE_PATH = os.path.join(ROOT_DIR, COVERAGE_FILE_NAME)
+    COVERAGE_DATA_FILE_NAME = ".coverage_analyzer_data"
+    COVERAGE_DATA_FILE_PATH = os.path.join(ROOT_DIR, COVERAGE_DATA_FILE_NAME)
+    # The revision of the source tree and the hashes of its files when the coverage data was collected
+    COVERAGE_STATE_FILE_PATH = os.path.join(ROOT_DIR, ".coverage_analyzer_state.json")
+    COVERAGE_RC_FILE_PATH = os.path.join(ROOT_DIR, ".coverage_analyzer_rc")
+    SHARD_POLL_INTERVAL = 0.1
+    # The exit codes of a pytest run that ran all the tests, whether or not they passed
+    PYTEST_COMPLETED_EXIT_CODES = (0, 1)
+
+    class TestRunFailed(Exception):
+        """Raised when pytest exits without running the tests, e.g. on an internal or usage error"""
+
+        pass
 
-    def __init__(self, python_retriever: Optional[PythonCodeRetriever] = None):
+    def __init__(
+        self,
+        python_retriever: Optional[PythonCodeRetriever] = None,
+        incremental: bool = False,
+        num_workers: Optional[int] = None,
+    ):
         self.code_retriever = python_retriever or PythonCodeRetriever()
+        self.incremental = incremental
+        self.num_workers = num_workers or COVERAGE_NUM_WORKERS
+        # Coverage dataframes by source tree revision and module file path
+        self._coverage_dfs: Dict[Tuple[str, str], pd.DataFrame] = {}
 
-    def write_coverage_xml(self, module_path: str):
+    def collect_coverage(self, job: Optional["CoverageJob"] = None) -> str:
         """
-        Writes a coverage report to the coverage.xml file
+        Runs the tests under coverage, unless the persisted coverage data was collected from the
+        current revision of the source tree. In incremental mode, the persisted data of the tests
+        that are not affected by the changes since its collection is kept.
+
+        Args:
+            job (Optional[CoverageJob]): The background job running the collection, which is notified
+                as test files complete and can cancel the collection.
+
+        Returns:
+            str: The revision of the source tree, which identifies the coverage data.
         """
-        logger.debug("Writing coverage data...")
-        subprocess.run(
-            [
-                "coverage",
-                "run",
-                "--source",
-                self.ROOT_MODULE,
-                "-m",
-                "pytest",
-            ],
-            cwd=self.ROOT_DIR,
-            # stdout=subprocess.DEVNULL,
+        file_hashes = self._hash_source_tree()
+        revision = CoverageAnalyzer._get_revision(file_hashes)
+        if self.has_coverage_data(revision):
+            logger.debug("Coverage data is up to date.")
+            return revision
+        state = self._load_state()
+        has_data = os.path.exists(self.COVERAGE_DATA_FILE_PATH)
+
+        logger.debug("Collecting coverage data...")
+        if self.incremental and state and has_data:
+            changed_files = {
+                fpath
+                for fpath in set(file_hashes) | set(state["file_hashes"])
+                if file_hashes.get(fpath) != state["file_hashes"].get(fpath)
+            }
+            # A cancelled incremental run leaves the persisted data untouched
+            completed = self._collect_coverage_incrementally(changed_files, job)
+        else:
+            if has_data:
+                os.remove(self.COVERAGE_DATA_FILE_PATH)
+            completed = False
+            try:
+                completed = self._run_tests([], self.COVERAGE_DATA_FILE_PATH, job)
+            finally:
+                if not completed and os.path.exists(self.COVERAGE_STATE_FILE_PATH):
+                    # The partial data must not be mistaken for the data of a revision by the next runs
+                    os.remove(self.COVERAGE_STATE_FILE_PATH)
+        if not completed:
+            logger.debug("Coverage data collection was cancelled.")
+            return revision
+        self._save_state({"revision": revision, "file_hashes": file_hashes})
+        logger.debug("Done collecting coverage data.")
+        return revision
+
+    def get_revision(self) -> str:
+        """Returns the current revision of the source tree, a hash of the contents of its files."""
+        return CoverageAnalyzer._get_revision(self._hash_source_tree())
+
+    def has_coverage_data(self, revision: str) -> bool:
+        """Checks whether the persisted coverage data was collected from the given revision."""
+        state = self._load_state()
+        return bool(
+            state
+            and state["revision"] == revision
+            and os.path.exists(self.COVERAGE_DATA_FILE_PATH)
         )
 
+    def get_coverage_df(
+        self,
+        module_path: str,
+        data_file_path: Optional[str] = None,
+        revision: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Computes the coverage gaps of a module from the coverage data of the current revision of the
+        source tree. The uncovered lines are mapped to the functions enclosing them with the line to
+        function table of the module source index, and the results are cached by revision.
+
+        Args:
+            module_path (str): The module, as a file path or a module dotpath.
+            data_file_path (Optional[str]): Compute the gaps from this coverage data file instead, e.g. the
+                partial data of a running job, without collecting coverage or caching the result.
+            revision (Optional[str]): Compute the gaps from the persisted coverage data of this revision,
+                e.g. the revision of a completed job, without collecting coverage.
+
+        Returns:
+            pd.DataFrame: One row per function with uncovered lines, with the module, the function (object),
+                its uncovered line numbers and its percent covered, sorted by percent covered ascending.
+
+        Raises:
+            ValueError: If the persisted coverage data is not the data of the given revision anymore.
+        """
+        module_fpath = self._get_module_fpath(module_path)
+        if data_file_path:
+            return self._compute_coverage_df(module_fpath, data_file_path)
+
+        if revision is None:
+            revision = self.collect_coverage()
+        elif (revision, module_fpath) not in self._coverage_dfs and not self.has_coverage_data(
+            revision
+        ):
+            raise ValueError(f"The coverage data of revision {revision} was replaced")
+        if (revision, module_fpath) not in self._coverage_dfs:
+            self._coverage_dfs = {
+                key: coverage_df
+                for key, coverage_df in self._coverage_dfs.items()
+                if key[0] == revision
+            }
+            self._coverage_dfs[(revision, module_fpath)] = self._compute_coverage_df(
+                module_fpath, self.COVERAGE_DATA_FILE_PATH
+            )
+        return self._coverage_dfs[(revision, module_fpath)]
+
+    def _compute_coverage_df(self, module_fpath: str, data_file_path: str) -> pd.DataFrame:
+        logger.debug("Parsing coverage data...")
+        coverage = Coverage(data_file=data_file_path, config_file=False)
+        coverage.load()
+        _, _, _, missing_line_numbers, _ = coverage.analysis2(module_fpath)
+        module_dotpath = os.path.splitext(os.path.relpath(module_fpath, self.DIR_TO_INDEX))[
+            0
+        ].replace(os.path.sep, ".")
+        coverage_df = self._build_coverage_df(module_dotpath, missing_line_numbers)
+        logger.debug("Coverage data parsed.")
+        return coverage_df
+
+    def _get_module_fpath(self, module_path: str) -> str:
+        """Resolves a module given as a file path or a module dotpath to its file path"""
         # check if path is a filesytem path or a module path
         if not os.path.exists(module_path):
             if "." in module_path and not module_path.endswith(".py"):
@@ -57,92 +192,319 @@ class CoverageAnalyzer:
             module_path = os.path.join(self.ROOT_DIR, module_path)
 
         assert os.path.exists(module_path), f"Module path {module_path} does not exist"
-        subprocess.run(
-            [
-                "coverage",
-                "xml",
-                "-o",
-                self.COVERAGE_FILE_PATH,
-                module_path,
-            ],
-            cwd=self.ROOT_DIR,
-            stdout=subprocess.DEVNULL,
-        )
+        return os.path.abspath(module_path)
 
-        logger.debug("Done writing coverage data.")
+    def _build_coverage_df(
+        self, module_dotpath: str, missing_line_numbers: List[int]
+    ) -> pd.DataFrame:
+        """
+        Groups the uncovered lines of a module by the function enclosing them, with a lookup in the line
+        to function table of the module and a join against its function span table.
+        """
+        columns = ["module", "object", "line_number", "percent_covered"]
+        source_index = self.code_retriever.module_tree_map.get_source_index(module_dotpath)
+        if not source_index or not missing_line_numbers:
+            return pd.DataFrame(columns=columns)
 
-    def parse_coverage_xml(self) -> pd.DataFrame:
-        logger.debug("Parsing coverage data...")
-        tree = ET.parse(self.COVERAGE_FILE_PATH)
-        root = tree.getroot()
-
-        data = []
-        for package in root.findall(".//package"):
-            package_name = cast(str, package.get("name"))
-            if package_name.startswith("automata."):
-                package_name = package_name[9:]
-            for cls in package.findall(".//class"):
-                class_name = cast(
-                    str, cls.get("name")
-                )  # not a real class name, merely the name of the file
-                for line in cls.findall(".//line"):
-                    line_data = {
-                        "module": f"{package_name}.{class_name[:-3]}",  # see above, remove .py
-                        "line_number": int(cast(str, line.get("number"))),
-                        "hits": int(cast(str, line.get("hits"))),
-                    }
-                    data.append(line_data)
-        df = pd.DataFrame(data)
-        df_uncovered_lines = df[df["hits"] == 0]
-        df_uncovered_lines["object"] = df_uncovered_lines.apply(
-            lambda x: self._function_name_from_row(x), axis=1
-        )
-        df_uncovered_lines = df_uncovered_lines[
-            df_uncovered_lines["object"] != NO_RESULT_FOUND_STR
+        function_scopes = [
+            scope for scope, entry in enumerate(source_index.scopes) if entry.kind == "def"
         ]
+        function_spans = pd.DataFrame(
+            {
+                "object": [source_index.get_qualified_name(scope) for scope in function_scopes],
+                "num_lines": source_index.get_scope_line_counts(
+                    np.array(function_scopes, dtype=np.int64)
+                ),
+            },
+            index=pd.Index(function_scopes, name="scope"),
+        )
 
-        df_uncovered_lines = (
-            df_uncovered_lines.groupby(["module", "object"])
-            .agg({"line_number": list})
-            .reset_index()
+        line_numbers = np.array(sorted(missing_line_numbers), dtype=np.int64)
+        uncovered_lines = pd.DataFrame(
+            {
+                "scope": source_index.find_innermost_scopes_by_lines(line_numbers, kind="def"),
+                "line_number": line_numbers,
+            }
+        )
+        uncovered_lines = uncovered_lines[uncovered_lines["scope"] != MODULE_SCOPE]
+        gaps = uncovered_lines.groupby("scope").agg(
+            line_number=("line_number", list), num_uncovered=("line_number", "size")
         )
-        df_uncovered_lines["percent_covered"] = df_uncovered_lines.apply(
-            lambda x: self._percent_covered_function_from_row(x), axis=1
+        coverage_df = gaps.join(function_spans, how="inner").reset_index(drop=True)
+        coverage_df["module"] = module_dotpath
+        coverage_df["percent_covered"] = (
+            1 - coverage_df["num_uncovered"] / coverage_df["num_lines"]
         )
         # sort by percent covered ascending
-        df_uncovered_lines = df_uncovered_lines.sort_values(
-            by=["percent_covered"], ascending=True
-        ).reset_index(drop=True)
+        return (
+            coverage_df[columns]
+            .sort_values(by=["percent_covered"], ascending=True, kind="stable")
+            .reset_index(drop=True)
+        )
 
-        logger.debug("Coverage data parsed.")
+    def _collect_coverage_incrementally(
+        self, changed_files: Set[str], job: Optional["CoverageJob"] = None
+    ) -> bool:
+        """
+        Runs the tests affected by the changed files and merges their coverage data with the persisted
+        data of the other tests. The persisted data of the changed files is dropped, since its line
+        numbers may be stale, so every test that ran one of them is affected. A changed module that was
+        only run when the tests were imported, without any test context, cannot be mapped to the tests
+        importing it, so all the tests run again instead.
+
+        Returns:
+            bool: Whether the affected tests ran, False if the job was cancelled.
+        """
+        previous_data = self._read_coverage_data(self.COVERAGE_DATA_FILE_PATH)
 
-        return df_uncovered_lines
+        affected_contexts: Set[str] = set()
+        run_all_tests = False
+        for measured_file in previous_data.measured_files():
+            fpath = os.path.relpath(measured_file, self.ROOT_DIR)
+            if fpath not in changed_files:
+                continue
+            file_contexts: Set[str] = set()
+            for contexts in previous_data.contexts_by_lineno(measured_file).values():
+                file_contexts.update(contexts)
+            if file_contexts and file_contexts <= {""} and not self._is_test_file(fpath):
+                logger.debug(f"{fpath} was only run at import time, running all the tests")
+                run_all_tests = True
+            affected_contexts.update(file_contexts)
+        affected_contexts.discard("")
 
-    def _function_name_from_row(self, row) -> str:
+        # The changed test files run as a whole, the tests removed from them or with them are not run
+        changed_test_fpaths = {
+            fpath
+            for fpath in changed_files
+            if self._is_test_file(fpath) and os.path.exists(os.path.join(self.ROOT_DIR, fpath))
+        }
+        test_ids = {
+            test_id
+            for test_id in map(self._context_to_test_id, affected_contexts)
+            if "::" in test_id and test_id.split("::")[0] not in changed_test_fpaths
+        }
+        test_ids.update(changed_test_fpaths)
+        if run_all_tests:
+            affected_contexts = set(previous_data.measured_contexts())
+        logger.debug(
+            f"Running {'all the' if run_all_tests else len(test_ids)} tests affected by "
+            f"{len(changed_files)} files"
+        )
+
+        # Lines of the unchanged files, by the context that ran them
+        kept_lines: Dict[str, Dict[str, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        for measured_file in previous_data.measured_files():
+            if os.path.relpath(measured_file, self.ROOT_DIR) in changed_files:
+                continue
+            for line_number, contexts in previous_data.contexts_by_lineno(measured_file).items():
+                for context in contexts:
+                    if context not in affected_contexts:
+                        kept_lines[context][measured_file].add(line_number)
+
+        # The affected tests add their data to the kept data, the result replaces the persisted data
+        merged_data_file_path = f"{self.COVERAGE_DATA_FILE_PATH}.merged"
+        if os.path.exists(merged_data_file_path):
+            os.remove(merged_data_file_path)
+        merged_data = CoverageData(merged_data_file_path)
+        for context, lines in kept_lines.items():
+            merged_data.set_context(context)
+            merged_data.add_lines(
+                {fpath: sorted(line_numbers) for fpath, line_numbers in lines.items()}
+            )
+        merged_data.write()
+        if (run_all_tests or test_ids) and not self._run_tests(
+            [] if run_all_tests else sorted(test_ids), merged_data_file_path, job
+        ):
+            return False
+        os.replace(merged_data_file_path, self.COVERAGE_DATA_FILE_PATH)
+        return True
+
+    def _run_tests(
+        self, test_ids: List[str], data_file_path: str, job: Optional["CoverageJob"] = None
+    ) -> bool:
         """
-        Helper function to retrieve the function name from metadata in the row of a dataframe
-        :param row: A row of a dataframe that has package, module and line number entries
-        see TODO in class docstring
+        Runs the given tests, or all tests if none is given, under coverage, adding their data to the
+        data file. Each executed line is recorded with the test function that ran it. With several
+        workers, the test files are split into one shard per worker, the shards run in parallel processes,
+        each with its own data file, combined into the data file as they complete. For a background job,
+        every test file is a shard of its own, so its results are updated as each test file completes,
+        while at most one shard per worker runs at a time.
+
+        Returns:
+            bool: Whether all the tests ran, False if the job was cancelled.
+
+        Raises:
+            TestRunFailed: If pytest exits without running the tests.
         """
-        name = self.code_retriever.get_parent_function_name_by_line(row.module, row.line_number)
-        return name
+        with open(self.COVERAGE_RC_FILE_PATH, "w") as rc_file:
+            rc_file.write(f"[run]\nsource = {self.ROOT_MODULE}\ndynamic_context = test_function\n")
+        if self.num_workers <= 1 and not job:
+            result = subprocess.run(
+                self._build_coverage_command(test_ids, data_file_path),
+                cwd=self.ROOT_DIR,
+                # stdout=subprocess.DEVNULL,
+            )
+            self._check_exit_code(result.returncode, test_ids)
+            return True
 
-    def _percent_covered_function_from_row(self, row):
+        shards = self._shard_tests(test_ids, None if job else self.num_workers)
+        logger.debug(f"Running the tests in {len(shards)} shards...")
+        if job:
+            job.on_tests_started(
+                data_file_path,
+                len({test_id.split("::")[0] for shard in shards for test_id in shard}),
+            )
+        coverage_data = CoverageData(data_file_path)
+        pending_shards = list(enumerate(shards))
+        running_shards: Dict[int, subprocess.Popen] = {}
+        try:
+            while pending_shards or running_shards:
+                if job and job.is_cancelled():
+                    return False
+                while pending_shards and len(running_shards) < max(self.num_workers, 1):
+                    shard_index, shard = pending_shards.pop(0)
+                    running_shards[shard_index] = subprocess.Popen(
+                        self._build_coverage_command(
+                            shard, f"{data_file_path}.shard{shard_index}"
+                        ),
+                        cwd=self.ROOT_DIR,
+                        stdout=subprocess.DEVNULL,
+                    )
+                for shard_index, process in list(running_shards.items()):
+                    return_code = process.poll()
+                    if return_code is None:
+                        continue
+                    logger.debug(f"Test shard {shard_index} exited with code {return_code}")
+                    del running_shards[shard_index]
+                    shard_data_file_path = f"{data_file_path}.shard{shard_index}"
+                    if os.path.exists(shard_data_file_path):
+                        coverage_data.update(self._read_coverage_data(shard_data_file_path))
+                        coverage_data.write()
+                        os.remove(shard_data_file_path)
+                    self._check_exit_code(return_code, shards[shard_index])
+                    if job:
+                        job.on_test_files_completed(
+                            sorted({test_id.split("::")[0] for test_id in shards[shard_index]})
+                        )
+                if running_shards:
+                    time.sleep(self.SHARD_POLL_INTERVAL)
+        finally:
+            for shard_index, process in running_shards.items():
+                process.terminate()
+                process.wait()
+                shard_data_file_path = f"{data_file_path}.shard{shard_index}"
+                if os.path.exists(shard_data_file_path):
+                    os.remove(shard_data_file_path)
+        return True
+
+    def _check_exit_code(self, exit_code: int, test_ids: List[str]) -> None:
+        if exit_code not in self.PYTEST_COMPLETED_EXIT_CODES:
+            raise CoverageAnalyzer.TestRunFailed(
+                f"pytest exited with code {exit_code} running {' '.join(test_ids) or 'all the tests'}"
+            )
+
+    def _build_coverage_command(self, test_ids: List[str], data_file_path: str) -> List[str]:
+        return [
+            "coverage",
+            "run",
+            "--rcfile",
+            self.COVERAGE_RC_FILE_PATH,
+            "--data-file",
+            data_file_path,
+            "--append",
+            "-m",
+            "pytest",
+        ] + list(test_ids)
+
+    def _shard_tests(self, test_ids: List[str], num_shards: Optional[int]) -> List[List[str]]:
         """
-        Helper function to retrieve the percent covered from metadata in the row of a dataframe
-        :param row:
-        see TODO in class docstring
-        TODO: the lines include the function signature, so the percent covered is not completely accurate
+        Splits the tests into at most num_shards shards of whole test files, balanced by number of tests,
+        or into one shard per test file if num_shards is None. When no test is given, all the tests
+        collected by pytest are sharded and each shard lists its files.
         """
-        num_total = self.code_retriever.get_parent_function_num_code_lines(
-            row.module, row.line_number[0]
+        run_whole_files = not test_ids
+        if run_whole_files:
+            test_ids = self._collect_test_ids()
+        test_ids_by_file: Dict[str, List[str]] = defaultdict(list)
+        for test_id in test_ids:
+            test_ids_by_file[test_id.split("::")[0]].append(test_id)
+        if not test_ids_by_file:
+            return [[]]
+
+        if num_shards is None:
+            num_shards = len(test_ids_by_file)
+        num_shards = min(max(num_shards, 1), len(test_ids_by_file))
+        shards: List[List[str]] = [[] for _ in range(num_shards)]
+        shard_sizes = [0] * len(shards)
+        for test_fpath, file_test_ids in sorted(
+            test_ids_by_file.items(), key=lambda item: len(item[1]), reverse=True
+        ):
+            shard_index = shard_sizes.index(min(shard_sizes))
+            shards[shard_index].extend([test_fpath] if run_whole_files else file_test_ids)
+            shard_sizes[shard_index] += len(file_test_ids)
+        return shards
+
+    def _collect_test_ids(self) -> List[str]:
+        """Returns the node ids of the tests pytest selects in the repository."""
+        result = subprocess.run(
+            ["pytest", "--collect-only", "-q"],
+            cwd=self.ROOT_DIR,
+            capture_output=True,
+            text=True,
         )
-        num_uncovered = len(row.line_number)
-        percent_covered = 1 - (num_uncovered / num_total)
-        return percent_covered
+        self._check_exit_code(result.returncode, ["--collect-only"])
+        return [line for line in result.stdout.splitlines() if "::" in line]
 
-    def clean_up(self):
+    def _context_to_test_id(self, context: str) -> str:
         """
-        Removes the coverage.xml file
+        Converts a coverage context, the qualified name of a test function, to a pytest node id,
+        e.g. automata.tests.test_module.TestClass.test_method to automata/tests/test_module.py::TestClass::test_method
         """
-        os.remove(self.COVERAGE_FILE_PATH)
+        name_parts = context.split(".")
+        for num_module_parts in range(len(name_parts) - 1, 0, -1):
+            test_fpath = os.path.join(*name_parts[:num_module_parts]) + ".py"
+            if os.path.exists(os.path.join(self.ROOT_DIR, test_fpath)):
+                return "::".join([test_fpath] + name_parts[num_module_parts:])
+        return context
+
+    @staticmethod
+    def _get_revision(file_hashes: Dict[str, str]) -> str:
+        return hashlib.sha256(json.dumps(file_hashes, sort_keys=True).encode()).hexdigest()
+
+    def _hash_source_tree(self) -> Dict[str, str]:
+        """Returns the hash of the contents of every python file of the source tree, by relative path."""
+        file_hashes = {}
+        for root, _, file_names in os.walk(self.DIR_TO_INDEX):
+            for file_name in file_names:
+                if not file_name.endswith(".py"):
+                    continue
+                fpath = os.path.join(root, file_name)
+                with open(fpath, "rb") as f:
+                    file_hashes[os.path.relpath(fpath, self.ROOT_DIR)] = hashlib.sha256(
+                        f.read()
+                    ).hexdigest()
+        return file_hashes
+
+    @staticmethod
+    def _read_coverage_data(data_file_path: str) -> CoverageData:
+        coverage_data = CoverageData(data_file_path)
+        coverage_data.read()
+        return coverage_data
+
+    @staticmethod
+    def _is_test_file(fpath: str) -> bool:
+        return os.path.basename(fpath).startswith("test_")
+
+    def _load_state(self) -> Optional[Dict]:
+        if not os.path.exists(self.COVERAGE_STATE_FILE_PATH):
+            return None
+        try:
+            with open(self.COVERAGE_STATE_FILE_PATH) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load the coverage state due to: {e}")
+            return None
+
+    def _save_state(self, state: Dict) -> None:
+        with open(self.COVERAGE_STATE_FILE_PATH, "w") as f:
+            json.dump(state, f)
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+from enum import Enum
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from automata.tools.coverage_tools.coverage_analyzer import CoverageAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+class CoverageJobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    TIMED_OUT = "timed_out"
+    FAILED = "failed"
+
+
+class CoverageJob:
+    """
+    Collects coverage in a background thread, so an agent can keep calling other tools while the tests run.
+
+    The job runs each test file in a shard of its own, one shard per worker at a time, and merges the
+    coverage data of each shard as it completes, so the coverage gaps computed while the job runs are
+    partial results: the lines of the test files that have not completed yet are reported as uncovered. A job that exceeds its timeout is cancelled, and
+    its partial results remain readable.
+    """
+
+    COVERAGE_DF_COLUMNS = ["module", "object", "line_number", "percent_covered"]
+
+    def __init__(self, coverage_analyzer: CoverageAnalyzer, timeout: Optional[float] = None):
+        """
+        Args:
+            coverage_analyzer (CoverageAnalyzer): The analyzer collecting the coverage.
+            timeout (Optional[float]): The number of seconds after which the job is cancelled, None for no limit.
+        """
+        self.coverage_analyzer = coverage_analyzer
+        self.timeout = timeout
+        self.revision: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.completed_test_files: List[str] = []
+        self.num_test_files: Optional[int] = None
+        self._status = CoverageJobStatus.PENDING
+        self._data_file_path: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._timed_out = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def status(self) -> CoverageJobStatus:
+        return self._status
+
+    def start(self) -> "CoverageJob":
+        """Starts collecting coverage in the background."""
+        self._status = CoverageJobStatus.RUNNING
+        self._thread.start()
+        if self.timeout:
+            timer = threading.Timer(self.timeout, self._time_out)
+            timer.daemon = True
+            timer.start()
+        return self
+
+    def is_done(self) -> bool:
+        return self._status not in (CoverageJobStatus.PENDING, CoverageJobStatus.RUNNING)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the job is done.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait, None for no limit.
+
+        Returns:
+            bool: Whether the job is done.
+        """
+        with self._condition:
+            return self._condition.wait_for(self.is_done, timeout)
+
+    def cancel(self) -> None:
+        """Stops the running tests, the partial results remain readable."""
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def describe(self) -> str:
+        """Describes the status and the progress of the job."""
+        if self._status == CoverageJobStatus.FAILED:
+            return f"Coverage collection failed: {self.error}"
+        if self.num_test_files is None:
+            return f"Coverage collection {self._status.value}"
+        return (
+            f"Coverage collection {self._status.value}, "
+            f"{len(self.completed_test_files)}/{self.num_test_files} test files completed"
+        )
+
+    def get_coverage_df(self, module_path: str) -> pd.DataFrame:
+        """
+        Computes the coverage gaps of a module from the coverage data collected so far,
+        see CoverageAnalyzer.get_coverage_df. The gaps of a completed job are computed from the data of
+        its revision, without collecting coverage again.
+        """
+        if self._status == CoverageJobStatus.COMPLETED:
+            return self.coverage_analyzer.get_coverage_df(module_path, revision=self.revision)
+        if self._status == CoverageJobStatus.FAILED:
+            raise RuntimeError(self.describe()) from self.error
+        if not self._data_file_path or not os.path.exists(self._data_file_path):
+            return pd.DataFrame(columns=self.COVERAGE_DF_COLUMNS)
+        return self.coverage_analyzer.get_coverage_df(
+            module_path, data_file_path=self._data_file_path
+        )
+
+    def iter_coverage_dfs(
+        self, module_path: str, timeout: Optional[float] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yields the coverage gaps of a module each time test files complete, and once more when the job is done.
+
+        Args:
+            module_path (str): The module, as a file path or a module dotpath.
+            timeout (Optional[float]): The maximum number of seconds to wait for the job, None for no limit.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        num_yielded_test_files = -1
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self.is_done()
+                    or len(self.completed_test_files) != num_yielded_test_files,
+                    deadline - time.monotonic() if deadline is not None else None,
+                )
+                is_done = self.is_done()
+                num_yielded_test_files = len(self.completed_test_files)
+            if is_done or num_yielded_test_files:
+                yield self.get_coverage_df(module_path)
+            if is_done or (deadline is not None and time.monotonic() >= deadline):
+                return
+
+    def on_tests_started(self, data_file_path: str, num_test_files: int) -> None:
+        """Called by the analyzer when the tests start, with the data file the results are merged into."""
+        with self._condition:
+            self._data_file_path = data_file_path
+            self.num_test_files = num_test_files
+            self._condition.notify_all()
+
+    def on_test_files_completed(self, test_fpaths: List[str]) -> None:
+        """Called by the analyzer when the coverage data of test files is merged into the data file."""
+        with self._condition:
+            self.completed_test_files.extend(test_fpaths)
+            self._condition.notify_all()
+
+    def _time_out(self) -> None:
+        if not self.is_done():
+            logger.debug(f"Coverage collection timed out after {self.timeout} seconds")
+            self._timed_out = True
+            self.cancel()
+
+    def _run(self) -> None:
+        try:
+            self.revision = self.coverage_analyzer.collect_coverage(job=self)
+            # A job cancelled after its tests ran is still complete
+            if self.coverage_analyzer.has_coverage_data(self.revision):
+                status = CoverageJobStatus.COMPLETED
+            elif self._timed_out:
+                status = CoverageJobStatus.TIMED_OUT
+            else:
+                status = CoverageJobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Coverage collection failed due to: {e}")
+            self.error = e
+            status = CoverageJobStatus.FAILED
+        with self._condition:
+            self._status = status
+            self._condition.notify_all()
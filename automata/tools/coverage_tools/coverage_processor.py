@@ -1,11 +1,12 @@
 import logging
-from functools import lru_cache
+from typing import Optional
 
 import pandas as pd
 
 from automata.config import GITHUB_API_KEY, REPOSITORY_NAME
 from automata.core.base.github_manager import GitHubManager
 from automata.tools.coverage_tools.coverage_analyzer import CoverageAnalyzer
+from automata.tools.coverage_tools.coverage_job import CoverageJob, CoverageJobStatus
 
 logger = logging.getLogger(__name__)
 
@@ -13,40 +14,79 @@ logger = logging.getLogger(__name__)
 class CoverageProcessor:
     """
     CoverageProcessor uses a CoverageAnalyzer to process coverage gaps, show them to the user and selectively create issues for them
-    TODO: this is pretty slow with parsing, maybe we can cache the coverage_df and only re-parse when we need to
-    TODO: coverage report is being "cached" right now but it would be nice to clean it up when the user is done, or make the agent more stateful
+    The tests only run when the source tree changed since the coverage data was last collected, see CoverageAnalyzer
+    They run in a background CoverageJob, when it does not complete within wait_timeout seconds the partial results are returned
+    A completed job is reused until the source tree changes
     """
 
-    def __init__(self, coverage_analyzer, do_create_issue=False):
+    def __init__(
+        self,
+        coverage_analyzer,
+        do_create_issue=False,
+        wait_timeout: Optional[float] = None,
+        job_timeout: Optional[float] = None,
+    ):
         self.coverage_analyzer = coverage_analyzer
         self.do_create_issue = do_create_issue
+        self.wait_timeout = wait_timeout
+        self.job_timeout = job_timeout
+        self.coverage_job: Optional[CoverageJob] = None
+
+    def start_coverage_collection(self, restart: bool = False) -> CoverageJob:
+        """
+        Starts collecting coverage in the background, unless a collection is running, or a completed
+        collection of the current revision of the source tree is reused.
+
+        Args:
+            restart (bool): Start a new collection even if the completed one is of the current revision.
+        """
+        if not self.coverage_job or (
+            self.coverage_job.is_done()
+            and (
+                restart
+                or self.coverage_job.status != CoverageJobStatus.COMPLETED
+                or self.coverage_job.revision != self.coverage_analyzer.get_revision()
+            )
+        ):
+            self.coverage_job = CoverageJob(self.coverage_analyzer, self.job_timeout).start()
+        return self.coverage_job
+
+    def get_coverage_status(self) -> str:
+        if not self.coverage_job:
+            return "Coverage collection not started"
+        return self.coverage_job.describe()
 
-    @lru_cache(maxsize=5)
     def get_coverage_df(self, module_path: str) -> pd.DataFrame:
-        self.coverage_analyzer.write_coverage_xml(module_path)
-        coverage_df = self.coverage_analyzer.parse_coverage_xml()
-        return coverage_df
+        coverage_job = self.start_coverage_collection()
+        coverage_job.wait(self.wait_timeout)
+        return coverage_job.get_coverage_df(module_path)
 
     def list_coverage_gaps(self, module_path: str) -> str:
         coverage_df = self.get_coverage_df(module_path)
         coverage_df = coverage_df[["module", "object", "percent_covered"]]
+        if self.coverage_job and self.coverage_job.status != CoverageJobStatus.COMPLETED:
+            if not self.coverage_job.completed_test_files:
+                return f"No coverage data yet, status: {self.coverage_job.describe()}"
+            return f"Partial results - {self.coverage_job.describe()}\n{coverage_df.to_string()}"
         return coverage_df.to_string()
 
     def process_coverage_gap(self, module: str, object: str):
         module_path = module
         function_name = object
         coverage_df = self.get_coverage_df(module_path)
-        # get lines from df by module and object
-        uncovered_line_numbers = sorted(
-            coverage_df[
-                (coverage_df["module"] == module_path) & (coverage_df["object"] == function_name)
-            ]["line_number"].iloc[0]
-        )
+        # get lines from df by object, the df only has the gaps of the module
+        coverage_gaps = coverage_df[coverage_df["object"] == function_name]
+        if coverage_gaps.empty:
+            status = self.coverage_job.describe() if self.coverage_job else ""
+            raise ValueError(
+                f"No coverage gap found for {function_name} in module {module_path}, status: {status}"
+            )
+        uncovered_line_numbers = sorted(coverage_gaps["line_number"].iloc[0])
 
         uncovered_line_numbers_queue = uncovered_line_numbers[:]
 
-        lines = self.coverage_analyzer.module_map.get_parent_code_by_line(
-            module_path, uncovered_line_numbers[0], True
+        lines = self.coverage_analyzer.code_retriever.get_parent_code_by_line(
+            coverage_gaps["module"].iloc[0], uncovered_line_numbers[0], True
         ).splitlines()
         marked_lines = []
         for line in lines:
@@ -0,0 +1,325 @@
+import os
+import subprocess
+import textwrap
+from unittest.mock import patch
+
+import pytest
+
+from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
+from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
+from automata.tools.coverage_tools.coverage_analyzer import CoverageAnalyzer
+from automata.tools.coverage_tools.coverage_job import CoverageJob, CoverageJobStatus
+from automata.tools.coverage_tools.coverage_processor import CoverageProcessor
+
+
+def _write_file(fpath: str, source_code: str) -> None:
+    os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    with open(fpath, "w") as f:
+        f.write(textwrap.dedent(source_code))
+
+
+@pytest.fixture
+def repository_dir(tmp_path):
+    _write_file(str(tmp_path / "sample_package" / "__init__.py"), "")
+    _write_file(
+        str(tmp_path / "sample_package" / "arithmetic.py"),
+        """\
+        def add(x, y):
+            return x + y
+
+
+        def subtract(x, y):
+            if x < y:
+                return 0
+            return x - y
+
+
+        def multiply(x, y):
+            return x * y
+        """,
+    )
+    _write_file(
+        str(tmp_path / "sample_package" / "strings.py"),
+        """\
+        def shout(text):
+            return text.upper()
+        """,
+    )
+    _write_file(str(tmp_path / "sample_package" / "tests" / "__init__.py"), "")
+    _write_file(
+        str(tmp_path / "sample_package" / "tests" / "test_arithmetic.py"),
+        """\
+        from sample_package.arithmetic import add, subtract
+
+
+        def test_add():
+            assert add(1, 2) == 3
+
+
+        class TestSubtract:
+            def test_subtract(self):
+                assert subtract(3, 2) == 1
+        """,
+    )
+    _write_file(
+        str(tmp_path / "sample_package" / "tests" / "test_strings.py"),
+        """\
+        from sample_package.strings import shout
+
+
+        def test_shout():
+            assert shout("a") == "A"
+        """,
+    )
+    return str(tmp_path)
+
+
+@pytest.fixture
+def coverage_analyzer(repository_dir):
+    code_retriever = PythonCodeRetriever(
+        LazyModuleTreeMap(os.path.join(repository_dir, "sample_package"))
+    )
+    coverage_analyzer = CoverageAnalyzer(code_retriever, incremental=True)
+    coverage_analyzer.ROOT_DIR = repository_dir
+    coverage_analyzer.ROOT_MODULE = "sample_package"
+    coverage_analyzer.DIR_TO_INDEX = os.path.join(repository_dir, "sample_package")
+    coverage_analyzer.COVERAGE_DATA_FILE_PATH = os.path.join(repository_dir, ".coverage_data")
+    coverage_analyzer.COVERAGE_STATE_FILE_PATH = os.path.join(repository_dir, ".coverage_state")
+    coverage_analyzer.COVERAGE_RC_FILE_PATH = os.path.join(repository_dir, ".coverage_rc")
+    return coverage_analyzer
+
+
+def test_collect_coverage_once_per_revision(coverage_analyzer):
+    revision = coverage_analyzer.collect_coverage()
+    assert os.path.exists(coverage_analyzer.COVERAGE_DATA_FILE_PATH)
+
+    with patch.object(coverage_analyzer, "_run_tests") as run_tests:
+        assert coverage_analyzer.collect_coverage() == revision
+        run_tests.assert_not_called()
+
+
+def test_collect_coverage_incrementally(coverage_analyzer, repository_dir):
+    coverage_analyzer.collect_coverage()
+
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "strings.py"),
+        """\
+        def whisper(text):
+            return text.lower()
+
+
+        def shout(text):
+            return text.upper()
+        """,
+    )
+    with patch.object(
+        coverage_analyzer, "_run_tests", wraps=coverage_analyzer._run_tests
+    ) as run_tests:
+        coverage_analyzer.collect_coverage()
+        run_tests.assert_called_once()
+        assert run_tests.call_args[0][0] == ["sample_package/tests/test_strings.py::test_shout"]
+
+    coverage_data = CoverageAnalyzer._read_coverage_data(coverage_analyzer.COVERAGE_DATA_FILE_PATH)
+    strings_fpath = os.path.join(repository_dir, "sample_package", "strings.py")
+    arithmetic_fpath = os.path.join(repository_dir, "sample_package", "arithmetic.py")
+    assert coverage_data.contexts_by_lineno(strings_fpath)[6] == [
+        "sample_package.tests.test_strings.test_shout"
+    ]
+    assert 2 not in coverage_data.contexts_by_lineno(strings_fpath)
+    assert coverage_data.contexts_by_lineno(arithmetic_fpath)[8] == [
+        "sample_package.tests.test_arithmetic.TestSubtract.test_subtract"
+    ]
+
+
+def test_collect_coverage_incrementally_import_only_module(coverage_analyzer, repository_dir):
+    _write_file(os.path.join(repository_dir, "sample_package", "constants.py"), "NAME = 'a'\n")
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "tests", "test_constants.py"),
+        """\
+        from sample_package.constants import NAME
+
+
+        def test_name():
+            assert NAME
+        """,
+    )
+    coverage_analyzer.collect_coverage()
+
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "constants.py"),
+        "NAME = 'a'\nOTHER_NAME = 'b'\n",
+    )
+    with patch.object(
+        coverage_analyzer, "_run_tests", wraps=coverage_analyzer._run_tests
+    ) as run_tests:
+        coverage_analyzer.collect_coverage()
+        # The module is only run when the tests are imported, so no test maps to it
+        run_tests.assert_called_once()
+        assert run_tests.call_args[0][0] == []
+
+    coverage_data = CoverageAnalyzer._read_coverage_data(coverage_analyzer.COVERAGE_DATA_FILE_PATH)
+    constants_fpath = os.path.join(repository_dir, "sample_package", "constants.py")
+    assert sorted(coverage_data.lines(constants_fpath)) == [1, 2]
+
+
+def test_collect_coverage_fails_when_tests_do_not_run(coverage_analyzer, repository_dir):
+    revision = coverage_analyzer.collect_coverage()
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "tests", "test_broken.py"),
+        "def test_broken(:\n",
+    )
+
+    with pytest.raises(CoverageAnalyzer.TestRunFailed, match="exited with code 2"):
+        coverage_analyzer.collect_coverage()
+    assert coverage_analyzer.has_coverage_data(revision)
+
+    coverage_analyzer.incremental = False
+    coverage_job = CoverageJob(coverage_analyzer).start()
+    assert coverage_job.wait(60)
+    assert coverage_job.status == CoverageJobStatus.FAILED
+    assert isinstance(coverage_job.error, CoverageAnalyzer.TestRunFailed)
+    assert not coverage_analyzer.has_coverage_data(coverage_analyzer.get_revision())
+    assert not os.path.exists(coverage_analyzer.COVERAGE_STATE_FILE_PATH)
+
+
+def test_get_coverage_df(coverage_analyzer):
+    coverage_df = coverage_analyzer.get_coverage_df("arithmetic.py")
+
+    assert coverage_df.to_dict("records") == [
+        {
+            "module": "arithmetic",
+            "object": "multiply",
+            "line_number": [12],
+            "percent_covered": 0.5,
+        },
+        {
+            "module": "arithmetic",
+            "object": "subtract",
+            "line_number": [7],
+            "percent_covered": 0.75,
+        },
+    ]
+    assert coverage_analyzer.get_coverage_df("sample_package.strings").empty
+    with patch("automata.tools.coverage_tools.coverage_analyzer.Coverage") as coverage:
+        assert coverage_analyzer.get_coverage_df("arithmetic.py") is coverage_df
+        coverage.assert_not_called()
+
+
+def test_collect_coverage_sharded(coverage_analyzer, repository_dir):
+    coverage_analyzer.collect_coverage()
+    serial_coverage_data = CoverageAnalyzer._read_coverage_data(
+        coverage_analyzer.COVERAGE_DATA_FILE_PATH
+    )
+    serial_contexts = {
+        measured_file: serial_coverage_data.contexts_by_lineno(measured_file)
+        for measured_file in serial_coverage_data.measured_files()
+    }
+
+    coverage_analyzer.num_workers = 2
+    coverage_analyzer.incremental = False
+    os.remove(coverage_analyzer.COVERAGE_STATE_FILE_PATH)
+    assert sorted(coverage_analyzer._shard_tests([], 2)) == [
+        ["sample_package/tests/test_arithmetic.py"],
+        ["sample_package/tests/test_strings.py"],
+    ]
+    coverage_analyzer.collect_coverage()
+    sharded_coverage_data = CoverageAnalyzer._read_coverage_data(
+        coverage_analyzer.COVERAGE_DATA_FILE_PATH
+    )
+
+    assert {
+        measured_file: sharded_coverage_data.contexts_by_lineno(measured_file)
+        for measured_file in sharded_coverage_data.measured_files()
+    } == serial_contexts
+    assert not [fname for fname in os.listdir(repository_dir) if ".shard" in fname]
+
+
+def _write_slow_test(repository_dir: str) -> None:
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "tests", "test_slow.py"),
+        """\
+        import time
+
+
+        def test_slow():
+            time.sleep(60)
+        """,
+    )
+
+
+def test_coverage_job_streams_results(coverage_analyzer):
+    with patch(
+        "automata.tools.coverage_tools.coverage_analyzer.subprocess.Popen",
+        wraps=subprocess.Popen,
+    ) as popen:
+        coverage_job = CoverageJob(coverage_analyzer).start()
+        coverage_dfs = list(coverage_job.iter_coverage_dfs("arithmetic.py", timeout=60))
+
+    # Each test file runs in a shard of its own, so the results are updated as each file completes
+    assert [call.args[0][:2] for call in popen.call_args_list].count(["coverage", "run"]) == 2
+
+    assert coverage_job.status == CoverageJobStatus.COMPLETED
+    assert sorted(coverage_job.completed_test_files) == [
+        "sample_package/tests/test_arithmetic.py",
+        "sample_package/tests/test_strings.py",
+    ]
+    assert coverage_dfs[-1].equals(coverage_analyzer.get_coverage_df("arithmetic.py"))
+    assert coverage_job.describe() == "Coverage collection completed, 2/2 test files completed"
+
+
+def test_coverage_job_cancel_keeps_partial_results(coverage_analyzer, repository_dir):
+    _write_slow_test(repository_dir)
+    # The slow test runs after test_arithmetic in the single worker, and blocks test_strings
+    coverage_job = CoverageJob(coverage_analyzer).start()
+    partial_coverage_df = next(coverage_job.iter_coverage_dfs("arithmetic.py", timeout=60))
+    coverage_job.cancel()
+
+    assert coverage_job.wait(30)
+    assert coverage_job.status == CoverageJobStatus.CANCELLED
+    assert coverage_job.completed_test_files == ["sample_package/tests/test_arithmetic.py"]
+    assert partial_coverage_df["object"].tolist() == ["multiply", "subtract"]
+    assert coverage_job.get_coverage_df("arithmetic.py").equals(partial_coverage_df)
+    assert not coverage_analyzer.has_coverage_data(coverage_job.revision)
+    assert not [fname for fname in os.listdir(repository_dir) if ".shard" in fname]
+
+
+def test_coverage_job_timeout(coverage_analyzer, repository_dir):
+    _write_slow_test(repository_dir)
+    coverage_processor = CoverageProcessor(coverage_analyzer, wait_timeout=0, job_timeout=5)
+
+    assert coverage_processor.list_coverage_gaps("arithmetic.py").startswith(
+        "No coverage data yet, status: Coverage collection running"
+    )
+    with pytest.raises(ValueError, match="No coverage gap found for add"):
+        coverage_processor.process_coverage_gap("arithmetic.py", "add")
+    assert coverage_processor.coverage_job.wait(30)  # type: ignore
+    assert coverage_processor.coverage_job.status == CoverageJobStatus.TIMED_OUT  # type: ignore
+    assert coverage_processor.get_coverage_status().startswith("Coverage collection timed_out")
+
+
+def test_coverage_processor_reuses_completed_job(coverage_analyzer, repository_dir):
+    coverage_processor = CoverageProcessor(coverage_analyzer)
+    coverage_gaps = coverage_processor.list_coverage_gaps("arithmetic.py")
+    coverage_job = coverage_processor.coverage_job
+
+    with patch.object(coverage_analyzer, "collect_coverage") as collect_coverage:
+        assert coverage_processor.list_coverage_gaps("arithmetic.py") == coverage_gaps
+        assert coverage_processor.process_coverage_gap("arithmetic.py", "multiply").startswith(
+            "Processed"
+        )
+        with pytest.raises(ValueError, match="No coverage gap found for add"):
+            coverage_processor.process_coverage_gap("arithmetic.py", "add")
+        collect_coverage.assert_not_called()
+    assert coverage_processor.coverage_job is coverage_job
+
+    assert coverage_processor.start_coverage_collection(restart=True) is not coverage_job
+    coverage_job = coverage_processor.coverage_job
+    assert coverage_job.wait(30)  # type: ignore
+    _write_file(
+        os.path.join(repository_dir, "sample_package", "strings.py"),
+        """\
+        def shout(text):
+            return text.upper() + "!"
+        """,
+    )
+    assert coverage_processor.start_coverage_collection() is not coverage_job
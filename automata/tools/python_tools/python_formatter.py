@@ -0,0 +1,135 @@
+import dataclasses
+import hashlib
+import logging
+import os
+import textwrap
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import black
+import isort
+
+logger = logging.getLogger(__name__)
+
+
+class PythonFormatter:
+    """
+    Formats python source code with black then isort, through their in-process APIs.
+
+    Settings are read from the pyproject.toml of the project containing the formatted file, like the
+    black and isort command line tools do. The latest formatted sources are memoized by content hash, so
+    formatting a module that has not changed since it was last formatted is a dictionary lookup.
+    """
+
+    def __init__(self, max_cached_sources: int = 32) -> None:
+        """
+        Args:
+            max_cached_sources (int): The maximum number of memoized sources, the least recently used are
+                evicted first.
+        """
+        self.max_cached_sources = max_cached_sources
+        self._settings: Dict[str, Tuple[black.Mode, isort.Config]] = {}
+        self._formatted_sources: "OrderedDict[str, str]" = OrderedDict()
+
+    def format_source(self, source_code: str, module_fpath: str) -> str:
+        """
+        Formats the source code of a module.
+
+        Args:
+            source_code (str): The source code to format.
+            module_fpath (str): The path of the module, used to find the formatting settings.
+
+        Returns:
+            str: The formatted source code, or the source code unchanged if it cannot be formatted.
+        """
+        source_hash = hashlib.sha256(source_code.encode("utf-8")).hexdigest()
+        if source_hash in self._formatted_sources:
+            self._formatted_sources.move_to_end(source_hash)
+            return self._formatted_sources[source_hash]
+
+        black_mode, isort_config = self._get_settings(
+            os.path.dirname(os.path.abspath(module_fpath))
+        )
+        try:
+            formatted_source = black.format_str(source_code, mode=black_mode)
+            formatted_source = isort.code(formatted_source, config=isort_config)
+        except Exception as e:
+            logger.error(f"Failed to format module '{module_fpath}' due to: {e}")
+            return source_code
+
+        # Formatting is idempotent, so the formatted source maps to itself
+        formatted_hash = hashlib.sha256(formatted_source.encode("utf-8")).hexdigest()
+        self._cache_formatted_source(source_hash, formatted_source)
+        self._cache_formatted_source(formatted_hash, formatted_source)
+        return formatted_source
+
+    def _cache_formatted_source(self, source_hash: str, formatted_source: str) -> None:
+        self._formatted_sources[source_hash] = formatted_source
+        self._formatted_sources.move_to_end(source_hash)
+        while len(self._formatted_sources) > self.max_cached_sources:
+            self._formatted_sources.popitem(last=False)
+
+    def format_block(self, source_code: str, module_fpath: str, indent: str = "") -> str:
+        """
+        Formats a block of statements that is spliced into a module at the given indentation,
+        e.g. a method inserted in a class. The block is formatted with black on its own, with the
+        line length reduced by the indentation, so the rest of the module is not formatted.
+
+        Args:
+            source_code (str): The block to format, at any indentation.
+            module_fpath (str): The path of the module, used to find the formatting settings.
+            indent (str): The indentation of the block in the module.
+
+        Returns:
+            str: The formatted block at the given indentation, or the block unchanged if it cannot be formatted.
+        """
+        source_code = textwrap.dedent(source_code)
+        black_mode, _ = self._get_settings(os.path.dirname(os.path.abspath(module_fpath)))
+        try:
+            formatted_block = black.format_str(
+                source_code,
+                mode=dataclasses.replace(
+                    black_mode, line_length=max(black_mode.line_length - len(indent), 1)
+                ),
+            )
+        except Exception as e:
+            logger.error(f"Failed to format a block of module '{module_fpath}' due to: {e}")
+            formatted_block = source_code
+        return textwrap.indent(formatted_block, indent)
+
+    def sort_imports(self, source_code: str, module_fpath: str) -> str:
+        """
+        Sorts a block of import statements with isort.
+
+        Args:
+            source_code (str): The import statements.
+            module_fpath (str): The path of the module, used to find the formatting settings.
+
+        Returns:
+            str: The sorted imports, or the imports unchanged if they cannot be sorted.
+        """
+        _, isort_config = self._get_settings(os.path.dirname(os.path.abspath(module_fpath)))
+        try:
+            return isort.code(source_code, config=isort_config)
+        except Exception as e:
+            logger.error(f"Failed to sort the imports of module '{module_fpath}' due to: {e}")
+            return source_code
+
+    def _get_settings(self, module_dir: str) -> Tuple[black.Mode, isort.Config]:
+        """Loads the black and isort settings that apply to the modules of a directory."""
+        if module_dir not in self._settings:
+            black_config = {}
+            pyproject_path = black.find_pyproject_toml((module_dir,))
+            if pyproject_path:
+                black_config = black.parse_pyproject_toml(pyproject_path)
+            black_mode = black.Mode(
+                target_versions={
+                    black.TargetVersion[target_version.upper()]
+                    for target_version in black_config.get("target_version", [])
+                },
+                line_length=black_config.get("line_length", black.DEFAULT_LINE_LENGTH),
+                string_normalization=not black_config.get("skip_string_normalization", False),
+                magic_trailing_comma=not black_config.get("skip_magic_trailing_comma", False),
+            )
+            self._settings[module_dir] = (black_mode, isort.Config(settings_path=module_dir))
+        return self._settings[module_dir]
@@ -33,19 +33,24 @@ Example usage:
     TODO - Add explicit check of module contents after extension and reduction of module.
 """
 import logging
+import os
 import re
-import subprocess
-from typing import Optional, Union, cast
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union, cast
 
 from redbaron import ClassNode, DefNode, Node, NodeList, RedBaron
 
+from automata.core.base.tool_result_cache import bump_repository_version
+from automata.core.code_indexing.module_source_index import MODULE_SCOPE, ModuleSourceIndex
 from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
 from automata.core.code_indexing.syntax_tree_navigation import (
+    SyntaxTreeNameIndex,
     find_all_function_and_class_syntax_tree_nodes,
-    find_import_syntax_tree_node_by_name,
     find_import_syntax_tree_nodes,
     find_syntax_tree_node,
 )
+from automata.tools.python_tools.python_formatter import PythonFormatter
 
 logger = logging.getLogger(__name__)
 
@@ -66,11 +71,17 @@ class PythonWriter:
         write_module(self) -> None:
             Write the module object to a file.
 
+        transaction(self) -> Iterator[None]:
+            Stage the edits made in a block in memory and write them all at once when it exits.
+
         Exceptions:
             ModuleNotFound: Raised when a module cannot be found.
             InvalidArguments: Raised when invalid arguments are passed to a method.
     """
 
+    # The indentation of a level of the blocks formatted by black
+    FORMATTED_INDENT = "    "
+
     class ModuleNotFound(Exception):
         pass
 
@@ -85,6 +96,12 @@ class PythonWriter:
         Initialize the PythonWriter with a PythonCodeRetriever instance.
         """
         self.code_retriever = python_retriever
+        self.formatter = PythonFormatter()
+        # Source of the modules edited in each open transaction block before their first edit in the
+        # block, None if new, from the outermost block to the innermost
+        self._transaction_snapshots: List[Dict[str, Optional[str]]] = []
+        # Used as an ordered set, modules are written in the order they were first modified
+        self._modules_pending_write: Dict[str, None] = {}
 
     def create_new_module(
         self, module_dotpath: str, source_code: str, do_write: bool = False
@@ -99,7 +116,9 @@ class PythonWriter:
         Returns:
             RedBaron: The module object.
         """
+        self._snapshot_module(module_dotpath)
         self._create_module_from_source_code(module_dotpath, source_code)
+        bump_repository_version()
         if do_write:
             self._write_module_to_disk(module_dotpath)
 
@@ -122,17 +141,37 @@ class PythonWriter:
         Returns:
             RedBaron: The module object.
         """
-        module_obj = self.code_retriever.module_tree_map.get_module(module_dotpath)
+        module_tree_map = self.code_retriever.module_tree_map
+        if not module_tree_map.is_module_loaded(module_dotpath):
+            # The FST of the module has not been parsed, patch its source text instead
+            source_index = module_tree_map.get_source_index(module_dotpath)
+            patched_source_index = (
+                self._patch_module_source(module_dotpath, source_index, source_code, disambiguator)
+                if source_index
+                else None
+            )
+            if patched_source_index:
+                self._snapshot_module(module_dotpath)
+                module_tree_map.put_module_source(module_dotpath, patched_source_index)
+                bump_repository_version()
+                if do_write:
+                    self._write_module_to_disk(module_dotpath)
+                return
+
+        module_obj = module_tree_map.get_module(module_dotpath)
         if not module_obj:
             raise PythonWriter.ModuleNotFound(
                 f"Module not found in module dictionary: {module_dotpath}"
             )
+        self._snapshot_module(module_dotpath)
         PythonWriter._update_existing_module(
             source_code,
             module_dotpath,
             module_obj,
             disambiguator=disambiguator,
         )
+        self.code_retriever.module_tree_map.invalidate_source_index(module_dotpath)
+        bump_repository_version()
         if do_write:
             self._write_module_to_disk(module_dotpath)
 
@@ -157,35 +196,188 @@ class PythonWriter:
             )
         node = find_syntax_tree_node(module_obj, object_dotpath)
         if node:
+            self._snapshot_module(module_dotpath)
             PythonWriter._delete_node(node)
+            self.code_retriever.module_tree_map.invalidate_source_index(module_dotpath)
+            bump_repository_version()
             if do_write:
                 self._write_module_to_disk(module_dotpath)
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Stage the edits made in the block in memory and write the modified modules when it exits, with a
+        single formatting pass and an atomic rename per module. If the block raises or a module cannot be
+        written, every edit of the block is rolled back, in memory and on disk.
+        Blocks can be nested, the outermost block writes the edits of the nested blocks. A nested block
+        that raises only rolls back its own edits, like a savepoint, e.g. a failed tool call of an agent
+        turn run in a transaction.
+        """
+        self._transaction_snapshots.append({})
+        try:
+            yield
+            if len(self._transaction_snapshots) == 1:
+                self._write_modules_to_disk(list(self._modules_pending_write))
+        except BaseException:
+            self._rollback_modules()
+            raise
+        finally:
+            self._transaction_snapshots.pop()
+            if not self._transaction_snapshots:
+                self._modules_pending_write.clear()
+
     def _write_module_to_disk(self, module_dotpath: str) -> None:
         """
         Write the modified module to a file at the specified output path.
+        Within a transaction, the write is deferred to the end of the transaction.
 
         Args:
             module_dotpath (str)
         """
-        if module_dotpath not in self.code_retriever.module_tree_map:
+        if self._transaction_snapshots:
+            self._modules_pending_write[module_dotpath] = None
+            return
+        self._write_modules_to_disk([module_dotpath])
+
+    def _write_modules_to_disk(self, module_dotpaths: List[str]) -> None:
+        """
+        Write the modified modules to their files, formatted in-process. Every module is first written
+        to a temporary file next to its target, then the temporary files are renamed over the targets.
+        If a rename fails, the files that were already replaced are restored.
+        Files whose content is unchanged are left untouched.
+
+        Args:
+            module_dotpaths (List[str])
+        """
+        staged_files: List[Tuple[str, str]] = []
+        try:
+            for module_dotpath in module_dotpaths:
+                module_fpath, source_code = self._get_formatted_module_source(module_dotpath)
+                if PythonWriter._read_file(module_fpath) == source_code:
+                    continue
+                staged_files.append(
+                    (module_fpath, PythonWriter._stage_file(module_fpath, source_code))
+                )
+        except BaseException:
+            PythonWriter._remove_files([staged_fpath for _, staged_fpath in staged_files])
+            raise
+
+        replaced_files: List[Tuple[str, Optional[str]]] = []
+        try:
+            for module_fpath, staged_fpath in staged_files:
+                original_source_code = PythonWriter._read_file(module_fpath)
+                os.replace(staged_fpath, module_fpath)
+                replaced_files.append((module_fpath, original_source_code))
+        except BaseException:
+            for module_fpath, original_source_code in reversed(replaced_files):
+                if original_source_code is None:
+                    os.remove(module_fpath)
+                else:
+                    os.replace(
+                        PythonWriter._stage_file(module_fpath, original_source_code), module_fpath
+                    )
+            PythonWriter._remove_files([staged_fpath for _, staged_fpath in staged_files])
+            raise
+        if staged_files:
+            bump_repository_version()
+
+    def _get_formatted_module_source(self, module_dotpath: str) -> Tuple[str, str]:
+        """
+        Returns the path of a module and its formatted source code. The source of a module that was
+        patched without parsing its FST is formatted as a whole too, so both paths write the same file.
+        """
+        module_tree_map = self.code_retriever.module_tree_map
+        if module_dotpath not in module_tree_map:
             raise PythonWriter.ModuleNotFound(
                 f"Module not found in module dictionary: {module_dotpath}"
             )
-        source_code = self.code_retriever.get_source_code(module_dotpath)
-        module_fpath = self.code_retriever.module_tree_map.get_existing_module_fpath_by_dotpath(
-            module_dotpath
-        )
+        if not module_tree_map.is_module_loaded(module_dotpath):
+            source_index = module_tree_map.get_source_index(module_dotpath)
+            module_fpath = module_tree_map.get_existing_module_fpath_by_dotpath(module_dotpath)
+            if source_index and module_fpath:
+                return module_fpath, self.formatter.format_source(
+                    source_index.source, module_fpath
+                )
+
+        module_obj = module_tree_map.get_module(module_dotpath)
+        if not module_obj:
+            raise PythonWriter.ModuleNotFound(
+                f"Module not found in module dictionary: {module_dotpath}"
+            )
+        source_code = module_obj.dumps()
+        module_fpath = module_tree_map.get_existing_module_fpath_by_dotpath(module_dotpath)
 
         if not module_fpath:
             raise PythonWriter.ModuleNotFound(
                 f"Module fpath found in module map for dotpath: {module_dotpath}"
             )
         module_fpath = cast(str, module_fpath)
-        with open(module_fpath, "w") as output_file:
+        return module_fpath, self.formatter.format_source(source_code, module_fpath)
+
+    def _snapshot_module(self, module_dotpath: str) -> None:
+        """Records the source of a module before its first edit in each open transaction block."""
+        block_snapshots = [
+            snapshots
+            for snapshots in self._transaction_snapshots
+            if module_dotpath not in snapshots
+        ]
+        if not block_snapshots:
+            return
+        module_tree_map = self.code_retriever.module_tree_map
+        source_index = module_tree_map.get_source_index(module_dotpath)
+        if source_index:
+            source_code: Optional[str] = source_index.source
+        else:
+            module_obj = module_tree_map.get_module(module_dotpath)
+            source_code = module_obj.dumps() if module_obj else None
+        # The module is unchanged since the start of the blocks it was not edited in
+        for snapshots in block_snapshots:
+            snapshots[module_dotpath] = source_code
+
+    def _rollback_modules(self) -> None:
+        """
+        Restores the modules edited in the innermost transaction block to their snapshots.
+        Only the sources are restored, the FSTs are parsed again when the modules are next edited.
+        """
+        module_tree_map = self.code_retriever.module_tree_map
+        for module_dotpath, source_code in self._transaction_snapshots[-1].items():
+            if source_code is None:
+                module_tree_map.remove_module(module_dotpath)
+                # A module created in the block has nothing left to write
+                self._modules_pending_write.pop(module_dotpath, None)
+                continue
+            try:
+                module_tree_map.put_module_source(
+                    module_dotpath, ModuleSourceIndex.from_source(source_code)
+                )
+            except SyntaxError:
+                module_tree_map.put_module(module_dotpath, RedBaron(source_code))
+        bump_repository_version()
+
+    @staticmethod
+    def _stage_file(fpath: str, source_code: str) -> str:
+        """Writes the source code to a temporary file next to fpath, with the same permissions."""
+        staged_fpath = os.path.join(
+            os.path.dirname(fpath), f".{os.path.basename(fpath)}.{os.getpid()}.tmp"
+        )
+        with open(staged_fpath, "w") as output_file:
             output_file.write(source_code)
-        subprocess.run(["black", module_fpath])
-        subprocess.run(["isort", module_fpath])
+        if os.path.exists(fpath):
+            shutil.copymode(fpath, staged_fpath)
+        return staged_fpath
+
+    @staticmethod
+    def _read_file(fpath: str) -> Optional[str]:
+        if not os.path.exists(fpath):
+            return None
+        with open(fpath) as input_file:
+            return input_file.read()
+
+    @staticmethod
+    def _remove_files(fpaths: List[str]) -> None:
+        for fpath in fpaths:
+            if os.path.exists(fpath):
+                os.remove(fpath)
 
     def _create_module_from_source_code(self, module_dotpath: str, source_code: str) -> RedBaron:
         """
@@ -233,19 +425,211 @@ class PythonWriter:
                 )
         PythonWriter._update_node_with_children(new_class_or_function_nodes, existing_module_obj)
 
+    def _patch_module_source(
+        self,
+        module_dotpath: str,
+        source_index: ModuleSourceIndex,
+        source_code: str,
+        disambiguator: Optional[str],
+    ) -> Optional[ModuleSourceIndex]:
+        """
+        Applies an update to the source text of a module, the text equivalent of `_update_existing_module`.
+        Each top level def or class of the new code replaces the lines of the first def or class with
+        the same name in the disambiguator scope, or is appended to that scope, and the missing imports
+        are merged into the leading import block. Only the replaced lines and the import block are
+        formatted here, the rest of the module is copied from the original text until the module is
+        formatted as a whole when it is written.
+
+        Args:
+            module_dotpath (str): The path of the module.
+            source_index (ModuleSourceIndex): The index of the current source of the module.
+            source_code (str): The code containing the updates.
+            disambiguator (Optional[str]): The name of the class or function scope to be updated.
+
+        Returns:
+            Optional[ModuleSourceIndex]: The index of the patched source, or None if the update cannot be
+                applied as a patch, in which case it should be applied to the FST.
+
+        Raises:
+            ClassOrFunctionNotFound: If the disambiguator scope does not exist.
+        """
+        try:
+            new_source_index = ModuleSourceIndex.from_source(source_code)
+        except SyntaxError:
+            return None
+        target_scope = source_index.find_scope(disambiguator)
+        if target_scope is None:
+            raise PythonWriter.ClassOrFunctionNotFound(
+                f"Node {disambiguator} not found in module {module_dotpath}"
+            )
+        module_fpath = cast(
+            str,
+            self.code_retriever.module_tree_map.get_existing_module_fpath_by_dotpath(
+                module_dotpath
+            ),
+        )
+        source = source_index.source
+        line_offsets = source_index.line_offsets
+        if not PythonWriter._has_formatted_indent(source_index, target_scope):
+            # The formatted blocks are indented with spaces, which must not be mixed with tabs
+            logger.debug(f"Module {module_dotpath} is not indented with spaces, updating the FST")
+            return None
+        # Replaced ranges of the original source, as (start offset, end offset, replacement text)
+        patches: List[Tuple[int, int, str]] = []
+
+        imports_patch = self._build_imports_patch(source_index, new_source_index, module_fpath)
+        if imports_patch:
+            patches.append(imports_patch)
+
+        for new_entry in new_source_index.scopes:
+            if new_entry.parent != MODULE_SCOPE:
+                continue
+            new_node_code = new_source_index.get_lines(new_entry.start_line, new_entry.end_line)
+            existing_scope = source_index.find_subscope(target_scope, new_entry.name)
+            if existing_scope is not None:
+                if not PythonWriter._has_formatted_indent(source_index, existing_scope):
+                    logger.debug(
+                        f"{new_entry.name} is not indented with spaces in module {module_dotpath}, "
+                        "updating the FST"
+                    )
+                    return None
+                entry = source_index.scopes[existing_scope]
+                start_offset = line_offsets[entry.start_line - 1]
+                indent = source[start_offset : entry.start_offset]
+                patches.append(
+                    (
+                        start_offset,
+                        line_offsets[entry.end_line],
+                        self.formatter.format_block(new_node_code, module_fpath, indent),
+                    )
+                )
+            elif target_scope == MODULE_SCOPE:
+                separator = "\n\n" if source.endswith("\n") else "\n\n\n"
+                patches.append(
+                    (
+                        len(source),
+                        len(source),
+                        separator + self.formatter.format_block(new_node_code, module_fpath),
+                    )
+                )
+            else:
+                end_offset = line_offsets[source_index.scopes[target_scope].end_line]
+                indent = source_index.get_body_indent(target_scope)
+                separator = "\n" if source[:end_offset].endswith("\n") else "\n\n"
+                patches.append(
+                    (
+                        end_offset,
+                        end_offset,
+                        separator
+                        + self.formatter.format_block(new_node_code, module_fpath, indent),
+                    )
+                )
+
+        # Patches are applied in source order, insertions at the same offset keep their order
+        patches.sort(key=lambda patch: patch[:2])
+        chunks = []
+        position = 0
+        for start_offset, end_offset, replacement in patches:
+            if start_offset < position:
+                logger.debug(f"Overlapping updates in module {module_dotpath}, updating the FST")
+                return None
+            chunks.append(source[position:start_offset])
+            chunks.append(replacement)
+            position = end_offset
+        chunks.append(source[position:])
+
+        try:
+            return ModuleSourceIndex.from_source("".join(chunks))
+        except SyntaxError as e:
+            logger.warning(
+                f"Failed to patch module {module_dotpath} due to: {e}, updating the FST"
+            )
+            return None
+
+    @staticmethod
+    def _has_formatted_indent(source_index: ModuleSourceIndex, scope: int) -> bool:
+        """
+        Checks that the body of a scope is indented like the formatted blocks spliced into it, with four
+        spaces more than its header. The body of the module is checked through its top level scopes.
+        """
+        if scope == MODULE_SCOPE:
+            return all(
+                PythonWriter._has_formatted_indent(source_index, child_scope)
+                for child_scope, entry in enumerate(source_index.scopes)
+                if entry.parent == MODULE_SCOPE
+            )
+        entry = source_index.scopes[scope]
+        header_indent = source_index.source[
+            source_index.line_offsets[entry.start_line - 1] : entry.start_offset
+        ]
+        return not header_indent.strip(" ") and source_index.get_body_indent(scope) == (
+            header_indent + PythonWriter.FORMATTED_INDENT
+        )
+
+    def _build_imports_patch(
+        self,
+        source_index: ModuleSourceIndex,
+        new_source_index: ModuleSourceIndex,
+        module_fpath: str,
+    ) -> Optional[Tuple[int, int, str]]:
+        """
+        Builds the patch adding the top level imports of the new code that the module lacks. The imports
+        are merged into the leading block of imports of the module, which is sorted again.
+        """
+        existing_imports = {
+            source_index.get_lines(start_line, end_line).strip()
+            for start_line, end_line in source_index.import_line_spans
+        }
+        new_imports = []
+        for start_line, end_line in new_source_index.import_line_spans:
+            new_import = new_source_index.get_lines(start_line, end_line).strip()
+            if new_import not in existing_imports:
+                existing_imports.add(new_import)
+                new_imports.append(new_import + "\n")
+        if not new_imports:
+            return None
+
+        line_offsets = source_index.line_offsets
+        if source_index.import_line_spans:
+            # The leading block spans the statements from the first import to the next statement that is not one
+            import_line_spans = set(source_index.import_line_spans)
+            statement = source_index.statement_line_spans.index(source_index.import_line_spans[0])
+            block_start_line = block_end_line = source_index.statement_line_spans[statement][0]
+            while (
+                statement < len(source_index.statement_line_spans)
+                and source_index.statement_line_spans[statement] in import_line_spans
+            ):
+                block_end_line = source_index.statement_line_spans[statement][1]
+                statement += 1
+            import_block = source_index.get_lines(block_start_line, block_end_line)
+            return (
+                line_offsets[block_start_line - 1],
+                line_offsets[block_end_line],
+                self.formatter.sort_imports("".join(new_imports) + import_block, module_fpath),
+            )
+
+        sorted_imports = self.formatter.sort_imports("".join(new_imports), module_fpath)
+        if source_index.docstring_span:
+            docstring_end_offset = line_offsets[source_index.statement_line_spans[0][1]]
+            return (docstring_end_offset, docstring_end_offset, "\n" + sorted_imports)
+        return (0, 0, sorted_imports + "\n")
+
     @staticmethod
     def _update_node_with_children(
         class_or_function_nodes: NodeList,
         node_to_update: Union[ClassNode, RedBaron],
     ) -> None:
-        """Update a class object according to the received code."""
+        """
+        Update a class object according to the received code. Existing nodes are looked up in a
+        name index of the updated scope, built once and maintained as nodes are replaced or appended.
+        """
+        name_index = SyntaxTreeNameIndex(node_to_update)
         for new_node in class_or_function_nodes:
-            child_node_name = new_node.name
-            existing_node = find_syntax_tree_node(node_to_update, child_node_name)
+            existing_node = name_index.find(new_node.name)
             if existing_node:
-                existing_node.replace(new_node)
+                name_index.replace(existing_node, new_node)
             else:
-                node_to_update.append(new_node)
+                name_index.append(new_node)
 
     @staticmethod
     def _delete_node(node: Node) -> None:
@@ -303,12 +687,15 @@ class PythonWriter:
     def _update_imports(module_obj: RedBaron, new_import_statements: NodeList) -> None:
         """Manage the imports in the module."""
         first_import = module_obj.find(lambda identifier: identifier in ("import", "from_import"))
+        existing_import_statements = {
+            import_statement.dumps().strip()
+            for import_statement in find_import_syntax_tree_nodes(module_obj) or []
+        }
 
         for new_import_statement in new_import_statements:
-            existing_import_statement = find_import_syntax_tree_node_by_name(
-                module_obj, new_import_statement.name
-            )
-            if not existing_import_statement:
+            import_statement = new_import_statement.dumps().strip()
+            if import_statement not in existing_import_statements:
+                existing_import_statements.add(import_statement)
                 if first_import:
                     first_import.insert_before(new_import_statement)  # we will run isort later
                 else:
@@ -2,13 +2,21 @@ import os
 import random
 import string
 import textwrap
+from unittest.mock import patch
 
 import pytest
 from redbaron import ClassNode, DefNode, EndlNode, PassNode, RedBaron, ReturnNode, StringNode
 
+from automata.core.base.tool import Tool
+from automata.core.base.tool_result_cache import ToolResultCache
 from automata.core.code_indexing.module_tree_map import LazyModuleTreeMap
 from automata.core.code_indexing.python_code_retriever import PythonCodeRetriever
-from automata.core.code_indexing.syntax_tree_navigation import find_syntax_tree_node
+from automata.core.code_indexing.syntax_tree_navigation import (
+    find_all_function_and_class_syntax_tree_nodes,
+    find_import_syntax_tree_nodes,
+    find_syntax_tree_node,
+)
+from automata.tools.python_tools.python_formatter import PythonFormatter
 from automata.tools.python_tools.python_writer import PythonWriter
 
 
@@ -375,3 +383,389 @@ def test_write_and_retrieve_mock_code(python_writer):
     retriever = PythonCodeRetriever(module_map)
     module_docstring = retriever.get_docstring("sample_module_2", None)
     assert module_docstring == mock_generator.module_docstring
+
+
+def test_write_module_formats_in_process(python_writer):
+    python_writer._create_module_from_source_code(
+        "sample_module_format", "import sys\nimport os\ndef f( x ):\n  return {  'a':x }\n"
+    )
+    python_writer._write_module_to_disk("sample_module_format")
+
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    fpath = os.path.join(root_dir, "sample_module_format.py")
+    with open(fpath, "r") as f:
+        contents = f.read()
+    os.remove(fpath)
+    assert contents == 'import os\nimport sys\n\n\ndef f(x):\n    return {"a": x}\n'
+
+
+def test_format_source_is_memoized_by_content(python_writer):
+    source_code = "def f( x ):\n  return x\n"
+    formatted_source = python_writer.formatter.format_source(source_code, __file__)
+
+    with patch("black.format_str") as format_str:
+        assert python_writer.formatter.format_source(source_code, __file__) == formatted_source
+        assert (
+            python_writer.formatter.format_source(formatted_source, __file__) == formatted_source
+        )
+        format_str.assert_not_called()
+
+
+def test_format_source_memo_is_bounded():
+    formatter = PythonFormatter(max_cached_sources=4)
+    for i in range(10):
+        formatter.format_source(f"x = {i}\n", __file__)
+    assert len(formatter._formatted_sources) == 4
+
+    # The least recently used sources are evicted first
+    formatter.format_source("x = 6\n", __file__)
+    formatter.format_source("x = 10\n", __file__)
+    with patch("black.format_str") as format_str:
+        formatter.format_source("x = 6\n", __file__)
+        format_str.assert_not_called()
+
+
+def test_transaction(python_writer):
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    fpath = os.path.join(root_dir, "sample_module_transaction.py")
+    mock_generator = MockCodeGenerator(has_class=True, has_function=True)
+    mock_generator_2 = MockCodeGenerator(has_class=True, has_function=True)
+
+    with patch.object(
+        python_writer.formatter, "format_source", wraps=python_writer.formatter.format_source
+    ) as format_source:
+        with python_writer.transaction():
+            python_writer.create_new_module(
+                "sample_module_transaction", mock_generator.generate_code(), do_write=True
+            )
+            with python_writer.transaction():
+                python_writer.update_existing_module(
+                    "sample_module_transaction", mock_generator_2.generate_code(), do_write=True
+                )
+            assert not os.path.exists(fpath)
+        format_source.assert_called_once()
+
+    with open(fpath, "r") as f:
+        contents = f.read()
+    os.remove(fpath)
+    assert mock_generator.function_name in contents
+    assert mock_generator_2.function_name in contents
+    assert not [fname for fname in os.listdir(root_dir) if fname.endswith(".tmp")]
+
+
+def test_transaction_rollback(python_writer):
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    fpath = os.path.join(root_dir, "sample_module_rollback.py")
+    module_tree_map = python_writer.code_retriever.module_tree_map
+    mock_generator = MockCodeGenerator(has_class=True, has_function=True)
+    python_writer.create_new_module("sample_module_rollback", mock_generator.generate_code())
+    source_code = module_tree_map.get_module("sample_module_rollback").dumps()
+
+    mock_generator_2 = MockCodeGenerator(has_class=True, has_function=True)
+    with pytest.raises(ValueError):
+        with python_writer.transaction():
+            python_writer.update_existing_module(
+                "sample_module_rollback", mock_generator_2.generate_code(), do_write=True
+            )
+            python_writer.create_new_module(
+                "sample_module_rollback_new", mock_generator_2.generate_code(), do_write=True
+            )
+            raise ValueError("Tool failed")
+
+    assert module_tree_map.get_module("sample_module_rollback").dumps() == source_code
+    assert "sample_module_rollback_new" not in module_tree_map
+    assert not os.path.exists(fpath)
+
+
+def test_nested_transaction_rollback(python_writer):
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    fpath = os.path.join(root_dir, "sample_module_savepoint.py")
+    module_tree_map = python_writer.code_retriever.module_tree_map
+    mock_generator = MockCodeGenerator(has_class=True, has_function=True)
+    mock_generator_2 = MockCodeGenerator(has_class=True, has_function=True)
+
+    with python_writer.transaction():
+        python_writer.create_new_module(
+            "sample_module_savepoint", mock_generator.generate_code(), do_write=True
+        )
+        with pytest.raises(ValueError):
+            with python_writer.transaction():
+                python_writer.update_existing_module(
+                    "sample_module_savepoint", mock_generator_2.generate_code(), do_write=True
+                )
+                python_writer.create_new_module(
+                    "sample_module_savepoint_new", mock_generator_2.generate_code(), do_write=True
+                )
+                raise ValueError("Tool failed")
+        assert "sample_module_savepoint_new" not in module_tree_map
+
+    # Only the edits of the nested block are rolled back, the outer block is still written
+    with open(fpath, "r") as f:
+        contents = f.read()
+    os.remove(fpath)
+    assert mock_generator.function_name in contents
+    assert mock_generator_2.function_name not in contents
+    assert not os.path.exists(os.path.join(root_dir, "sample_module_savepoint_new.py"))
+
+
+def test_transaction_restores_files_on_failed_write(python_writer):
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    fpaths = [os.path.join(root_dir, f"sample_module_write_{i}.py") for i in range(2)]
+    module_tree_map = python_writer.code_retriever.module_tree_map
+    mock_generator = MockCodeGenerator(has_class=True, has_function=True)
+    for i in range(2):
+        python_writer.create_new_module(
+            f"sample_module_write_{i}", mock_generator.generate_code(), do_write=True
+        )
+    original_contents = []
+    for fpath in fpaths:
+        with open(fpath, "r") as f:
+            original_contents.append(f.read())
+
+    os_replace = os.replace
+
+    def failing_replace(src, dst):
+        if dst == fpaths[1]:
+            raise OSError("Disk full")
+        return os_replace(src, dst)
+
+    mock_generator_2 = MockCodeGenerator(has_class=True, has_function=True)
+    with patch("os.replace", side_effect=failing_replace):
+        with pytest.raises(OSError):
+            with python_writer.transaction():
+                for i in range(2):
+                    python_writer.update_existing_module(
+                        f"sample_module_write_{i}", mock_generator_2.generate_code(), do_write=True
+                    )
+
+    for fpath, original_content in zip(fpaths, original_contents):
+        with open(fpath, "r") as f:
+            assert f.read() == original_content
+        os.remove(fpath)
+    assert (
+        mock_generator_2.function_name
+        not in module_tree_map.get_module("sample_module_write_0").dumps()
+    )
+    assert not [fname for fname in os.listdir(root_dir) if fname.endswith(".tmp")]
+
+
+def test_update_existing_module_patches_source(tmp_path):
+    module_source = textwrap.dedent(
+        '''\
+        """Module docstring"""
+        import os
+
+        X = [1,2,   3]
+
+
+        class A:
+            def m(self):
+                return 1
+
+
+        def f():
+            return os.getcwd()
+        '''
+    )
+    with open(tmp_path / "sample_module_patch.py", "w") as f:
+        f.write(module_source)
+    python_writer = PythonWriter(PythonCodeRetriever(LazyModuleTreeMap(str(tmp_path))))
+    module_tree_map = python_writer.code_retriever.module_tree_map
+
+    python_writer.update_existing_module(
+        "sample_module_patch",
+        "import sys\ndef m(self):\n  return sys.argv\ndef n(self): return {'a':1}\n",
+        "A",
+        do_write=True,
+    )
+    python_writer.update_existing_module(
+        "sample_module_patch", "def g():\n    return 3\n", do_write=True
+    )
+
+    assert not module_tree_map.is_module_loaded("sample_module_patch")
+    with open(tmp_path / "sample_module_patch.py", "r") as f:
+        contents = f.read()
+    # The patched module is formatted as a whole when it is written, like an updated FST
+    assert contents == textwrap.dedent(
+        '''\
+        """Module docstring"""
+        import os
+        import sys
+
+        X = [1, 2, 3]
+
+
+        class A:
+            def m(self):
+                return sys.argv
+
+            def n(self):
+                return {"a": 1}
+
+
+        def f():
+            return os.getcwd()
+
+
+        def g():
+            return 3
+        '''
+    )
+    module_source = module_tree_map.get_module("sample_module_patch").dumps()
+    assert (
+        python_writer.formatter.format_source(module_source, "sample_module_patch.py") == contents
+    )
+
+    with pytest.raises(PythonWriter.ClassOrFunctionNotFound):
+        python_writer.update_existing_module("sample_module_patch", "def h():\n    pass\n", "B")
+
+
+@pytest.mark.parametrize(
+    "source_code, disambiguator",
+    [
+        ("import sys\ndef f():\n    return sys.argv\ndef n(): return {'a':1}\n", None),
+        ("def f():\n    return  os.sep\n", None),
+        ("from typing import List\ndef g(x: List[int]) -> int:\n    return len( x )\n", None),
+    ],
+)
+def test_update_existing_module_patch_matches_fst(tmp_path, source_code, disambiguator):
+    module_source = textwrap.dedent(
+        '''\
+        """Module docstring"""
+        import os
+
+        X = [1,2,   3]
+
+
+        class A:
+            def m(self):
+                return 1
+
+
+        def f():
+            return os.getcwd()
+        '''
+    )
+    contents = []
+    for load_fst in [False, True]:
+        root_dir = tmp_path / str(load_fst)
+        root_dir.mkdir()
+        with open(root_dir / "sample_module_paths.py", "w") as f:
+            f.write(module_source)
+        python_writer = PythonWriter(PythonCodeRetriever(LazyModuleTreeMap(str(root_dir))))
+        if load_fst:
+            python_writer.code_retriever.module_tree_map.get_module("sample_module_paths")
+        python_writer.update_existing_module(
+            "sample_module_paths", source_code, disambiguator, do_write=True
+        )
+        assert (
+            python_writer.code_retriever.module_tree_map.is_module_loaded("sample_module_paths")
+            == load_fst
+        )
+        with open(root_dir / "sample_module_paths.py", "r") as f:
+            contents.append(f.read())
+
+    # Patching the source text and updating the FST write the same file
+    assert contents[0] == contents[1]
+
+
+def test_update_existing_module_does_not_patch_tab_indented_source(tmp_path):
+    with open(tmp_path / "sample_module_tabs.py", "w") as f:
+        f.write("class A:\n\tdef m(self):\n\t\treturn 1\n")
+    python_writer = PythonWriter(PythonCodeRetriever(LazyModuleTreeMap(str(tmp_path))))
+    module_tree_map = python_writer.code_retriever.module_tree_map
+
+    python_writer.update_existing_module(
+        "sample_module_tabs", "def m(self):\n    return 2\n", "A", do_write=True
+    )
+
+    # The block formatted with spaces would be mixed with the tabs, so the FST is updated instead
+    assert module_tree_map.is_module_loaded("sample_module_tabs")
+    with open(tmp_path / "sample_module_tabs.py", "r") as f:
+        contents = f.read()
+    assert "return 2" in contents
+    assert not [
+        line
+        for line in contents.splitlines()
+        if "\t" in line and line.lstrip("\t") != line.lstrip()
+    ]
+
+
+def test_update_node_with_children_matches_search_order():
+    module_code = textwrap.dedent(
+        """\
+        class A:
+            def __init__(self):
+                pass
+
+            def run(self):
+                pass
+
+        class B:
+            def __init__(self):
+                pass
+
+        def run():
+            pass
+        """
+    )
+    new_code = textwrap.dedent(
+        """\
+        class A:
+            def start(self):
+                return 1
+
+        def __init__():
+            return 2
+
+        def run():
+            return 3
+
+        def stop():
+            return 4
+        """
+    )
+    new_nodes = find_all_function_and_class_syntax_tree_nodes(RedBaron(new_code))
+    expected_module = RedBaron(module_code)
+    for new_node in new_nodes:
+        existing_node = find_syntax_tree_node(expected_module, new_node.name)
+        if existing_node:
+            existing_node.replace(new_node)
+        else:
+            expected_module.append(new_node)
+
+    module = RedBaron(module_code)
+    PythonWriter._update_node_with_children(new_nodes, module)
+    assert module.dumps() == expected_module.dumps()
+
+
+def test_update_imports_skips_existing_imports():
+    module = RedBaron("import os\nfrom typing import List\n\nx = 1\n")
+    new_imports = find_import_syntax_tree_nodes(
+        RedBaron("import os\nimport sys\nfrom typing import List\nimport sys\n")
+    )
+    PythonWriter._update_imports(module, new_imports)
+    assert module.dumps() == "import sys\nimport os\nfrom typing import List\n\nx = 1\n"
+
+
+def test_writes_invalidate_cached_tool_results(tmp_path):
+    with open(tmp_path / "sample_module_cache.py", "w") as f:
+        f.write("def f():\n    return 1\n")
+    python_writer = PythonWriter(PythonCodeRetriever(LazyModuleTreeMap(str(tmp_path))))
+    retrieve_code_tool = Tool(
+        name="retrieve-code",
+        func=lambda tool_input: python_writer.code_retriever.get_source_code(*tool_input),
+        description="",
+        cacheable=True,
+    )
+    tool_result_cache = ToolResultCache()
+
+    def retrieve_code():
+        return tool_result_cache.get_or_run(
+            retrieve_code_tool, ("sample_module_cache", "f"), lambda tool, x: tool.run(x)
+        )
+
+    assert "return 1" in retrieve_code()
+    python_writer.update_existing_module("sample_module_cache", "def f():\n    return 2\n")
+    assert "return 2" in retrieve_code()
+    assert tool_result_cache.get_stats()["retrieve-code"].hits == 0
@@ -0,0 +1,60 @@
+import time
+from typing import Union
+
+import pytest
+from redbaron import ClassNode, NodeList, RedBaron
+
+from automata.core.code_indexing.syntax_tree_navigation import (
+    find_all_function_and_class_syntax_tree_nodes,
+    find_syntax_tree_node,
+)
+from automata.tools.python_tools.python_writer import PythonWriter
+
+BENCHMARK_NUM_DEFINITIONS = 300
+
+
+def _build_module_code(num_definitions: int, return_value: int) -> str:
+    functions = "".join(
+        f"def function_{i}(x):\n    return x + {return_value}\n\n\n"
+        for i in range(num_definitions)
+    )
+    methods = "".join(
+        f"    def method_{i}(self):\n        return {return_value}\n\n"
+        for i in range(num_definitions)
+    )
+    return f"{functions}class LargeClass:\n{methods}"
+
+
+def _update_node_with_children_by_search(
+    class_or_function_nodes: NodeList, node_to_update: Union[ClassNode, RedBaron]
+) -> None:
+    """The previous implementation, which searches the whole scope for every new node."""
+    for new_node in class_or_function_nodes:
+        existing_node = find_syntax_tree_node(node_to_update, new_node.name)
+        if existing_node:
+            existing_node.replace(new_node)
+        else:
+            node_to_update.append(new_node)
+
+
+@pytest.mark.benchmark
+def test_benchmark_update_node_with_children():
+    new_fst = RedBaron(_build_module_code(BENCHMARK_NUM_DEFINITIONS, 2))
+    new_nodes = find_all_function_and_class_syntax_tree_nodes(new_fst)
+
+    search_module = RedBaron(_build_module_code(BENCHMARK_NUM_DEFINITIONS, 1))
+    start = time.perf_counter()
+    _update_node_with_children_by_search(new_nodes, search_module)
+    search_latency = time.perf_counter() - start
+
+    indexed_module = RedBaron(_build_module_code(BENCHMARK_NUM_DEFINITIONS, 1))
+    start = time.perf_counter()
+    PythonWriter._update_node_with_children(new_nodes, indexed_module)
+    indexed_latency = time.perf_counter() - start
+
+    print(
+        f"\nupdate of {len(new_nodes)} definitions in a module with as many definitions:"
+        f"\n  search per node: {search_latency * 1e3:.1f} ms"
+        f"\n  name index: {indexed_latency * 1e3:.1f} ms"
+    )
+    assert indexed_module.dumps() == search_module.dumps()